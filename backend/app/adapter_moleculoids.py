@@ -1,11 +1,20 @@
-"""Convert molblock to Moleculoids JSON scene format."""
+"""Convert molblock to Moleculoids JSON scene format.
+
+RDKit is imported on first use (or by warm()), not when the API module loads: only the
+geometry endpoint needs it and it dominates worker import time.
+"""
 from typing import Any
 
-from rdkit import Chem
+
+def warm() -> None:
+    """Import RDKit now so the first geometry request does not pay for it."""
+    from rdkit import Chem  # noqa: F401
 
 
 def molblock_to_moleculoids_json(molblock: str) -> dict[str, Any]:
     """Convert a single MOL block to Moleculoids POST /scenes JSON body."""
+    from rdkit import Chem
+
     mol = Chem.MolFromMolBlock(molblock)
     if mol is None:
         raise ValueError("Invalid molblock")
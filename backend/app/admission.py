@@ -0,0 +1,45 @@
+"""Per-route-class admission control: bounded concurrency with a short queue, then 503."""
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+
+from fastapi import HTTPException
+
+from . import metrics
+
+
+class RouteAdmission:
+    """One semaphore per route class (query, aggregates, ...); classes without a limit are not gated.
+
+    A request waits up to queue_timeout seconds for a slot and is shed with 503 otherwise,
+    so a burst on one class cannot take every pool connection from the others.
+    """
+
+    def __init__(self, limits: dict[str, int], queue_timeout: float):
+        self.queue_timeout = queue_timeout
+        self._slots = {route: asyncio.Semaphore(n) for route, n in limits.items() if n > 0}
+
+    @asynccontextmanager
+    async def admit(self, route: str) -> AsyncIterator[None]:
+        sem = self._slots.get(route)
+        if sem is None:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            await asyncio.wait_for(sem.acquire(), self.queue_timeout)
+        except asyncio.TimeoutError:
+            metrics.ADMISSION_REJECTED.labels(route).inc()
+            raise HTTPException(
+                status_code=503,
+                detail=f"Too many concurrent {route} requests; retry shortly",
+                headers={"Retry-After": "1"},
+            )
+        metrics.ADMISSION_WAIT_SECONDS.labels(route).observe(time.perf_counter() - start)
+        metrics.ADMISSION_IN_FLIGHT.labels(route).inc()
+        try:
+            yield
+        finally:
+            metrics.ADMISSION_IN_FLIGHT.labels(route).dec()
+            sem.release()
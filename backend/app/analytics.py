@@ -0,0 +1,247 @@
+"""DuckDB over Parquet snapshots: the read endpoints without a Postgres server (ANALYTICS_BACKEND=duckdb).
+
+Snapshots are written by `python -m ingest.cli parquet` (ingest.parquet_export) as
+{parquet_dir}/{dataset_id}/molecules.parquet + dataset.json. Filters, counts and min/max run
+as vectorized scans over the columns they touch, skipping row groups by their statistics.
+The `duckdb` package is optional and imported with the first query.
+"""
+import asyncio
+import contextlib
+import json
+import time
+from pathlib import Path
+from typing import Any, AsyncIterator, Callable
+
+from . import metrics
+
+# Filterable / aggregated API fields -> snapshot column (the same fields as _RANGE_FIELDS in main)
+RANGE_COLUMNS = {
+    "molecular_weight": "molecular_weight",
+    "TPSA": "tpsa",
+    "XLogP3": "xlogp3",
+    "HBA": "hba",
+    "HBD": "hbd",
+    "rotatable_bonds": "rotatable_bonds",
+    "mmff94_energy": "mmff94_energy",
+    "shape_volume": "shape_volume",
+}
+
+# Sortable columns; API field names are matched case-insensitively, as Postgres does
+_SORT_COLUMNS = frozenset({
+    "cid", "smiles", "inchi_key", "molecular_formula", "molecular_weight", "exact_mass", "xlogp3", "tpsa",
+    "hba", "hbd", "rotatable_bonds", "name", "discovery_method", "discovery_seed", "seed_name", "seed_smiles",
+    "mmff94_energy", "shape_volume",
+})
+
+_PAGE_COLUMNS = (
+    "cid, smiles, inchi_key, molecular_formula, molecular_weight, exact_mass, xlogp3, tpsa, hba, hbd,"
+    " rotatable_bonds, name, discovery_method, discovery_seed, seed_name"
+)
+
+
+def _where(body: Any) -> tuple[str, list]:
+    """WHERE clause and ? parameters for a MoleculesQueryBody's seed / methods / ranges filters."""
+    conditions = ["TRUE"]
+    params: list[Any] = []
+    if body.seed_name:
+        conditions.append("seed_name = ?")
+        params.append(body.seed_name)
+    if body.methods:
+        conditions.append(f"discovery_method IN ({', '.join('?' for _ in body.methods)})")
+        params.extend(body.methods)
+    for field, pair in (body.ranges or {}).items():
+        col = RANGE_COLUMNS.get(field)
+        if col is not None and len(pair) >= 2:
+            conditions.append(f"{col} >= ? AND {col} <= ?")
+            params.extend([float(pair[0]), float(pair[1])])
+    return " AND ".join(conditions), params
+
+
+def order_by(body: Any) -> str:
+    """ORDER BY for the body's sort; ValueError for a field the snapshot does not have."""
+    parts = []
+    for s in body.sort or []:
+        col = s.field.lower()
+        if col not in _SORT_COLUMNS:
+            raise ValueError(f"Unknown sort field: {s.field}")
+        # Postgres order: NULLs after values ascending, before them descending
+        parts.append(f"{col} ASC NULLS LAST" if s.dir == "asc" else f"{col} DESC NULLS FIRST")
+    # Parallel scans have no natural order, so cid breaks ties and keeps OFFSET pages stable
+    parts.append("cid ASC")
+    return ", ".join(parts)
+
+
+class DuckDBAnalytics:
+    """Snapshot discovery plus one shared in-process DuckDB database; queries run in threads."""
+
+    def __init__(self, directory: Path, threads: int = 0):
+        self.directory = directory
+        self.threads = threads
+        self._db = None
+        self._db_lock = asyncio.Lock()
+        # dataset_id -> (dataset.json mtime, parsed meta)
+        self._meta: dict[str, tuple[float, dict]] = {}
+
+    def _connect(self):
+        import duckdb
+
+        db = duckdb.connect(":memory:")
+        if self.threads > 0:
+            db.execute(f"SET threads = {int(self.threads)}")
+        # Parquet footers (schema, row-group statistics) are parsed once per file, not per query
+        db.execute("SET parquet_metadata_cache = true")
+        return db
+
+    async def database(self):
+        if self._db is None:
+            async with self._db_lock:
+                if self._db is None:
+                    self._db = await asyncio.to_thread(self._connect)
+        return self._db
+
+    def close(self) -> None:
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+    def meta(self, dataset_id: str) -> dict | None:
+        """dataset.json of the dataset's snapshot (reloaded when re-exported); None when there is none."""
+        if Path(dataset_id).name != dataset_id:
+            return None
+        path = self.directory / dataset_id / "dataset.json"
+        try:
+            mtime = path.stat().st_mtime
+        except FileNotFoundError:
+            self._meta.pop(dataset_id, None)
+            return None
+        cached = self._meta.get(dataset_id)
+        if cached is None or cached[0] != mtime:
+            cached = (mtime, json.loads(path.read_text()))
+            self._meta[dataset_id] = cached
+        return cached[1]
+
+    def datasets(self) -> list[dict]:
+        """Meta of every snapshot, newest dataset first (as GET /datasets orders them)."""
+        if not self.directory.is_dir():
+            return []
+        metas = [m for p in self.directory.glob("*/dataset.json") if (m := self.meta(p.parent.name)) is not None]
+        return sorted(metas, key=lambda m: m.get("created_at") or "", reverse=True)
+
+    def source(self, dataset_id: str) -> str | None:
+        """read_parquet(...) for the dataset's snapshot, or None when it has not been exported."""
+        if self.meta(dataset_id) is None:
+            return None
+        path = (self.directory / dataset_id / "molecules.parquet").resolve().as_posix()
+        return "read_parquet('{}')".format(path.replace("'", "''"))
+
+    async def session(self, timeout: float) -> "AnalyticsSession":
+        return AnalyticsSession(self, (await self.database()).cursor(), timeout)
+
+
+class AnalyticsSession:
+    """One request's DuckDB cursor. Each query runs in a worker thread under `timeout` seconds;
+    on timeout or cancellation (client disconnect) the scan is interrupted, not left running.
+    """
+
+    def __init__(self, analytics: DuckDBAnalytics, cursor, timeout: float):
+        self.analytics = analytics
+        self.cursor = cursor
+        self.timeout = timeout
+
+    def close(self) -> None:
+        self.cursor.close()
+
+    async def _call(self, template: str, fn: Callable[[], Any]) -> Any:
+        start = time.perf_counter()
+        future = asyncio.ensure_future(asyncio.to_thread(fn))
+        try:
+            return await asyncio.wait_for(asyncio.shield(future), self.timeout)
+        except BaseException:
+            self.cursor.interrupt()
+            # The cursor is closed after the request; let the interrupted query unwind first
+            with contextlib.suppress(Exception):
+                await future
+            raise
+        finally:
+            metrics.SQL_SECONDS.labels(f"duckdb.{template}").observe(time.perf_counter() - start)
+
+    def _rows(self, sql: str, params: list) -> list[dict]:
+        self.cursor.execute(sql, params)
+        names = [d[0] for d in self.cursor.description]
+        return [dict(zip(names, r)) for r in self.cursor.fetchall()]
+
+    async def families(self, dataset_id: str) -> list[str]:
+        src = self.analytics.source(dataset_id)
+        if src is None:
+            return []
+        rows = await self._call("families.list", lambda: self._rows(
+            f"SELECT DISTINCT seed_name FROM {src} WHERE seed_name IS NOT NULL ORDER BY seed_name", []
+        ))
+        return [r["seed_name"] for r in rows]
+
+    async def seeds(self, dataset_id: str, family: str | None) -> list[dict]:
+        src = self.analytics.source(dataset_id)
+        if src is None:
+            return []
+        if family:
+            sql = (f"SELECT DISTINCT discovery_seed, seed_name, seed_smiles FROM {src}"
+                   " WHERE seed_name = ? ORDER BY discovery_seed")
+            return await self._call("seeds.by_family", lambda: self._rows(sql, [family]))
+        sql = (f"SELECT DISTINCT discovery_seed, seed_name, seed_smiles FROM {src}"
+               " ORDER BY seed_name NULLS LAST, discovery_seed NULLS LAST")
+        return await self._call("seeds.list", lambda: self._rows(sql, []))
+
+    def _page_sql(self, src: str, body: Any, limit: int, offset: int) -> tuple[str, list]:
+        where, params = _where(body)
+        sql = f"SELECT {_PAGE_COLUMNS} FROM {src} WHERE {where} ORDER BY {order_by(body)} LIMIT ? OFFSET ?"
+        return sql, params + [limit, offset]
+
+    async def page(self, dataset_id: str, body: Any, limit: int, offset: int) -> list[dict]:
+        """One page of molecule rows (keys as in the Postgres row plus the dimension labels)."""
+        src = self.analytics.source(dataset_id)
+        if src is None:
+            return []
+        sql, params = self._page_sql(src, body, limit, offset)
+        return await self._call("query.page", lambda: self._rows(sql, params))
+
+    async def stream(self, dataset_id: str, body: Any, limit: int, offset: int, batch: int) -> AsyncIterator[list[dict]]:
+        """The same page as page(), fetched `batch` rows at a time."""
+        src = self.analytics.source(dataset_id)
+        if src is None:
+            return
+        sql, params = self._page_sql(src, body, limit, offset)
+        await self._call("query.stream", lambda: self.cursor.execute(sql, params))
+        names = [d[0] for d in self.cursor.description]
+        while True:
+            rows = await self._call("query.stream", lambda: self.cursor.fetchmany(batch))
+            if not rows:
+                return
+            yield [dict(zip(names, r)) for r in rows]
+
+    async def count(self, dataset_id: str, body: Any, sample_percent: float | None = None) -> int:
+        """Rows matching the filters; with sample_percent, rows matching in a block sample of that size."""
+        src = self.analytics.source(dataset_id)
+        if src is None:
+            return 0
+        where, params = _where(body)
+        sample = f" TABLESAMPLE {float(sample_percent)}% (system)" if sample_percent is not None else ""
+        sql = f"SELECT COUNT(*) FROM {src}{sample} WHERE {where}"
+        template = "query.count_sampled" if sample else "query.count"
+        return await self._call(template, lambda: self.cursor.execute(sql, params).fetchone()[0])
+
+    async def aggregates(
+        self, dataset_id: str, body: Any, sample_percent: float | None = None
+    ) -> dict[str, tuple[int, float | None, float | None]]:
+        """field -> (non-NULL count, min, max) over matching rows, for every RANGE_COLUMNS field, in one scan."""
+        src = self.analytics.source(dataset_id)
+        if src is None:
+            return {}
+        where, params = _where(body)
+        sample = f" TABLESAMPLE {float(sample_percent)}% (system)" if sample_percent is not None else ""
+        selects = ", ".join(f"COUNT({c}), MIN({c}), MAX({c})" for c in RANGE_COLUMNS.values())
+        sql = f"SELECT {selects} FROM {src}{sample} WHERE {where}"
+        row = await self._call("aggregates", lambda: self.cursor.execute(sql, params).fetchone())
+        return {
+            field: (row[3 * i], row[3 * i + 1], row[3 * i + 2])
+            for i, field in enumerate(RANGE_COLUMNS)
+        }
@@ -1,25 +1,57 @@
-"""Async DB engine and session."""
-from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
-from sqlalchemy.orm import declarative_base
+"""Async DB engine and session (SQLAlchemy), created on first use.
+
+The API serves requests through asyncpg pools (app.pools); importing SQLAlchemy and building
+an engine at import time only slowed worker startup. `engine`, `AsyncSessionLocal` and `Base`
+are still importable from this module and are built the first time they are accessed.
+"""
+from functools import lru_cache
+from typing import Any
+
 from .config import settings
 
-engine = create_async_engine(
-    settings.database_url,
-    echo=False,
-)
-AsyncSessionLocal = async_sessionmaker(
-    engine,
-    class_=AsyncSession,
-    expire_on_commit=False,
-    autocommit=False,
-    autoflush=False,
-)
 
-Base = declarative_base()
+@lru_cache(maxsize=None)
+def get_engine():
+    from sqlalchemy.ext.asyncio import create_async_engine
+
+    return create_async_engine(
+        settings.database_url,
+        echo=False,
+    )
+
+
+@lru_cache(maxsize=None)
+def get_sessionmaker():
+    from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+    return async_sessionmaker(
+        get_engine(),
+        class_=AsyncSession,
+        expire_on_commit=False,
+        autocommit=False,
+        autoflush=False,
+    )
+
+
+@lru_cache(maxsize=None)
+def _declarative_base():
+    from sqlalchemy.orm import declarative_base
+
+    return declarative_base()
+
+
+def __getattr__(name: str) -> Any:
+    if name == "engine":
+        return get_engine()
+    if name == "AsyncSessionLocal":
+        return get_sessionmaker()
+    if name == "Base":
+        return _declarative_base()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 async def get_db():
-    async with AsyncSessionLocal() as session:
+    async with get_sessionmaker()() as session:
         try:
             yield session
             await session.commit()
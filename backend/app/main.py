@@ -1,41 +1,328 @@
-"""FastAPI app: datasets, families, seeds, molecules query/aggregates/detail/geometry, runs."""
+"""FastAPI app: datasets, families, seeds, molecules query/aggregates/detail/geometry, ingest jobs, runs."""
+import asyncio
+import hashlib
+import ipaddress
+import json
+import math
+import os
+import sys
+import time
+import uuid
 from contextlib import asynccontextmanager
-from typing import Any
+from pathlib import Path
+from typing import Any, AsyncIterator, Callable
 
 import asyncpg
-from fastapi import FastAPI, Depends, HTTPException, Query
+from fastapi import FastAPI, Depends, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from pydantic import BaseModel
 
+from . import metrics
+from .admission import RouteAdmission
+from .analytics import AnalyticsSession, DuckDBAnalytics, order_by
+from .compression import CompressionMiddleware
 from .config import settings
+from .pools import UNAVAILABLE, DatabasePools
+from .slow_queries import SlowQueryLog
+from .versions import DATASET_VERSION_SQL, DatasetVersions, version_token
+from . import adapter_moleculoids
 from .adapter_moleculoids import molblock_to_moleculoids_json
 
 # ---------------------------------------------------------------------------
-# DB pool
+# DB pools
 # ---------------------------------------------------------------------------
 
-def _pg_url() -> str:
-    u = settings.database_url
-    if u.startswith("postgresql+asyncpg://"):
-        u = u.replace("postgresql+asyncpg://", "postgresql://", 1)
-    return u
+pools = DatabasePools(
+    settings.database_url,
+    settings.read_replica_urls,
+    min_size=settings.db_pool_min_size,
+    max_size=settings.db_pool_max_size,
+    cold_max_size=settings.db_cold_pool_max_size,
+    # The global statement_timeout is a session default: the pool's RESET ALL on release
+    # returns every connection to it after a route-specific SET.
+    server_settings={"statement_timeout": str(settings.statement_timeout_ms)},
+)
 
 
-pool: asyncpg.Pool | None = None
+# ANALYTICS_BACKEND=duckdb serves these route classes (/datasets, /families, /seeds,
+# /molecules/query, /molecules/aggregates) from Parquet snapshots instead of Postgres
+ANALYTICS_BACKENDS = ("postgres", "duckdb")
+ANALYTICS_ROUTES = ("browse", "query", "aggregates")
+
+if settings.analytics_backend not in ANALYTICS_BACKENDS:
+    raise ValueError(f"ANALYTICS_BACKEND must be one of {', '.join(ANALYTICS_BACKENDS)}")
+if settings.analytics_backend == "postgres" and not settings.database_url:
+    raise ValueError("DATABASE_URL is required unless ANALYTICS_BACKEND=duckdb")
+analytics = (
+    DuckDBAnalytics(Path(settings.parquet_dir), settings.duckdb_threads)
+    if settings.analytics_backend == "duckdb"
+    else None
+)
+
+
+# Readiness for GET /ready: pools open and (with PREWARM) heavy imports done; cleared on shutdown
+_ready = asyncio.Event()
+
+
+async def _prewarm() -> None:
+    """Import RDKit off the event loop so the first geometry request does not pay for it."""
+    start = time.perf_counter()
+    await asyncio.to_thread(adapter_moleculoids.warm)
+    print(f"prewarm: RDKit imported in {time.perf_counter() - start:.2f}s", file=sys.stderr)
+    _ready.set()
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    global pool
-    pool = await asyncpg.create_pool(_pg_url(), min_size=1, max_size=10)
+    background = []
+    # With the DuckDB backend and an empty DATABASE_URL the API runs without a server
+    if settings.database_url:
+        await pools.open(warm=_WARM_QUERIES)
+        background += [
+            asyncio.create_task(pools.health_loop(settings.replica_health_interval)),
+            asyncio.create_task(dataset_versions.listen(pools.primary_url)),
+        ]
+    if settings.prewarm:
+        background.append(asyncio.create_task(_prewarm()))
+    else:
+        _ready.set()
     yield
-    if pool:
-        await pool.close()
+    _ready.clear()
+    for task in background:
+        task.cancel()
+    await pools.close()
+    if analytics is not None:
+        analytics.close()
+
+
+dataset_versions = DatasetVersions(settings.dataset_version_ttl)
+
+admission = RouteAdmission(settings.route_concurrency, settings.admission_queue_timeout_ms / 1000.0)
+
+# How often an in-flight request checks whether its client has gone away
+DISCONNECT_POLL_INTERVAL = 0.25
+
+
+async def _cancel_on_disconnect(request: Request, task: asyncio.Task, route: str) -> None:
+    while not await request.is_disconnected():
+        await asyncio.sleep(DISCONNECT_POLL_INTERVAL)
+    # Cancelling the handler task makes asyncpg send a cancel request for the running query
+    metrics.QUERY_CANCELLED.labels(route, "disconnect").inc()
+    task.cancel()
+
+
+def conn_for(route: str):
+    """Dependency yielding a pool connection for one route class.
 
+    Admission (per-class concurrency limit) is taken before the pool, so shed requests never
+    hold a connection. runs reads the primary, geometry the cold replica pools and everything
+    else the hot ones. The class's statement_timeout applies for the request, and the query is
+    cancelled if the client disconnects before the response is ready.
 
-async def get_conn():
-    async with pool.acquire() as conn:
-        yield conn
+    With ANALYTICS_BACKEND=duckdb, ANALYTICS_ROUTES get an AnalyticsSession instead, under the
+    same admission limit, timeout (as a 504) and disconnect cancellation.
+    """
+    timeout_ms = settings.route_statement_timeout_ms.get(route, settings.statement_timeout_ms)
+
+    if analytics is not None and route in ANALYTICS_ROUTES:
+        async def get_session(request: Request):
+            async with admission.admit(route):
+                session = await analytics.session(timeout_ms / 1000.0)
+                watcher = asyncio.create_task(
+                    _cancel_on_disconnect(request, asyncio.current_task(), route)
+                )
+                try:
+                    yield session
+                except TimeoutError:
+                    metrics.QUERY_CANCELLED.labels(route, "statement_timeout").inc()
+                    raise HTTPException(
+                        status_code=504, detail=f"Query exceeded the {timeout_ms} ms statement timeout"
+                    )
+                finally:
+                    watcher.cancel()
+                    session.close()
+
+        return get_session
+
+    async def get_conn(request: Request):
+        if pools.primary is None:
+            raise HTTPException(status_code=503, detail="No database configured (DATABASE_URL is empty)")
+        async with admission.admit(route):
+            start = time.perf_counter()
+            pool, replicas = pools.for_route(route)
+            try:
+                conn = await pool.acquire()
+            except UNAVAILABLE:
+                if replicas is None:
+                    raise
+                # Take the replica out of rotation and retry once on the next one (or the primary)
+                replicas.mark_down(pool)
+                pool = replicas.pick()
+                conn = await pool.acquire()
+            try:
+                metrics.POOL_ACQUIRE_SECONDS.labels(replicas.name if replicas else "primary").observe(
+                    time.perf_counter() - start
+                )
+                if timeout_ms != settings.statement_timeout_ms:
+                    await conn.execute(f"SET statement_timeout = {int(timeout_ms)}")
+                watcher = asyncio.create_task(
+                    _cancel_on_disconnect(request, asyncio.current_task(), route)
+                )
+                try:
+                    yield conn
+                except asyncpg.QueryCanceledError:
+                    metrics.QUERY_CANCELLED.labels(route, "statement_timeout").inc()
+                    raise HTTPException(
+                        status_code=504, detail=f"Query exceeded the {timeout_ms} ms statement timeout"
+                    )
+                except UNAVAILABLE:
+                    if replicas is not None:
+                        replicas.mark_down(pool)
+                    raise
+                finally:
+                    watcher.cancel()
+            finally:
+                await pool.release(conn)
+
+    return get_conn
+
+
+
+# Geometry fetched with ?v=<current dataset version> never changes under that URL
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    # Weak comparison (RFC 9110 13.1.2): W/ prefixes are ignored
+    tags = [t.strip().removeprefix("W/") for t in if_none_match.split(",")]
+    return "*" in tags or etag in tags
+
+
+def _snapshot_version(dataset_id: str | None) -> str | None:
+    """Version of the Parquet snapshot(s) the DuckDB backend serves, like DatasetVersions for Postgres."""
+    if dataset_id is None:
+        items = ",".join(f"{m['dataset_id']}={m['version']}" for m in sorted(
+            analytics.datasets(), key=lambda m: m["dataset_id"]
+        ))
+        return hashlib.blake2b(items.encode(), digest_size=8).hexdigest()
+    meta = analytics.meta(dataset_id)
+    return meta["version"] if meta is not None else None
+
+
+def http_cache(
+    immutable: bool = False, route: str | None = None, variant: Callable[[str], str] | None = None
+):
+    """Dependency adding ETag / Cache-Control from the dataset version; 304 on If-None-Match.
+
+    Declared before the connection dependency so a revalidation hit returns before admission
+    or pool acquire. The ETag covers the version, path, query string and request body, so it
+    changes whenever an ingest run for the dataset completes. With immutable=True a request
+    carrying ?v=<current version> is cacheable for a year. For a route class served by DuckDB
+    the version is the exported snapshot's, which changes when it is re-exported. variant(dataset_id)
+    adds state the response depends on besides the dataset version, such as a prebuilt index.
+    """
+    from_snapshot = analytics is not None and route in ANALYTICS_ROUTES
+
+    async def check(request: Request, response: Response) -> None:
+        dataset_id = request.path_params.get("dataset_id")
+        if from_snapshot:
+            version = _snapshot_version(dataset_id)
+            if version is None:
+                return
+        elif pools.primary is None:
+            return
+        elif dataset_id is None:
+            version = await dataset_versions.combined(pools.primary)
+        else:
+            version = await dataset_versions.get(pools.primary, dataset_id)
+            if version is None:
+                return
+        h = hashlib.blake2b(digest_size=8)
+        parts = [version, request.url.path, request.url.query]
+        if variant is not None and dataset_id is not None:
+            parts.append(variant(dataset_id))
+        for part in parts:
+            h.update(part.encode())
+            h.update(b"\0")
+        if request.method == "POST":
+            h.update(await request.body())
+        etag = f'"{version}.{h.hexdigest()}"'
+        if immutable and request.query_params.get("v") == version:
+            cache_control = IMMUTABLE_CACHE_CONTROL
+        else:
+            cache_control = f"public, max-age={settings.cache_max_age}, must-revalidate"
+        headers = {"ETag": etag, "Cache-Control": cache_control}
+        if _etag_matches(request.headers.get("if-none-match", ""), etag):
+            raise HTTPException(status_code=304, headers=headers)
+        response.headers.update(headers)
+
+    return check
+
+slow_queries = SlowQueryLog(
+    settings.slow_query_ms, settings.slow_query_explain_rate, settings.slow_query_log_size
+)
+# Background EXPLAIN tasks (strong refs so they are not garbage-collected mid-run)
+_explain_tasks: set[asyncio.Task] = set()
+
+# Cap on a sampled EXPLAIN ANALYZE, which re-executes the slow query
+SLOW_QUERY_EXPLAIN_TIMEOUT = 30.0
+
+
+async def _query(conn: asyncpg.Connection, template: str, method: str, sql: str, *args: Any) -> Any:
+    """Run conn.<method>(sql, *args), timed under a bounded-cardinality template label.
+
+    Successful queries over settings.slow_query_ms go to the slow-query log; some get their
+    plan captured by a background EXPLAIN (ANALYZE, BUFFERS) on a separate pool connection.
+    """
+    start = time.perf_counter()
+    try:
+        result = await getattr(conn, method)(sql, *args)
+    finally:
+        elapsed = time.perf_counter() - start
+        metrics.SQL_SECONDS.labels(template).observe(elapsed)
+    _record_slow(template, sql, args, elapsed)
+    return result
+
+
+async def _cursor(
+    conn: asyncpg.Connection, template: str, sql: str, *args: Any, prefetch: int
+) -> AsyncIterator[asyncpg.Record]:
+    """Rows of sql from a server-side cursor (caller holds a transaction), recorded like _query.
+
+    Only the fetches are timed, not the time the consumer spends between rows; a cursor
+    that fails or is abandoned before its last row is not logged as slow.
+    """
+    rows = conn.cursor(sql, *args, prefetch=prefetch).__aiter__()
+    elapsed = 0.0
+    try:
+        while True:
+            start = time.perf_counter()
+            try:
+                r = await rows.__anext__()
+            except StopAsyncIteration:
+                break
+            finally:
+                elapsed += time.perf_counter() - start
+            yield r
+    finally:
+        metrics.SQL_SECONDS.labels(template).observe(elapsed)
+    _record_slow(template, sql, args, elapsed)
+
+
+def _record_slow(template: str, sql: str, args: tuple, elapsed: float) -> None:
+    if slow_queries.record(template, sql, args, elapsed * 1000.0):
+        task = asyncio.create_task(
+            slow_queries.explain(pools.hot.pick(), template, sql, args, SLOW_QUERY_EXPLAIN_TIMEOUT)
+        )
+        _explain_tasks.add(task)
+        task.add_done_callback(_explain_done)
+
+
+def _explain_done(task: asyncio.Task) -> None:
+    _explain_tasks.discard(task)
+    if not task.cancelled() and task.exception() is not None:
+        print(f"slow-query EXPLAIN failed: {task.exception()!r}", file=sys.stderr)
 
 
 # ---------------------------------------------------------------------------
@@ -58,6 +345,46 @@ class MoleculesQueryBody(BaseModel):
     ranges: dict[str, list[float]] | None = None
     sort: list[SortItem] | None = None
     page: Page | None = None
+    accuracy: str = "exact"
+    format: str = "json"
+
+
+class IngestJobBody(BaseModel):
+    kind: str
+    dataset_id: str
+    paths: list[str]
+    name: str | None = None
+    jobs: int = 1
+    force: bool = False
+    parquet: bool = False
+
+
+# exact: COUNT/MIN/MAX over all matching rows
+# sampled: same aggregates over a TABLESAMPLE of the hot table, counts scaled up with 95% bounds
+# estimate: planner row estimates (EXPLAIN) and pg_stats histogram bounds, no scan at all
+ACCURACY_MODES = ("exact", "sampled", "estimate")
+
+
+# ---------------------------------------------------------------------------
+# Dimension keys
+# ---------------------------------------------------------------------------
+
+# Hot-table filters compare dataset_key; $1 is always the dataset_id text
+_DATASET_KEY = "(SELECT dataset_key FROM dataset WHERE dataset_id = $1)"
+
+# Fields accepted in MoleculesQueryBody.ranges
+_RANGE_FIELDS = (
+    "molecular_weight", "TPSA", "XLogP3", "HBA", "HBD", "rotatable_bonds",
+    "mmff94_energy", "shape_volume",
+)
+
+# Text columns kept in dimension tables (API field -> joined column)
+_DIMENSION_COLUMNS = {
+    "discovery_method": "dm.name",
+    "discovery_seed": "ds.discovery_seed",
+    "seed_name": "ds.seed_name",
+    "seed_smiles": "ds.seed_smiles",
+}
 
 
 # ---------------------------------------------------------------------------
@@ -66,6 +393,23 @@ class MoleculesQueryBody(BaseModel):
 
 app = FastAPI(title="Molecule Explorer API", lifespan=lifespan)
 app.add_middleware(CORSMiddleware, allow_origins=["*"], allow_methods=["*"], allow_headers=["*"])
+app.add_middleware(CompressionMiddleware, minimum_size=settings.compression_min_size)
+
+
+@app.middleware("http")
+async def record_latency(request: Request, call_next):
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        # Route template (e.g. /datasets/{dataset_id}/families), not the raw path, keeps labels bounded
+        route = request.scope.get("route")
+        metrics.REQUEST_SECONDS.labels(
+            request.method, route.path if route is not None else "unmatched", str(status)
+        ).observe(time.perf_counter() - start)
 
 
 # ---------------------------------------------------------------------------
@@ -73,11 +417,29 @@ app.add_middleware(CORSMiddleware, allow_origins=["*"], allow_methods=["*"], all
 # ---------------------------------------------------------------------------
 
 @app.get("/datasets")
-async def list_datasets(conn: asyncpg.Connection = Depends(get_conn)):
-    rows = await conn.fetch(
+async def list_datasets(
+    _cache: None = Depends(http_cache(route="browse")),
+    conn: asyncpg.Connection = Depends(conn_for("browse")),
+):
+    if analytics is not None:
+        metas = analytics.datasets()
+        return {
+            "datasets": [
+                {
+                    "dataset_id": m["dataset_id"],
+                    "name": m["name"],
+                    "created_at": m["created_at"],
+                    "molecule_count": m["molecule_count"],
+                    "version": m["version"],
+                }
+                for m in metas
+            ],
+            "total": len(metas),
+        }
+    rows = await _query(conn, "datasets.list", "fetch",
         """
         SELECT d.dataset_id, d.name, d.created_at,
-               (SELECT COUNT(*) FROM discovered_molecule m WHERE m.dataset_id = d.dataset_id) AS molecule_count
+               (SELECT COUNT(*) FROM discovered_molecule m WHERE m.dataset_key = d.dataset_key) AS molecule_count
         FROM dataset d
         ORDER BY d.created_at DESC
         """
@@ -89,6 +451,7 @@ async def list_datasets(conn: asyncpg.Connection = Depends(get_conn)):
                 "name": r["name"],
                 "created_at": r["created_at"].isoformat() if r["created_at"] else None,
                 "molecule_count": r["molecule_count"],
+                "version": await dataset_versions.get(pools.primary, r["dataset_id"]),
             }
             for r in rows
         ],
@@ -97,11 +460,14 @@ async def list_datasets(conn: asyncpg.Connection = Depends(get_conn)):
 
 
 @app.get("/datasets/{dataset_id}/families")
-async def list_families(dataset_id: str, conn: asyncpg.Connection = Depends(get_conn)):
-    rows = await conn.fetch(
-        "SELECT DISTINCT seed_name AS family FROM discovered_molecule WHERE dataset_id = $1 AND seed_name IS NOT NULL ORDER BY seed_name",
-        dataset_id,
-    )
+async def list_families(
+    dataset_id: str,
+    _cache: None = Depends(http_cache(route="browse")),
+    conn: asyncpg.Connection = Depends(conn_for("browse")),
+):
+    if analytics is not None:
+        return {"families": await conn.families(dataset_id), "dataset_id": dataset_id}
+    rows = await _query(conn, "families.list", "fetch", _FAMILIES_SQL, dataset_id)
     return {"families": [r["family"] for r in rows], "dataset_id": dataset_id}
 
 
@@ -109,19 +475,15 @@ async def list_families(dataset_id: str, conn: asyncpg.Connection = Depends(get_
 async def list_seeds(
     dataset_id: str,
     family: str | None = Query(None),
-    conn: asyncpg.Connection = Depends(get_conn),
+    _cache: None = Depends(http_cache(route="browse")),
+    conn: asyncpg.Connection = Depends(conn_for("browse")),
 ):
-    if family:
-        rows = await conn.fetch(
-            "SELECT DISTINCT discovery_seed, seed_name, seed_smiles FROM discovered_molecule WHERE dataset_id = $1 AND seed_name = $2 ORDER BY discovery_seed",
-            dataset_id,
-            family,
-        )
+    if analytics is not None:
+        rows = await conn.seeds(dataset_id, family)
+    elif family:
+        rows = await _query(conn, "seeds.by_family", "fetch", _SEEDS_BY_FAMILY_SQL, dataset_id, family)
     else:
-        rows = await conn.fetch(
-            "SELECT DISTINCT discovery_seed, seed_name, seed_smiles FROM discovered_molecule WHERE dataset_id = $1 ORDER BY seed_name, discovery_seed",
-            dataset_id,
-        )
+        rows = await _query(conn, "seeds.list", "fetch", _SEEDS_SQL, dataset_id)
     return {
         "seeds": [
             {"discovery_seed": r["discovery_seed"], "seed_name": r["seed_name"], "seed_smiles": r["seed_smiles"]}
@@ -136,23 +498,20 @@ async def list_seeds(
 # ---------------------------------------------------------------------------
 
 def _build_where(params: dict, body: MoleculesQueryBody) -> tuple[str, list]:
-    conditions = ["m.dataset_id = $1"]
+    conditions = [f"m.dataset_key = {_DATASET_KEY}"]
     args: list[Any] = [params["dataset_id"]]
     idx = 2
     if body.seed_name:
-        conditions.append(f"m.seed_name = ${idx}")
+        conditions.append(f"m.seed_key IN (SELECT seed_key FROM discovery_seed WHERE seed_name = ${idx})")
         args.append(body.seed_name)
         idx += 1
     if body.methods:
-        conditions.append(f"m.discovery_method = ANY(${idx}::text[])")
+        conditions.append(f"m.method_key IN (SELECT method_key FROM discovery_method WHERE name = ANY(${idx}::text[]))")
         args.append(body.methods)
         idx += 1
     if body.ranges:
         for field, pair in body.ranges.items():
-            if len(pair) >= 2 and field in (
-                "molecular_weight", "TPSA", "XLogP3", "HBA", "HBD", "rotatable_bonds",
-                "mmff94_energy", "shape_volume",
-            ):
+            if len(pair) >= 2 and field in _RANGE_FIELDS:
                 col = "m." + field if field in ("molecular_weight", "TPSA", "XLogP3", "HBA", "HBD", "rotatable_bonds") else "g." + field
                 if field in ("mmff94_energy", "shape_volume"):
                     conditions.append(f"g.cid = m.cid AND g.{field} IS NOT NULL AND g.{field} >= ${idx} AND g.{field} <= ${idx+1}")
@@ -163,81 +522,389 @@ def _build_where(params: dict, body: MoleculesQueryBody) -> tuple[str, list]:
     return " AND ".join(conditions), args
 
 
+def _query_shape(body: MoleculesQueryBody) -> str:
+    """Which filters and sorts shaped the SQL from _build_where, e.g. seed+methods+range:TPSA."""
+    parts = []
+    if body.seed_name:
+        parts.append("seed")
+    if body.methods:
+        parts.append("methods")
+    for field in sorted(body.ranges or {}):
+        if field in _RANGE_FIELDS:
+            parts.append(f"range:{field}")
+    # Only the leading sort key: labels stay bounded however many keys a client sends
+    if body.sort:
+        field = body.sort[0].field
+        known = field in _RANGE_FIELDS or field in _DIMENSION_COLUMNS or field == "cid"
+        parts.append(f"sort:{field if known else 'other'}")
+    return "+".join(parts) or "all"
+
+
+def _check_accuracy(body: MoleculesQueryBody) -> str:
+    if body.accuracy not in ACCURACY_MODES:
+        raise HTTPException(status_code=400, detail=f"accuracy must be one of {', '.join(ACCURACY_MODES)}")
+    return body.accuracy
+
+
+def _molecule_from(use_geom: bool, sampled: bool = False, use_dims: bool = False) -> str:
+    """FROM clause over the hot table, optionally block-sampled at settings.sample_percent.
+
+    Expects $1 to be the dataset_id, as in _build_where.
+    """
+    from_clause = "FROM discovered_molecule m"
+    if sampled:
+        from_clause += f" TABLESAMPLE SYSTEM ({float(settings.sample_percent)})"
+    if use_geom:
+        from_clause += " LEFT JOIN molecule_geometry g ON g.dataset_id = $1 AND g.cid = m.cid"
+    if use_dims:
+        from_clause += (
+            " LEFT JOIN discovery_method dm ON dm.method_key = m.method_key"
+            " LEFT JOIN discovery_seed ds ON ds.seed_key = m.seed_key"
+        )
+    return from_clause
+
+
+# Fixed-text queries, prepared on every new pool connection (see _WARM_QUERIES)
+_FAMILIES_SQL = f"""
+    SELECT DISTINCT s.seed_name AS family
+    FROM (SELECT DISTINCT seed_key FROM discovered_molecule WHERE dataset_key = {_DATASET_KEY}) k
+    JOIN discovery_seed s ON s.seed_key = k.seed_key
+    WHERE s.seed_name IS NOT NULL
+    ORDER BY s.seed_name
+"""
+# LEFT JOIN keeps the all-NULL row for molecules without a seed, as before normalization
+_DATASET_SEEDS = f"""
+    SELECT DISTINCT s.discovery_seed, s.seed_name, s.seed_smiles
+    FROM (SELECT DISTINCT seed_key FROM discovered_molecule WHERE dataset_key = {_DATASET_KEY}) k
+    LEFT JOIN discovery_seed s ON s.seed_key = k.seed_key
+"""
+_SEEDS_SQL = f"{_DATASET_SEEDS} ORDER BY s.seed_name, s.discovery_seed"
+_SEEDS_BY_FAMILY_SQL = f"{_DATASET_SEEDS} WHERE s.seed_name = $2 ORDER BY s.discovery_seed"
+_DIMENSION_METHODS_SQL = "SELECT method_key, name FROM discovery_method WHERE method_key = ANY($1::smallint[])"
+_DIMENSION_SEEDS_SQL = (
+    "SELECT seed_key, discovery_seed, seed_name, seed_smiles FROM discovery_seed WHERE seed_key = ANY($1::int[])"
+)
+_MOLECULE_DETAIL_SQL = f"""
+    SELECT m.cid, m.smiles, m.inchi_key, m.molecular_formula, m.molecular_weight, m.exact_mass,
+           m.xlogp3, m.tpsa, m.hba, m.hbd, m.rotatable_bonds, dm.name AS discovery_method,
+           ds.discovery_seed, ds.seed_name, ds.seed_smiles, m.name
+    {_molecule_from(False, use_dims=True)}
+    WHERE m.dataset_key = {_DATASET_KEY} AND m.cid = $2
+"""
+_MOLECULE_GEOMETRY_SQL = (
+    "SELECT conformer_id, mmff94_energy, conformer_rmsd, effective_rotor_count, shape_volume, shape_selfoverlap,"
+    " heavy_atom_count, component_count FROM molecule_geometry WHERE dataset_id = $1 AND cid = $2"
+)
+_GEOMETRY_MOLBLOCK_SQL = "SELECT molblock FROM molecule_geometry_cold WHERE dataset_id = $1 AND cid = $2"
+_RUN_SQL = (
+    "SELECT run_id, dataset_id, started_at, finished_at, status, stats, created_at FROM ingest_run WHERE run_id = $1"
+)
+_RUN_EVENT_SQL = "SELECT status, stats, started_at, finished_at FROM ingest_run WHERE run_id = $1"
+
+# Per pool set: (query, args that match no rows). Running each once when a connection opens
+# puts it in asyncpg's statement cache, so the first real request skips Parse/Describe.
+_WARM_QUERIES = {
+    "hot": [
+        (_FAMILIES_SQL, ("",)),
+        (_SEEDS_SQL, ("",)),
+        (_SEEDS_BY_FAMILY_SQL, ("", "")),
+        (_DIMENSION_METHODS_SQL, ([],)),
+        (_DIMENSION_SEEDS_SQL, ([],)),
+        (_MOLECULE_DETAIL_SQL, ("", 0)),
+        (_MOLECULE_GEOMETRY_SQL, ("", 0)),
+    ],
+    "cold": [(_GEOMETRY_MOLBLOCK_SQL, ("", 0))],
+    "primary": [(_RUN_SQL, ("",)), (_RUN_EVENT_SQL, ("",))],
+}
+
+
+async def _dimension_labels(
+    conn: asyncpg.Connection, rows: list[asyncpg.Record]
+) -> tuple[dict[int, str], dict[int, asyncpg.Record]]:
+    """Method names and seed rows for the keys on a page of hot-table rows."""
+    method_keys = sorted({r["method_key"] for r in rows})
+    seed_keys = sorted({r["seed_key"] for r in rows if r["seed_key"] is not None})
+    methods = {}
+    seeds = {}
+    if method_keys:
+        methods = {
+            r["method_key"]: r["name"]
+            for r in await _query(conn, "dimensions.methods", "fetch",
+                _DIMENSION_METHODS_SQL, method_keys
+            )
+        }
+    if seed_keys:
+        seeds = {
+            r["seed_key"]: r
+            for r in await _query(conn, "dimensions.seeds", "fetch", _DIMENSION_SEEDS_SQL, seed_keys)
+        }
+    return methods, seeds
+
+
+# Fewer matches than this in a sample are recounted exactly. SYSTEM sampling takes whole pages
+# (whole vectors in DuckDB), so when matching rows are clustered a few hits, or none, say little
+# about the total; a small dataset can miss every matching page.
+SAMPLED_MIN_HITS = 30
+
+
+def _scale_sample_count(n: int) -> tuple[int, list[int]]:
+    """Scale a count seen in the sample to the full table; return (estimate, [lo, hi]) at ~95%.
+
+    Treats each row as included independently with probability p (a binomial interval).
+    SYSTEM sampling picks whole pages, so on clustered data the true variance is higher and
+    this interval understates it; callers recount below SAMPLED_MIN_HITS rather than trust it.
+    A sample with no matches only shows the count is small: the upper bound then comes from
+    the rule of three (3 / p), not a [0, 0] range.
+    """
+    p = min(max(float(settings.sample_percent), 0.0001), 100.0) / 100.0
+    if n == 0:
+        return 0, [0, math.ceil(3.0 / p) if p < 1.0 else 0]
+    est = n / p
+    half = 1.96 * math.sqrt(n * (1.0 - p)) / p
+    return round(est), [max(n, math.floor(est - half)), math.ceil(est + half)]
+
+
+async def _planner_rows(conn: asyncpg.Connection, template: str, from_where: str, args: list) -> int:
+    """Planner row estimate for SELECT 1 {from_where}."""
+    plan = await _query(conn, template, "fetchval", f"EXPLAIN (FORMAT JSON) SELECT 1 {from_where}", *args)
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+async def _histogram_bounds(conn: asyncpg.Connection, col: str) -> tuple[float | None, float | None]:
+    """(min, max) from pg_stats histogram bounds for an aliased column like m.tpsa (whole table, unfiltered)."""
+    alias, _, attname = col.partition(".")
+    table = "molecule_geometry" if alias == "g" else "discovered_molecule"
+    bounds = await _query(conn, "pg_stats.histogram_bounds", "fetchval",
+        "SELECT histogram_bounds::text::float8[] FROM pg_stats WHERE tablename = $1 AND attname = $2",
+        table,
+        attname.lower(),
+    )
+    if not bounds:
+        return None, None
+    return float(bounds[0]), float(bounds[-1])
+
+
+# format=ndjson rows per cursor fetch and per flushed chunk
+NDJSON_BATCH_ROWS = 500
+
+QUERY_FORMATS = ("json", "ndjson")
+
+
+def _molecule_item(r: asyncpg.Record, discovery_method: str | None, seed: Any) -> dict[str, Any]:
+    """One /molecules/query row; seed is any mapping with discovery_seed / seed_name (or None)."""
+    return {
+        "cid": r["cid"],
+        "smiles": r["smiles"],
+        "inchi_key": r["inchi_key"],
+        "molecular_formula": r["molecular_formula"],
+        "molecular_weight": r["molecular_weight"],
+        "exact_mass": r["exact_mass"],
+        "xlogp3": r["xlogp3"],
+        "tpsa": r["tpsa"],
+        "hba": r["hba"],
+        "hbd": r["hbd"],
+        "rotatable_bonds": r["rotatable_bonds"],
+        "discovery_method": discovery_method,
+        "discovery_seed": seed["discovery_seed"] if seed is not None else None,
+        "seed_name": seed["seed_name"] if seed is not None else None,
+        "name": r["name"],
+    }
+
+
+async def _query_molecules_duckdb(
+    session: AnalyticsSession, dataset_id: str, body: MoleculesQueryBody, page: Page, accuracy: str
+):
+    """query_molecules on the DuckDB backend: the same responses, read from the Parquet snapshot.
+
+    accuracy=estimate gets an exact count (there are no planner statistics, and a columnar COUNT
+    is cheap) and is reported as exact.
+    """
+    try:
+        order_by(body)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if accuracy == "estimate":
+        accuracy = "exact"
+
+    async def page_total() -> tuple[int, list[int] | None]:
+        if accuracy == "sampled":
+            sampled = await session.count(dataset_id, body, settings.sample_percent)
+            if sampled >= SAMPLED_MIN_HITS:
+                return _scale_sample_count(sampled)
+        total = await session.count(dataset_id, body)
+        # A recount is exact, so its bounds collapse to it
+        return total, [total, total] if accuracy == "sampled" else None
+
+    if body.format == "ndjson":
+        async def stream():
+            async for rows in session.stream(dataset_id, body, page.limit, page.offset, NDJSON_BATCH_ROWS):
+                yield "\n".join(json.dumps(_molecule_item(r, r["discovery_method"], r)) for r in rows) + "\n"
+            total, total_bounds = await page_total()
+            summary = {"total": total, "limit": page.limit, "offset": page.offset, "accuracy": accuracy}
+            if total_bounds is not None:
+                summary["total_bounds"] = total_bounds
+            yield json.dumps({"summary": summary}) + "\n"
+
+        return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+    rows = await session.page(dataset_id, body, page.limit, page.offset)
+    total, total_bounds = await page_total()
+    out = {
+        "molecules": [_molecule_item(r, r["discovery_method"], r) for r in rows],
+        "total": total,
+        "limit": page.limit,
+        "offset": page.offset,
+        "accuracy": accuracy,
+    }
+    if total_bounds is not None:
+        out["total_bounds"] = total_bounds
+    return out
+
+
 @app.post("/datasets/{dataset_id}/molecules/query")
 async def query_molecules(
     dataset_id: str,
     body: MoleculesQueryBody,
-    conn: asyncpg.Connection = Depends(get_conn),
+    conn: asyncpg.Connection = Depends(conn_for("query")),
 ):
+    """One page of molecules plus the total matching the filters.
+
+    With format=ndjson the page is streamed from a server-side cursor as one JSON object per
+    line, ending with a {"summary": {...}} line carrying total / limit / offset / accuracy, so
+    time to first row and server memory do not grow with page.limit.
+    """
     page = body.page or Page()
+    accuracy = _check_accuracy(body)
+    if body.format not in QUERY_FORMATS:
+        raise HTTPException(status_code=400, detail=f"format must be one of {', '.join(QUERY_FORMATS)}")
+    if analytics is not None:
+        return await _query_molecules_duckdb(conn, dataset_id, body, page, accuracy)
     where, args = _build_where({"dataset_id": dataset_id}, body)
-    use_geom = (
+    shape = _query_shape(body)
+    use_geom = bool(
         (body.ranges and any(k in ("mmff94_energy", "shape_volume") for k in body.ranges))
         or (body.sort and any(s.field in ("mmff94_energy", "shape_volume") for s in (body.sort or [])))
     )
-    from_clause = "FROM discovered_molecule m"
-    if use_geom:
-        from_clause += " LEFT JOIN molecule_geometry g ON g.dataset_id = m.dataset_id AND g.cid = m.cid"
+    use_dims = bool(body.sort and any(s.field in _DIMENSION_COLUMNS for s in body.sort))
+    from_clause = _molecule_from(use_geom)
     order = "m.cid ASC"
     if body.sort and body.sort:
         parts = []
         for s in body.sort:
-            col = f"g.{s.field}" if s.field in ("mmff94_energy", "shape_volume") else f"m.{s.field}"
+            if s.field in _DIMENSION_COLUMNS:
+                col = _DIMENSION_COLUMNS[s.field]
+            else:
+                col = f"g.{s.field}" if s.field in ("mmff94_energy", "shape_volume") else f"m.{s.field}"
             parts.append(f"{col} {'ASC' if s.dir == 'asc' else 'DESC'}")
         order = ", ".join(parts)
     n = len(args)
     args.extend([page.limit, page.offset])
-    rows = await conn.fetch(
-        f"""
-        SELECT m.cid, m.smiles, m.inchi_key, m.molecular_formula, m.molecular_weight, m.exact_mass,
-               m.xlogp3, m.tpsa, m.hba, m.hbd, m.rotatable_bonds, m.discovery_method, m.discovery_seed, m.seed_name, m.name
-        {from_clause}
-        WHERE {where}
-        ORDER BY {order}
-        LIMIT ${n + 1} OFFSET ${n + 2}
-        """,
-        *args,
-    )
-    total = await conn.fetchval(
-        f"SELECT COUNT(*) {from_clause} WHERE {where}",
-        *args[:n],
-    )
-    return {
-        "molecules": [
-            {
-                "cid": r["cid"],
-                "smiles": r["smiles"],
-                "inchi_key": r["inchi_key"],
-                "molecular_formula": r["molecular_formula"],
-                "molecular_weight": r["molecular_weight"],
-                "exact_mass": r["exact_mass"],
-                "xlogp3": r["xlogp3"],
-                "tpsa": r["tpsa"],
-                "hba": r["hba"],
-                "hbd": r["hbd"],
-                "rotatable_bonds": r["rotatable_bonds"],
-                "discovery_method": r["discovery_method"],
-                "discovery_seed": r["discovery_seed"],
-                "seed_name": r["seed_name"],
-                "name": r["name"],
-            }
-            for r in rows
-        ],
+    columns = """
+        m.cid, m.smiles, m.inchi_key, m.molecular_formula, m.molecular_weight, m.exact_mass,
+        m.xlogp3, m.tpsa, m.hba, m.hbd, m.rotatable_bonds, m.method_key, m.seed_key, m.name
+    """
+
+    def page_sql(columns: str, dims: bool) -> str:
+        return f"""
+            SELECT {columns}
+            {_molecule_from(use_geom, use_dims=dims)}
+            WHERE {where}
+            ORDER BY {order}
+            LIMIT ${n + 1} OFFSET ${n + 2}
+        """
+
+    async def page_total() -> tuple[int, list[int] | None]:
+        if accuracy == "sampled":
+            sampled = await _query(conn, f"query.count_sampled:{shape}", "fetchval",
+                f"SELECT COUNT(*) {_molecule_from(use_geom, sampled=True)} WHERE {where}",
+                *args[:n],
+            )
+            if sampled >= SAMPLED_MIN_HITS:
+                return _scale_sample_count(sampled)
+        elif accuracy == "estimate":
+            return await _planner_rows(conn, f"query.estimate:{shape}", f"{from_clause} WHERE {where}", args[:n]), None
+        total = await _query(conn, f"query.count:{shape}", "fetchval",
+            f"SELECT COUNT(*) {from_clause} WHERE {where}",
+            *args[:n],
+        )
+        # A recount is exact, so its bounds collapse to it
+        return total, [total, total] if accuracy == "sampled" else None
+
+    if body.format == "ndjson":
+        # Dimension labels are joined in SQL: the page is never held in memory to collect its keys
+        sql = page_sql(columns + ", dm.name AS discovery_method, ds.discovery_seed, ds.seed_name", True)
+
+        async def stream():
+            lines = []
+            async with conn.transaction(readonly=True):
+                async for r in _cursor(conn, f"query.stream:{shape}", sql, *args, prefetch=NDJSON_BATCH_ROWS):
+                    lines.append(json.dumps(_molecule_item(r, r["discovery_method"], r)))
+                    if len(lines) >= NDJSON_BATCH_ROWS:
+                        yield "\n".join(lines) + "\n"
+                        lines = []
+            if lines:
+                yield "\n".join(lines) + "\n"
+            total, total_bounds = await page_total()
+            summary = {"total": total, "limit": page.limit, "offset": page.offset, "accuracy": accuracy}
+            if total_bounds is not None:
+                summary["total_bounds"] = total_bounds
+            yield json.dumps({"summary": summary}) + "\n"
+
+        return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+    rows = await _query(conn, f"query.page:{shape}", "fetch", page_sql(columns, use_dims), *args)
+    methods, seeds = await _dimension_labels(conn, rows)
+    total, total_bounds = await page_total()
+    out = {
+        "molecules": [_molecule_item(r, methods.get(r["method_key"]), seeds.get(r["seed_key"])) for r in rows],
         "total": total,
         "limit": page.limit,
         "offset": page.offset,
+        "accuracy": accuracy,
     }
+    if total_bounds is not None:
+        out["total_bounds"] = total_bounds
+    return out
 
 
 @app.post("/datasets/{dataset_id}/molecules/aggregates")
 async def aggregates_molecules(
     dataset_id: str,
     body: MoleculesQueryBody,
-    conn: asyncpg.Connection = Depends(get_conn),
+    _cache: None = Depends(http_cache(route="aggregates")),
+    conn: asyncpg.Connection = Depends(conn_for("aggregates")),
 ):
-    """Return histogram bins for numeric fields. Request body can include same filters as query."""
+    """Return histogram bins for numeric fields. Request body can include same filters as query.
+
+    With accuracy=sampled, min/max come from the sample (the true range is at least as wide)
+    and counts carry count_bounds; a field with fewer than SAMPLED_MIN_HITS sampled rows is
+    recounted exactly (count_bounds [n, n]). With accuracy=estimate, counts are planner
+    estimates and min/max are pg_stats histogram bounds over every dataset in the table,
+    marked "min_max_scope": "all_datasets".
+    """
+    accuracy = _check_accuracy(body)
+    if analytics is not None:
+        # One scan for every field's count/min/max; estimate is answered exactly (see _query_molecules_duckdb)
+        sampled = accuracy == "sampled"
+        stats = await conn.aggregates(dataset_id, body, settings.sample_percent if sampled else None)
+        recount = {name for name, (n, _, _) in stats.items() if sampled and n < SAMPLED_MIN_HITS}
+        if recount:
+            exact = await conn.aggregates(dataset_id, body)
+            stats.update((name, exact[name]) for name in recount)
+        result = {}
+        for name, (n, lo, hi) in stats.items():
+            if n > 0:
+                result[name] = {"count": n, "min": float(lo) if lo is not None else None, "max": float(hi) if hi is not None else None}
+                if sampled:
+                    result[name]["count"], result[name]["count_bounds"] = (
+                        (n, [n, n]) if name in recount else _scale_sample_count(n)
+                    )
+        return {"aggregates": result, "dataset_id": dataset_id, "accuracy": "sampled" if sampled else "exact"}
     where, args = _build_where({"dataset_id": dataset_id}, body)
-    from_clause = "FROM discovered_molecule m LEFT JOIN molecule_geometry g ON g.dataset_id = m.dataset_id AND g.cid = m.cid"
+    shape = _query_shape(body)
+    from_clause = _molecule_from(True, sampled=accuracy == "sampled")
     fields = [
         ("molecular_weight", "m.molecular_weight"),
         ("TPSA", "m.tpsa"),
@@ -250,33 +917,41 @@ async def aggregates_molecules(
     ]
     result = {}
     for name, col in fields:
-        row = await conn.fetchrow(
-            f"SELECT COUNT(*) AS n, MIN({col}) AS lo, MAX({col}) AS hi {from_clause} WHERE {where} AND {col} IS NOT NULL",
-            *args,
-        )
+        if accuracy == "estimate":
+            n = await _planner_rows(
+                conn, f"aggregates.estimate:{shape}", f"{from_clause} WHERE {where} AND {col} IS NOT NULL", args
+            )
+            if n > 0:
+                lo, hi = await _histogram_bounds(conn, col)
+                result[name] = {"count": n, "min": lo, "max": hi, "min_max_scope": "all_datasets"}
+            continue
+        def field_sql(from_clause: str) -> str:
+            return f"SELECT COUNT(*) AS n, MIN({col}) AS lo, MAX({col}) AS hi {from_clause} WHERE {where} AND {col} IS NOT NULL"
+
+        row = await _query(conn, f"aggregates.{name}:{shape}", "fetchrow", field_sql(from_clause), *args)
+        recounted = accuracy == "sampled" and row["n"] < SAMPLED_MIN_HITS
+        if recounted:
+            row = await _query(conn, f"aggregates.{name}:{shape}", "fetchrow", field_sql(_molecule_from(True)), *args)
         if row and row["n"] and row["n"] > 0:
             result[name] = {"count": row["n"], "min": float(row["lo"]) if row["lo"] is not None else None, "max": float(row["hi"]) if row["hi"] is not None else None}
-    return {"aggregates": result, "dataset_id": dataset_id}
+            if accuracy == "sampled":
+                result[name]["count"], result[name]["count_bounds"] = (
+                    (row["n"], [row["n"], row["n"]]) if recounted else _scale_sample_count(row["n"])
+                )
+    return {"aggregates": result, "dataset_id": dataset_id, "accuracy": accuracy}
 
 
 @app.get("/datasets/{dataset_id}/molecules/{cid}")
 async def get_molecule(
     dataset_id: str,
     cid: int,
-    conn: asyncpg.Connection = Depends(get_conn),
+    _cache: None = Depends(http_cache()),
+    conn: asyncpg.Connection = Depends(conn_for("detail")),
 ):
-    r = await conn.fetchrow(
-        "SELECT cid, smiles, inchi_key, molecular_formula, molecular_weight, exact_mass, xlogp3, tpsa, hba, hbd, rotatable_bonds, discovery_method, discovery_seed, seed_name, seed_smiles, name FROM discovered_molecule WHERE dataset_id = $1 AND cid = $2",
-        dataset_id,
-        cid,
-    )
+    r = await _query(conn, "molecule.detail", "fetchrow", _MOLECULE_DETAIL_SQL, dataset_id, cid)
     if not r:
         raise HTTPException(status_code=404, detail="Molecule not found")
-    g = await conn.fetchrow(
-        "SELECT conformer_id, mmff94_energy, conformer_rmsd, effective_rotor_count, shape_volume, shape_selfoverlap, heavy_atom_count, component_count FROM molecule_geometry WHERE dataset_id = $1 AND cid = $2",
-        dataset_id,
-        cid,
-    )
+    g = await _query(conn, "molecule.geometry", "fetchrow", _MOLECULE_GEOMETRY_SQL, dataset_id, cid)
     out = {
         "cid": r["cid"],
         "smiles": r["smiles"],
@@ -313,33 +988,269 @@ async def get_molecule(
 async def get_geometry(
     dataset_id: str,
     cid: int,
+    response: Response,
     format: str = Query("molblock", description="molblock or moleculoids_json"),
-    conn: asyncpg.Connection = Depends(get_conn),
+    v: str | None = Query(None, description="dataset version from GET /datasets; makes the response immutable"),
+    _cache: None = Depends(http_cache(immutable=True)),
+    conn: asyncpg.Connection = Depends(conn_for("geometry")),
 ):
-    cold = await conn.fetchrow(
-        "SELECT molblock FROM molecule_geometry_cold WHERE dataset_id = $1 AND cid = $2",
-        dataset_id,
-        cid,
-    )
+    if response.headers.get("Cache-Control") == IMMUTABLE_CACHE_CONTROL:
+        # http_cache matched ?v against the primary, but a lagging replica may serve older rows.
+        # Read before the body: a replica that has this version will not return anything older.
+        row = await _query(conn, "geometry.version", "fetchrow", DATASET_VERSION_SQL, dataset_id)
+        if version_token(row["runs"], row["finished_at"]) != v:
+            del response.headers["ETag"]
+            response.headers["Cache-Control"] = "no-cache"
+    cold = await _query(conn, "geometry.molblock", "fetchrow", _GEOMETRY_MOLBLOCK_SQL, dataset_id, cid)
     if not cold or not cold["molblock"]:
         raise HTTPException(status_code=404, detail="Geometry not found")
     molblock = cold["molblock"]
     if format == "moleculoids_json":
         try:
-            data = molblock_to_moleculoids_json(molblock)
+            with metrics.RDKIT_SECONDS.time():
+                data = molblock_to_moleculoids_json(molblock)
             return data
         except ValueError as e:
             raise HTTPException(status_code=400, detail=str(e))
     return molblock
 
 
+# dataset_id -> loaded ingest.neighbors.NeighborIndex, replaced when the file on disk is rebuilt
+_neighbor_indexes: dict[str, Any] = {}
+_neighbor_locks: dict[str, asyncio.Lock] = {}
+
+_NEIGHBOR_ROWS_SQL = f"""
+    SELECT m.cid, m.name, m.smiles, m.molecular_weight, m.tpsa, m.xlogp3, m.hba, m.hbd, m.rotatable_bonds,
+           g.shape_volume, g.mmff94_energy
+    {_molecule_from(True)}
+    WHERE m.dataset_key = {_DATASET_KEY} AND m.cid = ANY($2::int[])
+"""
+
+
+def _neighbor_index_stamp(dataset_id: str) -> str:
+    """mtime of the dataset's index file, for the ETag: the CLI rebuilds it after the run that
+    bumps the dataset version has finished, so the version alone would cache stale neighbours.
+    """
+    try:
+        return str((Path(settings.neighbor_index_dir) / f"{Path(dataset_id).name}.npz").stat().st_mtime_ns)
+    except OSError:
+        return "none"
+
+
+async def _neighbor_index(dataset_id: str):
+    """The dataset's index, loaded off the event loop on first use; None if it has not been built."""
+    # numpy and scipy load with the first neighbour request, not at startup
+    from ingest import neighbors
+
+    path = neighbors.index_path(dataset_id, Path(settings.neighbor_index_dir))
+    try:
+        mtime = path.stat().st_mtime
+    except FileNotFoundError:
+        return None
+    index = _neighbor_indexes.get(dataset_id)
+    if index is not None and index.mtime == mtime:
+        return index
+    async with _neighbor_locks.setdefault(dataset_id, asyncio.Lock()):
+        index = _neighbor_indexes.get(dataset_id)
+        if index is None or index.mtime != mtime:
+            index = await asyncio.to_thread(neighbors.NeighborIndex, path)
+            _neighbor_indexes[dataset_id] = index
+    return index
+
+
+@app.get("/datasets/{dataset_id}/molecules/{cid}/neighbors")
+async def get_neighbors(
+    dataset_id: str,
+    cid: int,
+    k: int = Query(10, ge=1, le=1000),
+    method: list[str] | None = Query(None, description="Only neighbours found by these discovery methods"),
+    seed_name: str | None = Query(None, description="Only neighbours from this seed family"),
+    _cache: None = Depends(http_cache(variant=_neighbor_index_stamp)),
+    conn: asyncpg.Connection = Depends(conn_for("detail")),
+):
+    """k nearest molecules in standardized descriptor space (MW, TPSA, XLogP3, HBA, HBD, rotatable
+    bonds, shape_volume, mmff94_energy), served from the dataset's prebuilt index.
+    """
+    if Path(dataset_id).name != dataset_id:
+        raise HTTPException(status_code=404, detail="Dataset not found")
+    index = await _neighbor_index(dataset_id)
+    if index is None:
+        raise HTTPException(
+            status_code=404,
+            detail=f"No neighbour index for {dataset_id}; build it with python -m ingest.cli index --dataset-id {dataset_id}",
+        )
+    method_keys = seed_keys = None
+    if method:
+        method_keys = tuple(sorted(
+            r["method_key"] for r in await _query(conn, "neighbors.method_keys", "fetch",
+                "SELECT method_key FROM discovery_method WHERE name = ANY($1::text[])", method,
+            )
+        ))
+    if seed_name:
+        seed_keys = tuple(sorted(
+            r["seed_key"] for r in await _query(conn, "neighbors.seed_keys", "fetch",
+                "SELECT seed_key FROM discovery_seed WHERE seed_name = $1", seed_name,
+            )
+        ))
+    if (method_keys is not None and not method_keys) or (seed_keys is not None and not seed_keys):
+        hits = [] if index.row(cid) is not None else None
+    else:
+        hits = await asyncio.to_thread(index.query, cid, k, method_keys, seed_keys)
+    if hits is None:
+        raise HTTPException(status_code=404, detail="Molecule not in the neighbour index")
+    rows = {}
+    if hits:
+        rows = {
+            r["cid"]: r
+            for r in await _query(conn, "neighbors.rows", "fetch", _NEIGHBOR_ROWS_SQL, dataset_id, [c for c, _ in hits])
+        }
+    return {
+        "dataset_id": dataset_id,
+        "cid": cid,
+        "k": k,
+        "descriptors": index.meta["descriptors"],
+        "neighbors": [
+            {
+                "cid": c,
+                "distance": round(d, 4),
+                "name": rows[c]["name"],
+                "smiles": rows[c]["smiles"],
+                "molecular_weight": rows[c]["molecular_weight"],
+                "TPSA": rows[c]["tpsa"],
+                "XLogP3": rows[c]["xlogp3"],
+                "HBA": rows[c]["hba"],
+                "HBD": rows[c]["hbd"],
+                "rotatable_bonds": rows[c]["rotatable_bonds"],
+                "shape_volume": rows[c]["shape_volume"],
+                "mmff94_energy": rows[c]["mmff94_energy"],
+            }
+            # A molecule deleted since the index was built is dropped rather than reported half-empty
+            for c, d in hits
+            if c in rows
+        ],
+    }
+
+
+# ---------------------------------------------------------------------------
+# Ingest jobs
+# ---------------------------------------------------------------------------
+
+# run_id -> ingest CLI subprocess started by POST /ingest (kept so it can be reaped and
+# so /runs/{run_id}/events can tell "not started yet" from "exited without a run row")
+_ingest_jobs: dict[str, asyncio.subprocess.Process] = {}
+_ingest_waiters: set[asyncio.Task] = set()
+# Held from the "job already running" check until the new job is registered
+_ingest_lock = asyncio.Lock()
+
+# Finished jobs remembered for /runs/{run_id}/events; older ones are forgotten
+INGEST_JOBS_KEPT = 100
+
+# stdout/stderr of each ingest subprocess, as {run_id}.log
+INGEST_LOG_DIR = Path(__file__).resolve().parent.parent / "data" / "ingest_logs"
+
+# Lines of a failed job's log returned in its final event
+INGEST_LOG_TAIL = 20
+
+# Seconds between ingest_run polls in /runs/{run_id}/events
+RUN_EVENTS_INTERVAL = 1.0
+
+
+def _prune_ingest_jobs() -> None:
+    finished = [run_id for run_id, proc in _ingest_jobs.items() if proc.returncode is not None]
+    for run_id in finished[:max(0, len(finished) - INGEST_JOBS_KEPT)]:
+        del _ingest_jobs[run_id]
+
+
+def _ingest_paths(paths: list[str]) -> list[Path]:
+    """Resolve the requested input files; 400 unless each is a file under INGEST_ROOT."""
+    root = Path(settings.ingest_root).resolve()
+    resolved = [Path(p).resolve() for p in paths]
+    outside = [p for p, r in zip(paths, resolved) if not r.is_relative_to(root)]
+    if outside:
+        raise HTTPException(status_code=400, detail=f"Paths outside INGEST_ROOT: {outside}")
+    missing = [p for p, r in zip(paths, resolved) if not r.is_file()]
+    if missing:
+        raise HTTPException(status_code=400, detail=f"Files not found: {missing}")
+    return resolved
+
+
+def _check_ingest_access(request: Request) -> None:
+    """401 without the INGEST_TOKEN bearer token; with no token set, 403 unless the request is
+    from this machine and not from a browser page (CORS allows any origin to reach the API)."""
+    if settings.ingest_token:
+        if request.headers.get("authorization") != f"Bearer {settings.ingest_token}":
+            raise HTTPException(status_code=401, detail="Missing or invalid ingest token")
+        return
+    try:
+        loopback = request.client is not None and ipaddress.ip_address(request.client.host).is_loopback
+    except ValueError:
+        loopback = False
+    if not loopback or "origin" in request.headers:
+        raise HTTPException(status_code=403, detail="Set INGEST_TOKEN to start ingest jobs from other clients")
+
+
+def _log_tail(run_id: str) -> list[str]:
+    try:
+        lines = (INGEST_LOG_DIR / f"{run_id}.log").read_text(errors="replace").splitlines()
+    except FileNotFoundError:
+        return []
+    return lines[-INGEST_LOG_TAIL:]
+
+
+@app.post("/ingest", status_code=202)
+async def start_ingest(body: IngestJobBody, request: Request):
+    """Run the CSV or SDF ingest CLI in a separate process; progress lands in ingest_run.stats.
+
+    One job runs at a time (409 otherwise), since each one starts its own worker processes.
+    """
+    _check_ingest_access(request)
+    if pools.primary is None:
+        raise HTTPException(status_code=503, detail="No database configured (DATABASE_URL is empty)")
+    if body.kind not in ("csv", "sdf"):
+        raise HTTPException(status_code=400, detail="kind must be csv or sdf")
+    if not body.paths or (body.kind == "csv" and len(body.paths) != 1):
+        raise HTTPException(status_code=400, detail="csv takes exactly one path, sdf one or more")
+    paths = _ingest_paths(body.paths)
+    async with _ingest_lock:
+        active = [run_id for run_id, proc in _ingest_jobs.items() if proc.returncode is None]
+        if active:
+            raise HTTPException(status_code=409, detail=f"Ingest job {active[0]} is still running")
+        _prune_ingest_jobs()
+        run_id = str(uuid.uuid4())
+        cmd = [sys.executable, "-m", "ingest.cli", body.kind, "--dataset-id", body.dataset_id, "--run-id", run_id]
+        if body.kind == "csv" and body.name:
+            cmd += ["--name", body.name]
+        if body.kind == "sdf":
+            cmd += ["--jobs", str(max(1, body.jobs))]
+        if body.force:
+            cmd.append("--force")
+        if body.parquet:
+            cmd.append("--parquet")
+        cmd += [str(p) for p in paths]
+        INGEST_LOG_DIR.mkdir(parents=True, exist_ok=True)
+        # The child keeps its own handle, so ours is closed once it has started
+        with open(INGEST_LOG_DIR / f"{run_id}.log", "wb") as log:
+            proc = await asyncio.create_subprocess_exec(
+                *cmd,
+                cwd=str(Path(__file__).resolve().parent.parent),
+                env={**os.environ, "DATABASE_URL": settings.database_url},
+                stdout=log,
+                stderr=asyncio.subprocess.STDOUT,
+            )
+        _ingest_jobs[run_id] = proc
+    waiter = asyncio.create_task(proc.wait())
+    _ingest_waiters.add(waiter)
+    waiter.add_done_callback(_ingest_waiters.discard)
+    return {"run_id": run_id, "status": "queued", "events": f"/runs/{run_id}/events"}
+
+
 # ---------------------------------------------------------------------------
 # Runs
 # ---------------------------------------------------------------------------
 
 @app.get("/runs")
-async def list_runs(conn: asyncpg.Connection = Depends(get_conn)):
-    rows = await conn.fetch(
+async def list_runs(conn: asyncpg.Connection = Depends(conn_for("runs"))):
+    rows = await _query(conn, "runs.list", "fetch",
         "SELECT run_id, dataset_id, started_at, finished_at, status, stats, created_at FROM ingest_run ORDER BY started_at DESC LIMIT 100"
     )
     return {
@@ -359,11 +1270,8 @@ async def list_runs(conn: asyncpg.Connection = Depends(get_conn)):
 
 
 @app.get("/runs/{run_id}")
-async def get_run(run_id: str, conn: asyncpg.Connection = Depends(get_conn)):
-    r = await conn.fetchrow(
-        "SELECT run_id, dataset_id, started_at, finished_at, status, stats, created_at FROM ingest_run WHERE run_id = $1",
-        run_id,
-    )
+async def get_run(run_id: str, conn: asyncpg.Connection = Depends(conn_for("runs"))):
+    r = await _query(conn, "runs.get", "fetchrow", _RUN_SQL, run_id)
     if not r:
         raise HTTPException(status_code=404, detail="Run not found")
     return {
@@ -377,6 +1285,116 @@ async def get_run(run_id: str, conn: asyncpg.Connection = Depends(get_conn)):
     }
 
 
+async def _run_event(run_id: str) -> tuple[dict, bool]:
+    """Current state of a run for the event stream; (payload, finished)."""
+    if pools.primary is None:
+        raise HTTPException(status_code=503, detail="No database configured (DATABASE_URL is empty)")
+    # Short-lived acquire per poll so an open stream does not pin a pool connection
+    async with pools.primary.acquire() as conn:
+        r = await _query(conn, "runs.events", "fetchrow", _RUN_EVENT_SQL, run_id)
+    proc = _ingest_jobs.get(run_id)
+    if r:
+        stats = json.loads(r["stats"]) if isinstance(r["stats"], str) else r["stats"]
+        payload = {
+            "run_id": run_id,
+            "status": r["status"],
+            "started_at": r["started_at"].isoformat() if r["started_at"] else None,
+            "finished_at": r["finished_at"].isoformat() if r["finished_at"] else None,
+            "stats": stats,
+        }
+        if r["status"] == "running" and proc is not None and proc.returncode is not None:
+            # Killed (e.g. OOM) before it could call fail_run: the row would say running forever
+            payload.update(status="failed", returncode=proc.returncode, log=_log_tail(run_id))
+        return payload, payload["status"] != "running"
+    if proc is None:
+        return {"run_id": run_id, "status": "not_found"}, True
+    if proc.returncode is None:
+        return {"run_id": run_id, "status": "queued"}, False
+    # The CLI exits without creating a run when every input file is unchanged
+    if proc.returncode == 0:
+        return {"run_id": run_id, "status": "skipped", "returncode": 0}, True
+    return {"run_id": run_id, "status": "failed", "returncode": proc.returncode, "log": _log_tail(run_id)}, True
+
+
+@app.get("/runs/{run_id}/events")
+async def run_events(run_id: str, request: Request):
+    """Server-Sent Events: one `progress` event per change in the run, ending with its final state."""
+    if pools.primary is None:
+        raise HTTPException(status_code=503, detail="No database configured (DATABASE_URL is empty)")
+
+    async def stream():
+        last = None
+        while not await request.is_disconnected():
+            payload, finished = await _run_event(run_id)
+            if payload != last:
+                yield f"event: progress\ndata: {json.dumps(payload)}\n\n"
+                last = payload
+            if finished:
+                yield "event: end\ndata: {}\n\n"
+                return
+            await asyncio.sleep(RUN_EVENTS_INTERVAL)
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.get("/debug/slow-queries")
+async def list_slow_queries(
+    limit: int = Query(20, ge=1, le=500),
+    order: str = Query("max", pattern="^(max|total|count)$"),
+):
+    """Slowest query templates seen since startup, with their worst parameters and sampled plans."""
+    return {
+        "threshold_ms": slow_queries.threshold_ms,
+        "enabled": slow_queries.enabled,
+        "queries": slow_queries.worst(limit, order),
+        "total": len(slow_queries.entries),
+    }
+
+
+@app.delete("/debug/slow-queries")
+async def clear_slow_queries():
+    slow_queries.clear()
+    return {"status": "ok"}
+
+
+@app.get("/metrics")
+async def prometheus_metrics():
+    for name, pool in pools.all_pools():
+        metrics.sample_pool(name, pool)
+    body, content_type = metrics.render()
+    return Response(content=body, media_type=content_type)
+
+
 @app.get("/health")
 async def health():
+    """Liveness: the process is up (no dependencies checked)."""
     return {"status": "ok"}
+
+
+# Cap on the primary round-trip in GET /ready
+READY_TIMEOUT = 2.0
+
+
+@app.get("/ready")
+async def ready():
+    """Readiness: pools open, pre-warm finished and the primary answering; 503 otherwise."""
+    if not _ready.is_set():
+        return JSONResponse({"status": "starting"}, status_code=503)
+    if not settings.database_url:
+        # DuckDB only: nothing to connect to; snapshots are found per request
+        return {"status": "ready", "backend": "duckdb", "snapshots": len(analytics.datasets())}
+    if pools.primary is None:
+        return JSONResponse({"status": "starting"}, status_code=503)
+    try:
+        async with pools.primary.acquire(timeout=READY_TIMEOUT) as conn:
+            await conn.fetchval("SELECT 1", timeout=READY_TIMEOUT)
+    except UNAVAILABLE as e:
+        return JSONResponse({"status": "unavailable", "detail": repr(e)}, status_code=503)
+    return {
+        "status": "ready",
+        "pools": {name: {"size": p.get_size(), "idle": p.get_idle_size()} for name, p in pools.all_pools()},
+    }
@@ -0,0 +1,67 @@
+"""Prometheus metrics for the API: request latency, pool usage, SQL template timing, RDKit conversion."""
+import asyncpg
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Gauge, Histogram, generate_latest
+
+REQUEST_SECONDS = Histogram(
+    "api_request_seconds",
+    "HTTP request latency by route template",
+    ["method", "route", "status"],
+)
+POOL_CONNECTIONS = Gauge(
+    "db_pool_connections",
+    "asyncpg pool connections by pool and state (sampled at scrape time)",
+    ["pool", "state"],
+)
+POOL_ACQUIRE_SECONDS = Histogram(
+    "db_pool_acquire_seconds",
+    "Time spent waiting for a pool connection, by pool set (primary, hot, cold)",
+    ["pool"],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0),
+)
+SQL_SECONDS = Histogram(
+    "db_query_seconds",
+    "SQL execution time by query template",
+    ["template"],
+)
+ADMISSION_IN_FLIGHT = Gauge(
+    "api_admission_in_flight",
+    "Requests holding an admission slot, by route class",
+    ["route"],
+)
+ADMISSION_REJECTED = Counter(
+    "api_admission_rejected_total",
+    "Requests shed with 503 because the route class stayed at its concurrency limit",
+    ["route"],
+)
+ADMISSION_WAIT_SECONDS = Histogram(
+    "api_admission_wait_seconds",
+    "Time queued for an admission slot",
+    ["route"],
+)
+QUERY_CANCELLED = Counter(
+    "db_query_cancelled_total",
+    "Queries stopped early, by reason (statement_timeout or client disconnect)",
+    ["route", "reason"],
+)
+RDKIT_SECONDS = Histogram(
+    "rdkit_conversion_seconds",
+    "molblock_to_moleculoids_json time",
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0),
+)
+
+
+def sample_pool(name: str, pool: asyncpg.Pool | None) -> None:
+    """Copy current pool size / idle / max into the gauges."""
+    if pool is None:
+        return
+    size = pool.get_size()
+    idle = pool.get_idle_size()
+    POOL_CONNECTIONS.labels(name, "open").set(size)
+    POOL_CONNECTIONS.labels(name, "idle").set(idle)
+    POOL_CONNECTIONS.labels(name, "in_use").set(size - idle)
+    POOL_CONNECTIONS.labels(name, "max").set(pool.get_max_size())
+
+
+def render() -> tuple[bytes, str]:
+    """Exposition-format body and its content type."""
+    return generate_latest(), CONTENT_TYPE_LATEST
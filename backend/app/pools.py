@@ -0,0 +1,190 @@
+"""Connection pools: primary for writes and run tracking, round-robin read replicas for hot and cold reads."""
+import asyncio
+import sys
+from itertools import count
+from typing import Any
+
+import asyncpg
+
+# Connection-level failures that take a replica out of rotation. Query errors do not, and neither
+# does InterfaceError, which asyncpg also raises for client-side misuse (a bug, not a dead server).
+UNAVAILABLE = (OSError, asyncio.TimeoutError, asyncpg.CannotConnectNowError, asyncpg.ConnectionDoesNotExistError)
+
+
+def asyncpg_dsn(url: str) -> str:
+    if url.startswith("postgresql+asyncpg://"):
+        url = url.replace("postgresql+asyncpg://", "postgresql://", 1)
+    return url
+
+
+def warm_init(queries: list[tuple[str, tuple]]):
+    """Pool init callback running each (sql, args) once so the statement is prepared and cached.
+
+    A failure (e.g. migrations not applied yet) is logged and does not stop the connection.
+    """
+    async def init(conn: asyncpg.Connection) -> None:
+        for sql, args in queries:
+            try:
+                await conn.fetch(sql, *args)
+            except asyncpg.PostgresError as e:
+                print(f"warm-up query failed: {e!r}", file=sys.stderr)
+                return
+
+    return init
+
+
+class _Member:
+    def __init__(self, name: str, dsn: str):
+        self.name = name
+        self.dsn = dsn
+        self.pool: asyncpg.Pool | None = None
+        self.healthy = False
+
+
+class ReplicaSet:
+    """Round-robin over pools on one or more servers, skipping members that failed a health check.
+
+    A member whose server is down at startup has no pool yet; health checks keep trying to open
+    it and put it back in rotation once it answers. When no member is healthy, reads fall back
+    to the primary pool.
+    """
+
+    HEALTH_TIMEOUT = 2.0
+
+    def __init__(self, name: str, dsns: list[str], fallback: asyncpg.Pool, **pool_kwargs: Any):
+        self.name = name
+        self.members = [_Member(f"{name}[{i}]", asyncpg_dsn(dsn)) for i, dsn in enumerate(dsns)]
+        self.fallback = fallback
+        self.pool_kwargs = pool_kwargs
+        self._next = count()
+
+    async def open(self) -> None:
+        await asyncio.gather(*(self._open_member(m) for m in self.members))
+
+    async def _open_member(self, member: _Member, log: bool = True) -> None:
+        try:
+            member.pool = await asyncio.wait_for(
+                asyncpg.create_pool(member.dsn, **self.pool_kwargs), self.HEALTH_TIMEOUT * 5
+            )
+            member.healthy = True
+        except UNAVAILABLE as e:
+            member.healthy = False
+            if log:
+                print(f"{member.name} unavailable: {e!r}", file=sys.stderr)
+        except Exception as e:
+            # Anything else (a bad DSN, an auth or server error) is logged every time and retried
+            member.healthy = False
+            print(f"{member.name} failed to open: {e!r}", file=sys.stderr)
+
+    def pick(self) -> asyncpg.Pool:
+        """Next healthy pool in rotation (the primary when none is healthy)."""
+        n = len(self.members)
+        start = next(self._next)
+        for i in range(n):
+            member = self.members[(start + i) % n]
+            if member.healthy and member.pool is not None:
+                return member.pool
+        return self.fallback
+
+    def mark_down(self, pool: asyncpg.Pool) -> None:
+        for member in self.members:
+            if member.pool is pool and member.healthy:
+                member.healthy = False
+                print(f"{member.name} marked unhealthy", file=sys.stderr)
+
+    async def check(self) -> None:
+        await asyncio.gather(*(self._check_member(m) for m in self.members))
+
+    async def _check_member(self, member: _Member) -> None:
+        if member.pool is None:
+            # Retried every health interval; only the first failure (at startup) is logged
+            await self._open_member(member, log=False)
+            if member.healthy:
+                print(f"{member.name} connected", file=sys.stderr)
+            return
+        try:
+            async with member.pool.acquire(timeout=self.HEALTH_TIMEOUT) as conn:
+                await conn.fetchval("SELECT 1", timeout=self.HEALTH_TIMEOUT)
+            if not member.healthy:
+                print(f"{member.name} healthy again", file=sys.stderr)
+            member.healthy = True
+        except UNAVAILABLE:
+            member.healthy = False
+        except Exception as e:
+            if member.healthy:
+                print(f"{member.name} health check failed: {e!r}", file=sys.stderr)
+            member.healthy = False
+
+    def pools(self) -> list[tuple[str, asyncpg.Pool]]:
+        return [(m.name, m.pool) for m in self.members if m.pool is not None]
+
+    async def close(self) -> None:
+        await asyncio.gather(*(m.pool.close() for m in self.members if m.pool is not None))
+
+
+class DatabasePools:
+    """primary: ingest jobs and run tracking. hot: browse/query/aggregates. cold: geometry (TOAST reads).
+
+    hot and cold are separate ReplicaSets over READ_REPLICA_URLS, each with its own connection
+    budget, so a burst of large geometry reads cannot take the connections that fast hot-table
+    filters need. With no replicas configured, hot reads share the primary pool and cold keeps
+    its own small pool to the primary: at most max_size + cold_max_size connections.
+    """
+
+    def __init__(self, primary_url: str, replica_urls: list[str], *, min_size: int, max_size: int,
+                 cold_max_size: int, server_settings: dict[str, str]):
+        self.primary_url = asyncpg_dsn(primary_url)
+        self.replica_urls = replica_urls
+        self.min_size = min_size
+        self.max_size = max_size
+        self.cold_max_size = cold_max_size
+        self.server_settings = server_settings
+        self.primary: asyncpg.Pool | None = None
+        self.hot: ReplicaSet | None = None
+        self.cold: ReplicaSet | None = None
+
+    async def open(self, warm: dict[str, list[tuple[str, tuple]]] | None = None) -> None:
+        """Create every pool, each pre-filled to min_size; warm maps pool set -> queries to prepare."""
+        warm = warm or {}
+        primary_warm = warm.get("primary", []) + ([] if self.replica_urls else warm.get("hot", []))
+        self.primary = await asyncpg.create_pool(
+            self.primary_url, min_size=self.min_size, max_size=self.max_size,
+            server_settings=self.server_settings, init=warm_init(primary_warm),
+        )
+        # No members without replicas: pick() then always returns the primary pool
+        self.hot = ReplicaSet("hot", self.replica_urls, self.primary, min_size=self.min_size,
+                              max_size=self.max_size, server_settings=self.server_settings,
+                              init=warm_init(warm.get("hot", [])))
+        self.cold = ReplicaSet("cold", self.replica_urls or [self.primary_url], self.primary,
+                               min_size=min(self.min_size, self.cold_max_size), max_size=self.cold_max_size,
+                               server_settings=self.server_settings, init=warm_init(warm.get("cold", [])))
+        await asyncio.gather(self.hot.open(), self.cold.open())
+
+    def for_route(self, route: str) -> tuple[asyncpg.Pool, ReplicaSet | None]:
+        """Pool for a route class, plus the ReplicaSet it came from (None for the primary)."""
+        if route == "runs":
+            return self.primary, None
+        replicas = self.cold if route == "geometry" else self.hot
+        return replicas.pick(), replicas
+
+    async def health_loop(self, interval: float) -> None:
+        while True:
+            await asyncio.sleep(interval)
+            # Members catch their own errors; this keeps one unexpected failure from ending the loop
+            for result in await asyncio.gather(self.hot.check(), self.cold.check(), return_exceptions=True):
+                if isinstance(result, Exception):
+                    print(f"replica health check failed: {result!r}", file=sys.stderr)
+
+    def all_pools(self) -> list[tuple[str, asyncpg.Pool]]:
+        out = [("primary", self.primary)] if self.primary is not None else []
+        for replicas in (self.hot, self.cold):
+            if replicas is not None:
+                out.extend(replicas.pools())
+        return out
+
+    async def close(self) -> None:
+        for replicas in (self.hot, self.cold):
+            if replicas is not None:
+                await replicas.close()
+        if self.primary is not None:
+            await self.primary.close()
@@ -0,0 +1,128 @@
+"""Slow-query log: per-template stats for queries over a threshold, with sampled EXPLAIN (ANALYZE, BUFFERS) plans."""
+import asyncio
+import random
+import re
+import time
+from dataclasses import dataclass, field
+from typing import Any
+
+import asyncpg
+
+# EXPLAIN ANALYZE re-executes the slow query, so at most one runs at a time
+_EXPLAIN_SLOTS = asyncio.Semaphore(1)
+
+
+def normalize_sql(sql: str) -> str:
+    """Collapse whitespace so the same template always prints the same way."""
+    return re.sub(r"\s+", " ", sql).strip()
+
+
+def _jsonable(value: Any) -> Any:
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    if isinstance(value, (list, tuple)):
+        return [_jsonable(v) for v in value]
+    return str(value)
+
+
+@dataclass
+class SlowQuery:
+    template: str
+    sql: str
+    params: list[Any]
+    count: int = 0
+    total_ms: float = 0.0
+    max_ms: float = 0.0
+    last_seen: float = 0.0
+    plan: str | None = None
+    plan_ms: float | None = None
+    plan_params: list[Any] = field(default_factory=list)
+    # An EXPLAIN for this template is queued or running
+    explaining: bool = False
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            "template": self.template,
+            "sql": self.sql,
+            "params": self.params,
+            "count": self.count,
+            "total_ms": round(self.total_ms, 1),
+            "mean_ms": round(self.total_ms / self.count, 1) if self.count else None,
+            "max_ms": round(self.max_ms, 1),
+            "last_seen": self.last_seen,
+            "plan": self.plan,
+            "plan_ms": self.plan_ms,
+            "plan_params": self.plan_params,
+        }
+
+
+class SlowQueryLog:
+    """Queries slower than threshold_ms, grouped by template (SQL shape), keeping the slowest example.
+
+    Holds at most max_templates entries; when full, the entry with the lowest max_ms is dropped.
+    """
+
+    def __init__(self, threshold_ms: float, explain_rate: float, max_templates: int):
+        self.threshold_ms = threshold_ms
+        self.explain_rate = explain_rate
+        self.max_templates = max_templates
+        self.entries: dict[str, SlowQuery] = {}
+
+    @property
+    def enabled(self) -> bool:
+        return self.threshold_ms > 0
+
+    def record(self, template: str, sql: str, args: tuple, duration_ms: float) -> bool:
+        """Record a successful query if it is slow; return True if its plan should be sampled now.
+
+        A True return marks the template as explaining until explain() finishes, so concurrent
+        slow runs of the same template do not queue duplicate EXPLAINs.
+        """
+        if not self.enabled or duration_ms < self.threshold_ms:
+            return False
+        entry = self.entries.get(template)
+        if entry is None:
+            if len(self.entries) >= self.max_templates:
+                fastest = min(self.entries.values(), key=lambda e: e.max_ms)
+                del self.entries[fastest.template]
+            entry = self.entries[template] = SlowQuery(template, normalize_sql(sql), _jsonable(list(args)))
+        entry.count += 1
+        entry.total_ms += duration_ms
+        entry.last_seen = time.time()
+        if duration_ms > entry.max_ms:
+            entry.max_ms = duration_ms
+            entry.sql = normalize_sql(sql)
+            entry.params = _jsonable(list(args))
+        if entry.explaining or not entry.sql.upper().startswith(("SELECT", "WITH")):
+            return False
+        entry.explaining = entry.plan is None or random.random() < self.explain_rate
+        return entry.explaining
+
+    async def explain(self, pool: asyncpg.Pool, template: str, sql: str, args: tuple, timeout: float) -> None:
+        """Re-run the query under EXPLAIN (ANALYZE, BUFFERS) on its own connection and keep the plan.
+
+        The server stops the query after `timeout` seconds (SET LOCAL statement_timeout), so a
+        plan that is never captured does not leave a backend scanning.
+        """
+        try:
+            async with _EXPLAIN_SLOTS, pool.acquire() as conn, conn.transaction(readonly=True):
+                await conn.execute(f"SET LOCAL statement_timeout = {int(timeout * 1000)}")
+                rows = await conn.fetch(f"EXPLAIN (ANALYZE, BUFFERS) {sql}", *args)
+        finally:
+            entry = self.entries.get(template)
+            if entry is not None:
+                entry.explaining = False
+        entry = self.entries.get(template)
+        if entry is None:
+            return
+        entry.plan = "\n".join(r[0] for r in rows)
+        entry.plan_params = _jsonable(list(args))
+        match = re.search(r"Execution Time: ([\d.]+) ms", entry.plan)
+        entry.plan_ms = float(match.group(1)) if match else None
+
+    def worst(self, limit: int, order: str = "max") -> list[dict[str, Any]]:
+        key = {"max": lambda e: e.max_ms, "total": lambda e: e.total_ms, "count": lambda e: e.count}[order]
+        return [e.as_dict() for e in sorted(self.entries.values(), key=key, reverse=True)[:limit]]
+
+    def clear(self) -> None:
+        self.entries.clear()
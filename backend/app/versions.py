@@ -0,0 +1,98 @@
+"""Per-dataset version tokens for HTTP caching, invalidated by ingest NOTIFY with a TTL fallback."""
+import asyncio
+import hashlib
+import sys
+import time
+
+import asyncpg
+
+# The channel ingest.db.finish_run notifies on, imported so the two cannot drift apart
+from ingest.db import DATASET_VERSION_CHANNEL
+
+# A dataset's version changes each time one of its ingest runs completes
+_VERSIONS_SQL = """
+    SELECT d.dataset_id, COUNT(r.run_id) AS runs, MAX(r.finished_at) AS finished_at
+    FROM dataset d
+    LEFT JOIN ingest_run r ON r.dataset_id = d.dataset_id AND r.status = 'completed'
+    GROUP BY d.dataset_id
+"""
+
+# One dataset's token, read on the connection serving a response (which may be a replica)
+DATASET_VERSION_SQL = """
+    SELECT COUNT(run_id) AS runs, MAX(finished_at) AS finished_at
+    FROM ingest_run
+    WHERE dataset_id = $1 AND status = 'completed'
+"""
+
+# Floor between reloads triggered by unknown dataset ids (e.g. a stream of 404s)
+_MISS_RELOAD_INTERVAL = 1.0
+
+
+def version_token(runs: int, finished_at) -> str:
+    return f"{runs}-{int(finished_at.timestamp() * 1e6) if finished_at else 0}"
+
+
+class DatasetVersions:
+    """In-process map dataset_id -> version token, reloaded from the primary when stale.
+
+    ingest.db.finish_run sends NOTIFY dataset_version; a LISTEN connection marks the map stale
+    on each one. ttl bounds staleness when notifications are missed (listener down, or a run
+    finished by something other than the ingest CLI).
+    """
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._versions: dict[str, str] = {}
+        self._loaded_at = 0.0
+        self._lock = asyncio.Lock()
+
+    def invalidate(self) -> None:
+        self._loaded_at = 0.0
+
+    async def _reload(self, pool: asyncpg.Pool, max_age: float) -> None:
+        async with self._lock:
+            # Another request may have reloaded while this one waited for the lock
+            if time.monotonic() - self._loaded_at < max_age:
+                return
+            loaded_at = time.monotonic()
+            rows = await pool.fetch(_VERSIONS_SQL)
+            self._versions = {r["dataset_id"]: version_token(r["runs"], r["finished_at"]) for r in rows}
+            self._loaded_at = loaded_at
+
+    async def get(self, pool: asyncpg.Pool, dataset_id: str) -> str | None:
+        """Version token for dataset_id, or None for an unknown dataset."""
+        if time.monotonic() - self._loaded_at >= self.ttl:
+            await self._reload(pool, self.ttl)
+        elif dataset_id not in self._versions:
+            await self._reload(pool, _MISS_RELOAD_INTERVAL)
+        return self._versions.get(dataset_id)
+
+    async def combined(self, pool: asyncpg.Pool) -> str:
+        """One token over every dataset (for the dataset list)."""
+        if time.monotonic() - self._loaded_at >= self.ttl:
+            await self._reload(pool, self.ttl)
+        items = ",".join(f"{k}={v}" for k, v in sorted(self._versions.items()))
+        return hashlib.blake2b(items.encode(), digest_size=8).hexdigest()
+
+    def _on_notify(self, conn, pid, channel, payload) -> None:
+        self.invalidate()
+
+    async def listen(self, dsn: str) -> None:
+        """Hold a LISTEN connection on the primary, reconnecting after failures."""
+        while True:
+            conn = None
+            try:
+                conn = await asyncpg.connect(dsn)
+                closed = asyncio.Event()
+                conn.add_termination_listener(lambda c: closed.set())
+                await conn.add_listener(DATASET_VERSION_CHANNEL, self._on_notify)
+                # Notifications sent while disconnected are lost
+                self.invalidate()
+                await closed.wait()
+            except (OSError, asyncio.TimeoutError, asyncpg.PostgresError, asyncpg.InterfaceError) as e:
+                print(f"dataset version listener: {e!r}", file=sys.stderr)
+            finally:
+                if conn is not None and not conn.is_closed():
+                    await conn.close()
+            self.invalidate()
+            await asyncio.sleep(self.ttl)
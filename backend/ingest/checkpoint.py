@@ -0,0 +1,38 @@
+"""Checksums for incremental ingest: whole-file SHA-256 and 64-bit per-row content hashes."""
+import hashlib
+from pathlib import Path
+from typing import Any
+
+
+def file_sha256(path: str | Path, chunk_size: int = 1 << 20) -> tuple[str, int]:
+    """Return (hex SHA-256, size in bytes) of a file."""
+    h = hashlib.sha256()
+    size = 0
+    with open(path, "rb") as f:
+        while chunk := f.read(chunk_size):
+            h.update(chunk)
+            size += len(chunk)
+    return h.hexdigest(), size
+
+
+def content_hash(*values: Any) -> int:
+    """Signed 64-bit BLAKE2b of the values' reprs (fits a BIGINT column)."""
+    h = hashlib.blake2b(digest_size=8)
+    for v in values:
+        h.update(repr(v).encode("utf-8"))
+        h.update(b"\x1f")
+    return int.from_bytes(h.digest(), "big", signed=True)
+
+
+def molecule_content_hash(row: dict[str, Any]) -> int:
+    """Hash of a discovered_molecule row's payload (excludes dataset, run and timestamps)."""
+    return content_hash(
+        row["smiles"], row["inchi_key"], row["molecular_formula"], row["molecular_weight"],
+        row["exact_mass"], row["xlogp3"], row["tpsa"], row["hba"], row["hbd"], row["rotatable_bonds"],
+        row["discovery_method"], row["discovery_seed"], row["name"],
+    )
+
+
+def geometry_content_hash(molblock: str, hot: dict[str, Any], cold: dict[str, bytes | None]) -> int:
+    """Hash of an SDF record's molblock, hot tags and cold blobs."""
+    return content_hash(molblock, sorted(hot.items()), sorted(cold.items()))
@@ -7,6 +7,7 @@ from typing import Any
 
 import pandas as pd
 
+from .checkpoint import molecule_content_hash
 from .parse import parse_discovery_seed
 
 REQUIRED_COLUMNS = [
@@ -99,6 +100,7 @@ def build_molecule_rows(
             "name": None if pd.isna(r.get("name")) else str(r["name"]).strip() or None,
             "ingest_run_id": run_id,
         })
+        rows[-1]["content_hash"] = molecule_content_hash(rows[-1])
     return rows
 
 
@@ -106,7 +108,10 @@ def coverage_stats(df: pd.DataFrame) -> dict[str, Any]:
     """Return coverage stats for required/key columns."""
     total = len(df)
     stats = {"total_rows": total}
-    for col in ["PubChem_CID", "SMILES", "InChIKey", "molecular_formula", "molecular_weight", "discovery_method", "discovery_seed"]:
+    for col in [
+        "PubChem_CID", "SMILES", "InChIKey", "molecular_formula", "molecular_weight", "discovery_method", "discovery_seed",
+        "XLogP3", "TPSA", "HBA", "HBD", "rotatable_bonds",
+    ]:
         if col not in df.columns:
             stats[col] = 0
             continue
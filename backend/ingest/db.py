@@ -6,6 +6,10 @@ from typing import Any
 import asyncpg
 
 
+# The API LISTENs here to refresh dataset version tokens (ETags) when a run completes
+DATASET_VERSION_CHANNEL = "dataset_version"
+
+
 def _get_conn_url(database_url: str) -> str:
     """Convert sqlalchemy async URL to asyncpg URL."""
     if database_url.startswith("postgresql+asyncpg://"):
@@ -13,12 +17,8 @@ def _get_conn_url(database_url: str) -> str:
     return database_url
 
 
-async def run_migration(conn, migrations_dir: Path) -> None:
-    """Run 001_initial.sql if present (statement by statement)."""
-    sql_file = migrations_dir / "001_initial.sql"
-    if not sql_file.exists():
-        return
-    sql = sql_file.read_text()
+def _split_statements(sql: str) -> list[str]:
+    """Split a migration file into statements."""
     # Split only on ";\n" to avoid splitting inside COMMENT strings
     statements = []
     for part in sql.replace(";\n", "\x00").split("\x00"):
@@ -30,9 +30,32 @@ async def run_migration(conn, migrations_dir: Path) -> None:
         if not part.rstrip().endswith(";"):
             part = part + ";"
         statements.append(part)
-    for stmt in statements:
-        if stmt.strip() != ";":
-            await conn.execute(stmt)
+    return [stmt for stmt in statements if stmt.strip() != ";"]
+
+
+async def run_migration(conn, migrations_dir: Path) -> None:
+    """Run each migrations/*.sql not yet applied, in filename order (statement by statement).
+
+    Applied files are recorded in schema_migration so data-moving migrations run once.
+    """
+    async with conn.transaction():
+        # Serialize concurrent ingests that all start by migrating
+        await conn.execute("SELECT pg_advisory_xact_lock(hashtext('schema_migration'))")
+        await conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS schema_migration (
+                name TEXT PRIMARY KEY,
+                applied_at TIMESTAMPTZ NOT NULL DEFAULT now()
+            )
+            """
+        )
+        applied = {r["name"] for r in await conn.fetch("SELECT name FROM schema_migration")}
+        for sql_file in sorted(migrations_dir.glob("*.sql")):
+            if sql_file.name in applied:
+                continue
+            for stmt in _split_statements(sql_file.read_text()):
+                await conn.execute(stmt)
+            await conn.execute("INSERT INTO schema_migration (name) VALUES ($1)", sql_file.name)
 
 
 async def ensure_dataset_and_run(
@@ -54,110 +77,209 @@ async def ensure_dataset_and_run(
         dataset_name or dataset_id,
         run_id,
     )
+    await start_run(conn, dataset_id, run_id)
+
+
+async def start_run(conn: asyncpg.Connection, dataset_id: str, run_id: str) -> None:
+    """Insert ingest_run (or restart it) for an existing dataset.
+
+    A restarted run drops the previous attempt's finished_at and error, keeping its other stats.
+    """
     await conn.execute(
         """
         INSERT INTO ingest_run (run_id, dataset_id, started_at, status, created_at)
         VALUES ($1, $2, now(), 'running', now())
-        ON CONFLICT (run_id) DO UPDATE SET status = 'running', started_at = now()
+        ON CONFLICT (run_id) DO UPDATE
+        SET status = 'running', started_at = now(), finished_at = NULL, stats = ingest_run.stats - 'error'
         """,
         run_id,
         dataset_id,
     )
 
 
-async def upsert_molecules(conn: asyncpg.Connection, rows: list[dict[str, Any]]) -> None:
-    """Upsert discovered_molecule rows."""
+async def ensure_dimension_keys(
+    conn: asyncpg.Connection, rows: list[dict[str, Any]]
+) -> tuple[dict[str, int], dict[str, int]]:
+    """Insert missing discovery_method / discovery_seed rows; return (method_key by name, seed_key by discovery_seed)."""
+    methods = sorted({r["discovery_method"] for r in rows})
+    seeds: dict[str, tuple[str | None, str | None]] = {}
     for r in rows:
-        await conn.execute(
-            """
-            INSERT INTO discovered_molecule (
-                dataset_id, cid, smiles, inchi_key, molecular_formula,
-                molecular_weight, exact_mass, xlogp3, tpsa, hba, hbd, rotatable_bonds,
-                discovery_method, discovery_seed, seed_name, seed_smiles, name, ingest_run_id, created_at
-            ) VALUES (
-                $1, $2, $3, $4, $5, $6, $7, $8, $9, $10, $11, $12, $13, $14, $15, $16, $17, $18, now()
-            )
-            ON CONFLICT (dataset_id, cid) DO UPDATE SET
-                smiles = EXCLUDED.smiles,
-                inchi_key = EXCLUDED.inchi_key,
-                molecular_formula = EXCLUDED.molecular_formula,
-                molecular_weight = EXCLUDED.molecular_weight,
-                exact_mass = EXCLUDED.exact_mass,
-                xlogp3 = EXCLUDED.xlogp3,
-                tpsa = EXCLUDED.tpsa,
-                hba = EXCLUDED.hba,
-                hbd = EXCLUDED.hbd,
-                rotatable_bonds = EXCLUDED.rotatable_bonds,
-                discovery_method = EXCLUDED.discovery_method,
-                discovery_seed = EXCLUDED.discovery_seed,
-                seed_name = EXCLUDED.seed_name,
-                seed_smiles = EXCLUDED.seed_smiles,
-                name = EXCLUDED.name,
-                ingest_run_id = EXCLUDED.ingest_run_id
-            """,
-            r["dataset_id"],
-            r["cid"],
-            r["smiles"],
-            r["inchi_key"],
-            r["molecular_formula"],
-            r["molecular_weight"],
-            r["exact_mass"],
-            r["xlogp3"],
-            r["tpsa"],
-            r["hba"],
-            r["hbd"],
-            r["rotatable_bonds"],
-            r["discovery_method"],
-            r["discovery_seed"],
-            r["seed_name"],
-            r["seed_smiles"],
-            r["name"],
-            r["ingest_run_id"],
+        if r["discovery_seed"] is not None:
+            seeds.setdefault(r["discovery_seed"], (r["seed_name"], r["seed_smiles"]))
+    # NOT EXISTS first so ON CONFLICT does not burn identity values on every ingest
+    await conn.execute(
+        """
+        INSERT INTO discovery_method (name)
+        SELECT n FROM unnest($1::text[]) AS n
+        WHERE NOT EXISTS (SELECT 1 FROM discovery_method WHERE name = n)
+        ON CONFLICT (name) DO NOTHING
+        """,
+        methods,
+    )
+    seed_texts = list(seeds)
+    await conn.execute(
+        """
+        INSERT INTO discovery_seed (discovery_seed, seed_name, seed_smiles)
+        SELECT s.discovery_seed, s.seed_name, s.seed_smiles
+        FROM unnest($1::text[], $2::text[], $3::text[]) AS s(discovery_seed, seed_name, seed_smiles)
+        WHERE NOT EXISTS (SELECT 1 FROM discovery_seed d WHERE d.discovery_seed = s.discovery_seed)
+        ON CONFLICT (discovery_seed) DO NOTHING
+        """,
+        seed_texts,
+        [seeds[t][0] for t in seed_texts],
+        [seeds[t][1] for t in seed_texts],
+    )
+    method_keys = {
+        r["name"]: r["method_key"]
+        for r in await conn.fetch("SELECT method_key, name FROM discovery_method WHERE name = ANY($1::text[])", methods)
+    }
+    seed_keys = {
+        r["discovery_seed"]: r["seed_key"]
+        for r in await conn.fetch(
+            "SELECT seed_key, discovery_seed FROM discovery_seed WHERE discovery_seed = ANY($1::text[])", seed_texts
+        )
+    }
+    return method_keys, seed_keys
+
+
+async def dataset_key(conn: asyncpg.Connection, dataset_id: str) -> int | None:
+    """Surrogate key for dataset_id (None if the dataset does not exist)."""
+    return await conn.fetchval("SELECT dataset_key FROM dataset WHERE dataset_id = $1", dataset_id)
+
+
+async def upsert_molecules(conn: asyncpg.Connection, rows: list[dict[str, Any]]) -> None:
+    """Upsert discovered_molecule rows, resolving dataset/method/seed text to dimension keys."""
+    if not rows:
+        return
+    method_keys, seed_keys = await ensure_dimension_keys(conn, rows)
+    dataset_keys = {ds: await dataset_key(conn, ds) for ds in {r["dataset_id"] for r in rows}}
+    await conn.executemany(
+        """
+        INSERT INTO discovered_molecule (
+            dataset_key, cid, smiles, inchi_key, molecular_formula,
+            molecular_weight, exact_mass, xlogp3, tpsa, hba, hbd, rotatable_bonds,
+            method_key, seed_key, name, ingest_run_id, content_hash, created_at
+        ) VALUES (
+            $1, $2, $3, $4, $5, $6, $7, $8, $9, $10, $11, $12, $13, $14, $15, $16, $17, now()
         )
+        ON CONFLICT (dataset_key, cid) DO UPDATE SET
+            smiles = EXCLUDED.smiles,
+            inchi_key = EXCLUDED.inchi_key,
+            molecular_formula = EXCLUDED.molecular_formula,
+            molecular_weight = EXCLUDED.molecular_weight,
+            exact_mass = EXCLUDED.exact_mass,
+            xlogp3 = EXCLUDED.xlogp3,
+            tpsa = EXCLUDED.tpsa,
+            hba = EXCLUDED.hba,
+            hbd = EXCLUDED.hbd,
+            rotatable_bonds = EXCLUDED.rotatable_bonds,
+            method_key = EXCLUDED.method_key,
+            seed_key = EXCLUDED.seed_key,
+            name = EXCLUDED.name,
+            ingest_run_id = EXCLUDED.ingest_run_id,
+            content_hash = EXCLUDED.content_hash
+        """,
+        [
+            (
+                dataset_keys[r["dataset_id"]],
+                r["cid"],
+                r["smiles"],
+                r["inchi_key"],
+                r["molecular_formula"],
+                r["molecular_weight"],
+                r["exact_mass"],
+                r["xlogp3"],
+                r["tpsa"],
+                r["hba"],
+                r["hbd"],
+                r["rotatable_bonds"],
+                method_keys[r["discovery_method"]],
+                seed_keys.get(r["discovery_seed"]) if r["discovery_seed"] is not None else None,
+                r["name"],
+                r["ingest_run_id"],
+                r.get("content_hash"),
+            )
+            for r in rows
+        ],
+    )
 
 
 async def finish_run(conn: asyncpg.Connection, run_id: str, stats: dict[str, Any]) -> None:
-    """Set ingest_run finished_at and stats."""
+    """Set ingest_run finished_at and stats, and notify API processes that the dataset version changed."""
     import json
-    await conn.execute(
+    dataset_id = await conn.fetchval(
         """
         UPDATE ingest_run
         SET finished_at = now(), status = 'completed', stats = $2::jsonb
         WHERE run_id = $1
+        RETURNING dataset_id
         """,
         run_id,
         json.dumps(stats),
     )
+    if dataset_id is not None:
+        await conn.execute("SELECT pg_notify($1, $2)", DATASET_VERSION_CHANNEL, dataset_id)
 
 
-async def upsert_geometry(
-    conn: asyncpg.Connection,
-    dataset_id: str,
-    run_id: str,
-    cid: int,
-    hot: dict[str, Any],
-    molblock: str,
-    cold_blobs: dict[str, bytes | None],
-) -> None:
-    """Insert or update molecule_geometry and molecule_geometry_cold."""
+async def update_run_stats(conn: asyncpg.Connection, run_id: str, stats: dict[str, Any]) -> None:
+    """Replace ingest_run stats while the run is in progress."""
+    import json
+    await conn.execute(
+        "UPDATE ingest_run SET stats = $2::jsonb WHERE run_id = $1",
+        run_id,
+        json.dumps(stats),
+    )
+
+
+async def fail_run(conn: asyncpg.Connection, run_id: str, error: str) -> None:
+    """Mark ingest_run failed, keeping its last progress stats and adding the error."""
     await conn.execute(
         """
-        INSERT INTO molecule_geometry (
-            dataset_id, cid, conformer_id, mmff94_energy, conformer_rmsd,
-            effective_rotor_count, shape_volume, shape_selfoverlap,
-            heavy_atom_count, component_count, ingest_run_id, created_at
-        ) VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10, $11, now())
-        ON CONFLICT (dataset_id, cid) DO UPDATE SET
-            conformer_id = EXCLUDED.conformer_id,
-            mmff94_energy = EXCLUDED.mmff94_energy,
-            conformer_rmsd = EXCLUDED.conformer_rmsd,
-            effective_rotor_count = EXCLUDED.effective_rotor_count,
-            shape_volume = EXCLUDED.shape_volume,
-            shape_selfoverlap = EXCLUDED.shape_selfoverlap,
-            heavy_atom_count = EXCLUDED.heavy_atom_count,
-            component_count = EXCLUDED.component_count,
-            ingest_run_id = EXCLUDED.ingest_run_id
+        UPDATE ingest_run
+        SET finished_at = now(), status = 'failed',
+            stats = COALESCE(stats, '{}'::jsonb) || jsonb_build_object('error', $2::text)
+        WHERE run_id = $1
         """,
+        run_id,
+        error,
+    )
+
+
+_GEOMETRY_UPSERT = """
+    INSERT INTO molecule_geometry (
+        dataset_id, cid, conformer_id, mmff94_energy, conformer_rmsd,
+        effective_rotor_count, shape_volume, shape_selfoverlap,
+        heavy_atom_count, component_count, ingest_run_id, content_hash, created_at
+    ) VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10, $11, $12, now())
+    ON CONFLICT (dataset_id, cid) DO UPDATE SET
+        conformer_id = EXCLUDED.conformer_id,
+        mmff94_energy = EXCLUDED.mmff94_energy,
+        conformer_rmsd = EXCLUDED.conformer_rmsd,
+        effective_rotor_count = EXCLUDED.effective_rotor_count,
+        shape_volume = EXCLUDED.shape_volume,
+        shape_selfoverlap = EXCLUDED.shape_selfoverlap,
+        heavy_atom_count = EXCLUDED.heavy_atom_count,
+        component_count = EXCLUDED.component_count,
+        ingest_run_id = EXCLUDED.ingest_run_id,
+        content_hash = EXCLUDED.content_hash
+"""
+
+_GEOMETRY_COLD_UPSERT = """
+    INSERT INTO molecule_geometry_cold (dataset_id, cid, molblock, shape_fingerprint, pharmacophore_features, mmff94_partial_charges, coordinate_type, created_at)
+    VALUES ($1, $2, $3, $4, $5, $6, $7, now())
+    ON CONFLICT (dataset_id, cid) DO UPDATE SET
+        molblock = EXCLUDED.molblock,
+        shape_fingerprint = EXCLUDED.shape_fingerprint,
+        pharmacophore_features = EXCLUDED.pharmacophore_features,
+        mmff94_partial_charges = EXCLUDED.mmff94_partial_charges,
+        coordinate_type = EXCLUDED.coordinate_type
+"""
+
+
+def _geometry_args(
+    dataset_id: str, run_id: str, cid: int, hot: dict[str, Any], content_hash: int | None = None
+) -> tuple:
+    return (
         dataset_id,
         cid,
         hot.get("conformer_id"),
@@ -169,19 +291,12 @@ async def upsert_geometry(
         hot.get("heavy_atom_count"),
         hot.get("component_count"),
         run_id,
+        content_hash,
     )
-    # Cold: ensure row exists in geometry_cold (FK references geometry)
-    await conn.execute(
-        """
-        INSERT INTO molecule_geometry_cold (dataset_id, cid, molblock, shape_fingerprint, pharmacophore_features, mmff94_partial_charges, coordinate_type, created_at)
-        VALUES ($1, $2, $3, $4, $5, $6, $7, now())
-        ON CONFLICT (dataset_id, cid) DO UPDATE SET
-            molblock = EXCLUDED.molblock,
-            shape_fingerprint = EXCLUDED.shape_fingerprint,
-            pharmacophore_features = EXCLUDED.pharmacophore_features,
-            mmff94_partial_charges = EXCLUDED.mmff94_partial_charges,
-            coordinate_type = EXCLUDED.coordinate_type
-        """,
+
+
+def _geometry_cold_args(dataset_id: str, cid: int, molblock: str, cold_blobs: dict[str, bytes | None]) -> tuple:
+    return (
         dataset_id,
         cid,
         molblock,
@@ -192,5 +307,106 @@ async def upsert_geometry(
     )
 
 
+async def upsert_geometry(
+    conn: asyncpg.Connection,
+    dataset_id: str,
+    run_id: str,
+    cid: int,
+    hot: dict[str, Any],
+    molblock: str,
+    cold_blobs: dict[str, bytes | None],
+) -> None:
+    """Insert or update molecule_geometry and molecule_geometry_cold."""
+    await conn.execute(_GEOMETRY_UPSERT, *_geometry_args(dataset_id, run_id, cid, hot))
+    # Cold: ensure row exists in geometry_cold (FK references geometry)
+    await conn.execute(_GEOMETRY_COLD_UPSERT, *_geometry_cold_args(dataset_id, cid, molblock, cold_blobs))
+
+
+async def upsert_geometry_many(
+    conn: asyncpg.Connection,
+    dataset_id: str,
+    run_id: str,
+    records: list[tuple[int, str, dict[str, Any], dict[str, bytes | None], int]],
+) -> None:
+    """Upsert a batch of (cid, molblock, hot, cold, content_hash) SDF records in one transaction.
+
+    content_hash is checkpoint.geometry_content_hash of the record, computed by the parse worker.
+    """
+    async with conn.transaction():
+        await conn.executemany(
+            _GEOMETRY_UPSERT,
+            [_geometry_args(dataset_id, run_id, cid, hot, content_hash) for cid, _, hot, _, content_hash in records],
+        )
+        await conn.executemany(
+            _GEOMETRY_COLD_UPSERT,
+            [_geometry_cold_args(dataset_id, cid, molblock, cold) for cid, molblock, _, cold, _ in records],
+        )
+
+
+async def molecule_content_hashes(conn: asyncpg.Connection, dataset_id: str) -> dict[int, int]:
+    """cid -> content_hash for the dataset's discovered_molecule rows."""
+    rows = await conn.fetch(
+        "SELECT cid, content_hash FROM discovered_molecule WHERE dataset_key = (SELECT dataset_key FROM dataset WHERE dataset_id = $1)",
+        dataset_id,
+    )
+    return {r["cid"]: r["content_hash"] for r in rows if r["content_hash"] is not None}
+
+
+async def geometry_content_hashes(conn: asyncpg.Connection, dataset_id: str) -> dict[int, int]:
+    """cid -> content_hash for the dataset's molecule_geometry rows."""
+    rows = await conn.fetch(
+        "SELECT cid, content_hash FROM molecule_geometry WHERE dataset_id = $1 AND content_hash IS NOT NULL",
+        dataset_id,
+    )
+    return {r["cid"]: r["content_hash"] for r in rows}
+
+
+async def get_checkpoint(
+    conn: asyncpg.Connection, dataset_id: str, kind: str, path: str
+) -> asyncpg.Record | None:
+    """ingest_checkpoint row for a file (kind is 'csv' or 'sdf')."""
+    return await conn.fetchrow(
+        "SELECT sha256, size_bytes, records_done, status, run_id FROM ingest_checkpoint WHERE dataset_id = $1 AND kind = $2 AND path = $3",
+        dataset_id,
+        kind,
+        path,
+    )
+
+
+async def save_checkpoint(
+    conn: asyncpg.Connection,
+    dataset_id: str,
+    kind: str,
+    path: str,
+    sha256: str,
+    size_bytes: int,
+    records_done: int,
+    run_id: str,
+    status: str = "running",
+) -> None:
+    """Record how many records of a file are committed; call inside the batch's transaction."""
+    await conn.execute(
+        """
+        INSERT INTO ingest_checkpoint (dataset_id, kind, path, sha256, size_bytes, records_done, status, run_id, updated_at)
+        VALUES ($1, $2, $3, $4, $5, $6, $7, $8, now())
+        ON CONFLICT (dataset_id, kind, path) DO UPDATE SET
+            sha256 = EXCLUDED.sha256,
+            size_bytes = EXCLUDED.size_bytes,
+            records_done = EXCLUDED.records_done,
+            status = EXCLUDED.status,
+            run_id = EXCLUDED.run_id,
+            updated_at = now()
+        """,
+        dataset_id,
+        kind,
+        path,
+        sha256,
+        size_bytes,
+        records_done,
+        status,
+        run_id,
+    )
+
+
 def run_async(coro):
     return asyncio.run(coro)
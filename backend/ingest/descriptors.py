@@ -0,0 +1,88 @@
+"""Fill missing manifest descriptors (XLogP3, TPSA, HBA, HBD, rotatable_bonds) from SMILES with RDKit.
+
+XLogP3 has no RDKit implementation; Crippen MolLogP is used as the proxy (as in bench.generate),
+and the counts use RDKit's definitions, which can differ by one or two from PubChem's for some
+structures. Only cells that are empty in the CSV are filled; supplied values are never replaced.
+"""
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any
+
+import pandas as pd
+
+# CSV column -> value computed from an RDKit Mol (see _compute)
+DESCRIPTOR_COLUMNS = ("XLogP3", "TPSA", "HBA", "HBD", "rotatable_bonds")
+
+# Unique SMILES per worker task
+DESCRIPTOR_BATCH_SIZE = 2000
+
+
+def _compute(smiles_batch: list[str]) -> list[tuple[float, float, int, int, int] | None]:
+    """Descriptors for each SMILES in DESCRIPTOR_COLUMNS order (None when RDKit cannot parse it)."""
+    from rdkit import Chem, RDLogger
+    from rdkit.Chem import Crippen, rdMolDescriptors
+
+    RDLogger.DisableLog("rdApp.*")
+    out = []
+    for smiles in smiles_batch:
+        mol = Chem.MolFromSmiles(smiles)
+        if mol is None:
+            out.append(None)
+            continue
+        out.append((
+            round(Crippen.MolLogP(mol), 1),
+            round(rdMolDescriptors.CalcTPSA(mol), 1),
+            rdMolDescriptors.CalcNumHBA(mol),
+            rdMolDescriptors.CalcNumHBD(mol),
+            rdMolDescriptors.CalcNumRotatableBonds(mol),
+        ))
+    return out
+
+
+def fill_missing_descriptors(
+    df: pd.DataFrame, jobs: int = 1, start: int = 0, batch_size: int = DESCRIPTOR_BATCH_SIZE
+) -> dict[str, Any]:
+    """Compute descriptors for rows (from position `start`) that lack any of DESCRIPTOR_COLUMNS; fills df in place.
+
+    Each distinct SMILES is computed once however many rows share it; batches of distinct
+    SMILES run on `jobs` worker processes (in-process when jobs <= 1). Returns counts for
+    ingest_run.stats.
+    """
+    started = time.perf_counter()
+    for col in DESCRIPTOR_COLUMNS:
+        if col not in df.columns:
+            df[col] = float("nan")
+        elif not pd.api.types.is_float_dtype(df[col]):
+            # Integer columns cannot hold NaN; nullable ints in the CSV come back as float anyway
+            df[col] = pd.to_numeric(df[col], errors="coerce").astype(float)
+    part = df.iloc[start:]
+    missing = part[list(DESCRIPTOR_COLUMNS)].isna()
+    needs = missing.any(axis=1) & part["SMILES"].notna()
+    smiles = part.loc[needs, "SMILES"].astype(str).str.strip()
+    unique = [s for s in smiles.unique() if s]
+    memo: dict[str, tuple | None] = {}
+    batches = [unique[i:i + batch_size] for i in range(0, len(unique), batch_size)]
+    if jobs > 1 and len(batches) > 1:
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            for batch, values in zip(batches, executor.map(_compute, batches)):
+                memo.update(zip(batch, values))
+    else:
+        for batch in batches:
+            memo.update(zip(batch, _compute(batch)))
+
+    filled = {}
+    computed = smiles.map(memo)
+    for j, col in enumerate(DESCRIPTOR_COLUMNS):
+        rows = missing.loc[needs, col]
+        rows = rows[rows].index
+        values = computed.loc[rows].map(lambda v: v[j] if isinstance(v, tuple) else None).dropna()
+        df.loc[values.index, col] = values.astype(float)
+        filled[col] = len(values)
+    return {
+        "rows_missing": int(needs.sum()),
+        "distinct_smiles": len(unique),
+        "unparseable_smiles": sum(1 for v in memo.values() if v is None),
+        "filled": filled,
+        "seconds": round(time.perf_counter() - started, 2),
+        "jobs": jobs,
+    }
@@ -0,0 +1,50 @@
+"""Ingest stage metrics: per-stage record and time counters, served with --metrics-port and mirrored into run stats."""
+import time
+from contextlib import contextmanager
+from typing import Iterator
+
+from prometheus_client import Counter, start_http_server
+
+# descriptors: RDKit fill of missing CSV descriptor cells (always 0 for SDF)
+STAGES = ("parse", "descriptors", "transform", "write")
+
+RECORDS = Counter("ingest_records_total", "Records handled per ingest stage", ["kind", "stage"])
+SECONDS = Counter("ingest_stage_seconds_total", "Wall time spent per ingest stage", ["kind", "stage"])
+
+
+class StageTimer:
+    """Per-stage wall time and record counts for one ingest run (kind is csv or sdf)."""
+
+    def __init__(self, kind: str):
+        self.kind = kind
+        self.seconds = dict.fromkeys(STAGES, 0.0)
+        self.records = dict.fromkeys(STAGES, 0)
+
+    def add(self, stage: str, seconds: float, records: int = 0) -> None:
+        self.seconds[stage] += seconds
+        self.records[stage] += records
+        SECONDS.labels(self.kind, stage).inc(seconds)
+        RECORDS.labels(self.kind, stage).inc(records)
+
+    @contextmanager
+    def stage(self, stage: str, records: int = 0) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(stage, time.perf_counter() - start, records)
+
+    def snapshot(self) -> dict[str, dict[str, float]]:
+        return {
+            stage: {
+                "seconds": round(self.seconds[stage], 3),
+                "records": self.records[stage],
+                "records_per_sec": round(self.records[stage] / self.seconds[stage], 1) if self.seconds[stage] > 0 else None,
+            }
+            for stage in STAGES
+        }
+
+
+def serve(port: int) -> None:
+    """Expose the ingest counters on http://0.0.0.0:{port}/metrics for the life of the process."""
+    start_http_server(port)
@@ -0,0 +1,213 @@
+"""Per-dataset nearest-neighbour index over standardized descriptors ("molecules like this one").
+
+Built after ingest from discovered_molecule + molecule_geometry and saved as
+{index_dir}/{dataset_id}.npz plus {dataset_id}.kdtree.pkl, the scipy KD-trees over all
+molecules, over each discovery method and over each (method, seed) cell, so the API answers
+k-NN queries from memory without scanning SQL or building a tree per request.
+"""
+import json
+import os
+import pickle
+import time
+from dataclasses import dataclass
+from pathlib import Path
+
+import asyncpg
+import numpy as np
+from scipy.spatial import cKDTree
+
+# (column in the build query, name in API responses)
+DESCRIPTORS = (
+    ("m.molecular_weight", "molecular_weight"),
+    ("m.tpsa", "TPSA"),
+    ("m.xlogp3", "XLogP3"),
+    ("m.hba", "HBA"),
+    ("m.hbd", "HBD"),
+    ("m.rotatable_bonds", "rotatable_bonds"),
+    ("g.shape_volume", "shape_volume"),
+    ("g.mmff94_energy", "mmff94_energy"),
+)
+
+# Rows fetched per cursor round-trip while building
+BUILD_FETCH_ROWS = 50_000
+
+
+@dataclass
+class Trees:
+    """KD-trees over the whole index and its partitions; partition trees carry their row indices."""
+
+    all: cKDTree
+    # method_key -> (rows, tree)
+    methods: dict[int, tuple[np.ndarray, cKDTree]]
+    # seed_key -> [(method_key, rows, tree)] for every (method, seed) pair present
+    cells: dict[int, list[tuple[int, np.ndarray, cKDTree]]]
+
+
+def build_trees(Z: np.ndarray, method_key: np.ndarray, seed_key: np.ndarray) -> Trees:
+    """Every tree a query can need. A method filter is a union of method trees, a seed filter a
+    union of cells, so no filter ever needs a tree built on the request path.
+    """
+    methods = {}
+    for m in np.unique(method_key):
+        rows = np.flatnonzero(method_key == m)
+        methods[int(m)] = (rows, cKDTree(Z[rows]))
+    cells: dict[int, list] = {}
+    # Stable sort groups rows by (method, seed) while keeping each cell's rows in cid order
+    order = np.lexsort((seed_key, method_key))
+    pairs = np.stack([method_key[order], seed_key[order]], axis=1).astype(np.int64)
+    starts = np.flatnonzero(np.r_[True, np.any(pairs[1:] != pairs[:-1], axis=1)])
+    for start, end in zip(starts, np.r_[starts[1:], len(order)]):
+        rows = np.sort(order[start:end])
+        m, s = (int(v) for v in pairs[start])
+        cells.setdefault(s, []).append((m, rows, cKDTree(Z[rows])))
+    return Trees(cKDTree(Z), methods, cells)
+
+
+def index_dir() -> Path:
+    # Relative to backend/ rather than the working directory, as app.config resolves it for the API
+    return Path(__file__).resolve().parents[1] / os.getenv("NEIGHBOR_INDEX_DIR", "data/neighbor_index")
+
+
+def index_path(dataset_id: str, directory: Path | None = None) -> Path:
+    return (directory or index_dir()) / f"{dataset_id}.npz"
+
+
+async def build_index(conn: asyncpg.Connection, dataset_id: str, directory: Path | None = None) -> Path | None:
+    """Read every molecule's descriptors for dataset_id and write its index; None for an empty dataset.
+
+    Each descriptor is standardized to zero mean / unit variance; missing values are imputed with
+    the mean (0 after standardization) so they do not pull molecules together or apart.
+    """
+    started = time.perf_counter()
+    sql = f"""
+        SELECT m.cid, m.method_key, m.seed_key, {", ".join(col for col, _ in DESCRIPTORS)}
+        FROM discovered_molecule m
+        LEFT JOIN molecule_geometry g ON g.dataset_id = $1 AND g.cid = m.cid
+        WHERE m.dataset_key = (SELECT dataset_key FROM dataset WHERE dataset_id = $1)
+        ORDER BY m.cid
+    """
+    cids, methods, seeds, values = [], [], [], []
+    async with conn.transaction(readonly=True):
+        cursor = await conn.cursor(sql, dataset_id)
+        while True:
+            rows = await cursor.fetch(BUILD_FETCH_ROWS)
+            if not rows:
+                break
+            cids.append(np.fromiter((r[0] for r in rows), dtype=np.int64, count=len(rows)))
+            methods.append(np.fromiter((r[1] for r in rows), dtype=np.int16, count=len(rows)))
+            seeds.append(np.fromiter((-1 if r[2] is None else r[2] for r in rows), dtype=np.int32, count=len(rows)))
+            values.append(np.array([tuple(r)[3:] for r in rows], dtype=np.float64))
+    if not cids:
+        return None
+    X = np.concatenate(values)
+    mean = np.nanmean(X, axis=0)
+    std = np.nanstd(X, axis=0)
+    # All-missing or constant columns contribute nothing to distances
+    mean = np.where(np.isnan(mean), 0.0, mean)
+    std = np.where(np.isnan(std) | (std == 0), 1.0, std)
+    Z = (X - mean) / std
+    Z[np.isnan(Z)] = 0.0
+
+    directory = directory or index_dir()
+    directory.mkdir(parents=True, exist_ok=True)
+    path = index_path(dataset_id, directory)
+    meta = {"dataset_id": dataset_id, "descriptors": [name for _, name in DESCRIPTORS], "built_at": time.time()}
+    tmp = path.with_suffix(".tmp.npz")
+    method_key = np.concatenate(methods)
+    seed_key = np.concatenate(seeds)
+    Z = Z.astype(np.float32)
+    np.savez(
+        tmp,
+        cids=np.concatenate(cids),
+        method_key=method_key,
+        seed_key=seed_key,
+        Z=Z,
+        mean=mean,
+        std=std,
+        meta=np.array(json.dumps(meta)),
+    )
+    tree_path = path.with_suffix(".kdtree.pkl")
+    tree_tmp = tree_path.with_suffix(".tmp")
+    with open(tree_tmp, "wb") as f:
+        # Tagged with built_at so trees left from an earlier build are never paired with new data
+        pickle.dump((meta["built_at"], build_trees(Z, method_key, seed_key)), f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tree_tmp, tree_path)
+    # The API reloads when the .npz changes, so it is replaced last
+    os.replace(tmp, path)
+    print(f"Neighbour index for {dataset_id}: {len(Z)} molecules in {time.perf_counter() - started:.1f}s -> {path}")
+    return path
+
+
+class NeighborIndex:
+    """A loaded index: cid lookup, k-NN over all molecules or a method/seed subset."""
+
+    def __init__(self, path: Path):
+        with np.load(path) as data:
+            self.cids = data["cids"]
+            self.method_key = data["method_key"]
+            self.seed_key = data["seed_key"]
+            self.Z = data["Z"]
+            self.meta = json.loads(str(data["meta"]))
+        self.mtime = path.stat().st_mtime
+        self.trees = None
+        tree_path = path.with_suffix(".kdtree.pkl")
+        if tree_path.exists():
+            with open(tree_path, "rb") as f:
+                built_at, trees = pickle.load(f)
+            if built_at == self.meta["built_at"]:
+                self.trees = trees
+        if self.trees is None:
+            # Missing or stale pickle (e.g. an index copied without it): build once, at load
+            self.trees = build_trees(self.Z, self.method_key, self.seed_key)
+
+    def __len__(self) -> int:
+        return len(self.cids)
+
+    def row(self, cid: int) -> int | None:
+        i = int(np.searchsorted(self.cids, cid))
+        return i if i < len(self.cids) and self.cids[i] == cid else None
+
+    def _parts(self, method_keys: tuple[int, ...] | None, seed_keys: tuple[int, ...] | None):
+        """[(row indices or None, tree)] whose union is exactly the molecules matching the filters."""
+        trees = self.trees
+        if method_keys is None and seed_keys is None:
+            return [(None, trees.all)]
+        if seed_keys is None:
+            return [trees.methods[m] for m in method_keys if m in trees.methods]
+        return [
+            (rows, tree)
+            for s in seed_keys
+            for m, rows, tree in trees.cells.get(s, ())
+            if method_keys is None or m in method_keys
+        ]
+
+    def query(
+        self,
+        cid: int,
+        k: int,
+        method_keys: tuple[int, ...] | None = None,
+        seed_keys: tuple[int, ...] | None = None,
+    ) -> list[tuple[int, float]] | None:
+        """[(cid, distance)] of the k nearest other molecules; None when cid is not indexed.
+
+        A filtered query takes the k + 1 nearest from each matching partition tree and merges them.
+        """
+        i = self.row(cid)
+        if i is None:
+            return None
+        x = self.Z[i]
+        dists, idxs = [], []
+        for rows, tree in self._parts(method_keys, seed_keys):
+            want = min(k + 1, tree.n)
+            if want == 0:
+                continue
+            dist, idx = tree.query(x, k=want)
+            dist, idx = np.atleast_1d(dist), np.atleast_1d(idx)
+            dists.append(dist)
+            idxs.append(idx if rows is None else rows[idx])
+        if not dists:
+            return []
+        dist, idx = np.concatenate(dists), np.concatenate(idxs)
+        order = np.lexsort((idx, dist))
+        out = [(int(self.cids[j]), float(dist[o])) for o, j in zip(order, idx[order]) if j != i]
+        return out[:k]
@@ -0,0 +1,137 @@
+"""Parquet snapshot of a dataset's hot tables for the DuckDB analytics backend (app.analytics).
+
+Each dataset is written to {parquet_dir}/{dataset_id}/ as molecules.parquet -- one row per
+discovered_molecule, with the dimension labels and the hot molecule_geometry columns joined
+in, since Parquet dictionary-encodes the repeated text -- plus dataset.json with the name,
+row count and the dataset version token the API uses for ETags. The directory can be copied
+elsewhere and served without a Postgres server. Needs the optional `duckdb` package.
+"""
+import json
+import os
+import time
+from pathlib import Path
+
+import asyncpg
+import pandas as pd
+
+# Column -> DuckDB type; the read side (app.analytics) relies on these names
+SNAPSHOT_COLUMNS = (
+    ("cid", "INTEGER"),
+    ("smiles", "VARCHAR"),
+    ("inchi_key", "VARCHAR"),
+    ("molecular_formula", "VARCHAR"),
+    ("molecular_weight", "DOUBLE"),
+    ("exact_mass", "DOUBLE"),
+    ("xlogp3", "DOUBLE"),
+    ("tpsa", "DOUBLE"),
+    ("hba", "INTEGER"),
+    ("hbd", "INTEGER"),
+    ("rotatable_bonds", "INTEGER"),
+    ("name", "VARCHAR"),
+    ("discovery_method", "VARCHAR"),
+    ("discovery_seed", "VARCHAR"),
+    ("seed_name", "VARCHAR"),
+    ("seed_smiles", "VARCHAR"),
+    ("mmff94_energy", "DOUBLE"),
+    ("shape_volume", "DOUBLE"),
+)
+
+# Rows fetched per cursor round-trip and appended to the snapshot at a time
+EXPORT_FETCH_ROWS = 50_000
+
+# Rows per Parquet row group: the unit DuckDB skips using min/max statistics
+ROW_GROUP_SIZE = 122_880
+
+_EXPORT_SQL = """
+    SELECT m.cid, m.smiles, m.inchi_key, m.molecular_formula, m.molecular_weight, m.exact_mass,
+           m.xlogp3, m.tpsa, m.hba, m.hbd, m.rotatable_bonds, m.name,
+           dm.name AS discovery_method, ds.discovery_seed, ds.seed_name, ds.seed_smiles,
+           g.mmff94_energy, g.shape_volume
+    FROM discovered_molecule m
+    LEFT JOIN discovery_method dm ON dm.method_key = m.method_key
+    LEFT JOIN discovery_seed ds ON ds.seed_key = m.seed_key
+    LEFT JOIN molecule_geometry g ON g.dataset_id = $1 AND g.cid = m.cid
+    WHERE m.dataset_key = (SELECT dataset_key FROM dataset WHERE dataset_id = $1)
+    ORDER BY m.cid
+"""
+
+# Same token as app.versions.DatasetVersions, so ETags agree with the Postgres backend
+_DATASET_SQL = """
+    SELECT d.name, d.created_at, COUNT(r.run_id) AS runs, MAX(r.finished_at) AS finished_at
+    FROM dataset d
+    LEFT JOIN ingest_run r ON r.dataset_id = d.dataset_id AND r.status = 'completed'
+    WHERE d.dataset_id = $1
+    GROUP BY d.dataset_id
+"""
+
+
+def parquet_dir() -> Path:
+    # Relative to backend/ rather than the working directory, as app.config resolves it for the API
+    return Path(__file__).resolve().parents[1] / os.getenv("PARQUET_DIR", "data/parquet")
+
+
+def snapshot_dir(dataset_id: str, directory: Path | None = None) -> Path:
+    return (directory or parquet_dir()) / dataset_id
+
+
+async def export_dataset(conn: asyncpg.Connection, dataset_id: str, directory: Path | None = None) -> Path | None:
+    """Write the dataset's snapshot; None when the dataset does not exist.
+
+    Rows are staged in a scratch DuckDB database next to the snapshot (not in memory), then
+    copied out as one zstd-compressed Parquet file ordered by cid.
+    """
+    import duckdb
+
+    started = time.perf_counter()
+    out = snapshot_dir(dataset_id, directory)
+    scratch = out / "export.duckdb.tmp"
+    names = [name for name, _ in SNAPSHOT_COLUMNS]
+    rows_written = 0
+    db = None
+    try:
+        # One snapshot for the version token and the rows, so the token describes exactly these rows
+        async with conn.transaction(isolation="repeatable_read", readonly=True):
+            info = await conn.fetchrow(_DATASET_SQL, dataset_id)
+            if info is None:
+                return None
+            out.mkdir(parents=True, exist_ok=True)
+            scratch.unlink(missing_ok=True)
+            db = duckdb.connect(str(scratch))
+            db.execute(f"CREATE TABLE molecules ({', '.join(f'{n} {t}' for n, t in SNAPSHOT_COLUMNS)})")
+            cursor = await conn.cursor(_EXPORT_SQL, dataset_id)
+            while True:
+                rows = await cursor.fetch(EXPORT_FETCH_ROWS)
+                if not rows:
+                    break
+                db.register("batch", pd.DataFrame.from_records([tuple(r) for r in rows], columns=names))
+                # By name: DuckDB casts the frame's inferred types (e.g. float for nullable ints)
+                db.execute("INSERT INTO molecules BY NAME SELECT * FROM batch")
+                db.unregister("batch")
+                rows_written += len(rows)
+        tmp = out / "molecules.parquet.tmp"
+        db.execute(
+            f"COPY molecules TO '{tmp.as_posix()}' (FORMAT parquet, COMPRESSION zstd, ROW_GROUP_SIZE {ROW_GROUP_SIZE})"
+        )
+    finally:
+        if db is not None:
+            db.close()
+        scratch.unlink(missing_ok=True)
+        scratch.with_name(scratch.name + ".wal").unlink(missing_ok=True)
+    os.replace(tmp, out / "molecules.parquet")
+
+    finished_us = int(info["finished_at"].timestamp() * 1e6) if info["finished_at"] else 0
+    meta = {
+        "dataset_id": dataset_id,
+        "name": info["name"],
+        "created_at": info["created_at"].isoformat() if info["created_at"] else None,
+        "molecule_count": rows_written,
+        "version": f"{info['runs']}-{finished_us}",
+        "exported_at": time.time(),
+        "columns": names,
+    }
+    # The API reads dataset.json to find snapshots, so it is replaced last
+    meta_tmp = out / "dataset.json.tmp"
+    meta_tmp.write_text(json.dumps(meta, indent=2))
+    os.replace(meta_tmp, out / "dataset.json")
+    print(f"Parquet snapshot for {dataset_id}: {rows_written} molecules in {time.perf_counter() - started:.1f}s -> {out}")
+    return out
@@ -0,0 +1,60 @@
+"""Live ingest progress: counters periodically flushed into ingest_run.stats."""
+import time
+from typing import Any
+
+import asyncpg
+
+from . import db as ingest_db
+from .metrics import StageTimer
+
+
+class Progress:
+    """Records parsed/written/skipped plus throughput and ETA for one ingest run.
+
+    work_total / work_done drive the ETA in whatever unit is known up front
+    (rows for CSV, bytes for SDF, where record counts are only known after parsing).
+    """
+
+    def __init__(self, run_id: str, kind: str, work_total: float | None = None, interval: float = 2.0):
+        self.run_id = run_id
+        self.stages = StageTimer(kind)
+        self.work_total = work_total
+        self.work_done = 0.0
+        self.interval = interval
+        self.parsed = 0
+        self.written = 0
+        self.skipped = 0
+        self._started = time.monotonic()
+        self._last_flush = 0.0
+
+    def add(self, parsed: int = 0, written: int = 0, skipped: int = 0, work: float = 0.0) -> None:
+        self.parsed += parsed
+        self.written += written
+        self.skipped += skipped
+        self.work_done += work
+
+    def snapshot(self) -> dict[str, Any]:
+        elapsed = time.monotonic() - self._started
+        out = {
+            "records_parsed": self.parsed,
+            "records_written": self.written,
+            "records_skipped": self.skipped,
+            "elapsed_seconds": round(elapsed, 1),
+            "records_per_sec": round(self.parsed / elapsed, 1) if elapsed > 0 else None,
+            "eta_seconds": None,
+            "stages": self.stages.snapshot(),
+        }
+        if self.work_total:
+            fraction = min(self.work_done / self.work_total, 1.0)
+            out["percent"] = round(100.0 * fraction, 1)
+            if fraction > 0:
+                out["eta_seconds"] = round(elapsed * (1.0 - fraction) / fraction, 1)
+        return out
+
+    async def maybe_flush(self, conn: asyncpg.Connection, force: bool = False) -> None:
+        """Write the snapshot to ingest_run.stats if `interval` seconds have passed (or force)."""
+        now = time.monotonic()
+        if not force and now - self._last_flush < self.interval:
+            return
+        self._last_flush = now
+        await ingest_db.update_run_stats(conn, self.run_id, {"progress": self.snapshot()})
@@ -1,11 +1,15 @@
 """Ingest SDF.gz / SDF files: extract hot columns + molblock + cold blobs into DB."""
 import gzip
 import io
+import time
 from pathlib import Path
-from typing import Any, Iterator
+from itertools import islice
+from typing import Any, BinaryIO, Iterator, TextIO
 
 from rdkit import Chem
 
+from .checkpoint import geometry_content_hash
+
 # Hot columns from SDF (spec)
 HOT_TAGS = {
     "PUBCHEM_CONFORMER_ID": "conformer_id",
@@ -25,6 +29,9 @@ COLD_TAGS = [
     "PUBCHEM_COORDINATE_TYPE",
 ]
 
+# Manifest CIDs for this worker process (set once by init_worker, not pickled per chunk)
+_valid_cids: frozenset[int] | None = None
+
 
 def _read_molblock_and_props(supplier) -> Iterator[tuple[int, str, dict[str, Any], dict[str, bytes | None]]]:
     """Yield (cid, molblock, hot_dict, cold_dict) for each molecule."""
@@ -67,58 +74,119 @@ def _read_molblock_and_props(supplier) -> Iterator[tuple[int, str, dict[str, Any
         yield cid_int, molblock, hot, cold
 
 
-def iter_sdf_records(path: str | Path) -> Iterator[tuple[int, str, dict[str, Any], dict[str, bytes | None]]]:
-    """Open SDF (or .gz) and yield (cid, molblock, hot_dict, cold_dict) per record."""
+def _block_props(mol_block: str) -> dict[str, str]:
+    """SDF data items ("> <TAG>" followed by value lines) after M  END; MolFromMolBlock drops them."""
+    props = {}
+    tag = None
+    values: list[str] = []
+    for line in mol_block.split("M  END", 1)[-1].splitlines():
+        if line.startswith(">") and "<" in line and ">" in line[1:]:
+            tag = line[line.index("<") + 1:line.rindex(">")]
+            values = []
+        elif tag is not None:
+            if line.strip() == "" or line.strip() == "$$$$":
+                props[tag] = "\n".join(values)
+                tag = None
+            else:
+                values.append(line)
+    if tag is not None:
+        props[tag] = "\n".join(values)
+    return props
+
+
+def _open_sdf(path: str | Path) -> tuple[BinaryIO, TextIO]:
+    """(raw file, decoded text stream) for an SDF or .gz file, decompressed as it is read."""
     path = Path(path)
     if not path.exists():
         raise FileNotFoundError(f"SDF not found: {path}")
-    if path.suffix == ".gz" or path.name.endswith(".sdf.gz"):
-        with gzip.open(path, "rb") as f:
-            content = f.read()
-    else:
-        content = path.read_bytes()
-    supplier = Chem.MolFromMolBlock
-    # SDMolSupplier from block
-    block = content.decode("utf-8", errors="replace")
+    raw = open(path, "rb")
+    stream = gzip.GzipFile(fileobj=raw) if path.suffix == ".gz" or path.name.endswith(".sdf.gz") else raw
+    return raw, io.TextIOWrapper(stream, encoding="utf-8", errors="replace")
+
+
+def _blocks(text: TextIO) -> Iterator[str]:
     current = []
-    for line in block.splitlines():
+    for line in text:
+        line = line.rstrip("\n").rstrip("\r")
         current.append(line)
         if line.strip() == "$$$$":
-            mol_block = "\n".join(current)
+            yield "\n".join(current)
             current = []
-            mol = Chem.MolFromMolBlock(mol_block)
-            if mol is None:
-                continue
-            cid = mol.GetProp("PUBCHEM_COMPOUND_CID") if mol.HasProp("PUBCHEM_COMPOUND_CID") else None
-            if not cid:
-                continue
-            hot = {}
-            for tag, key in HOT_TAGS.items():
-                if mol.HasProp(tag):
-                    val = mol.GetProp(tag)
-                    try:
-                        if key in ("mmff94_energy", "conformer_rmsd", "shape_volume", "shape_selfoverlap"):
-                            hot[key] = float(val)
-                        elif key in ("effective_rotor_count", "heavy_atom_count", "component_count"):
-                            hot[key] = int(float(val))
-                        else:
-                            hot[key] = val
-                    except (TypeError, ValueError):
-                        hot[key] = None
-                else:
-                    hot[key] = None
-            cold = {}
-            for ctag in COLD_TAGS:
-                if mol.HasProp(ctag):
-                    v = mol.GetProp(ctag)
-                    cold[ctag] = v.encode("utf-8") if isinstance(v, str) else bytes(v)
-                else:
-                    cold[ctag] = None
+
+
+def iter_sdf_blocks(path: str | Path) -> Iterator[str]:
+    """Open SDF (or .gz) and yield the raw text of each record (up to and including $$$$)."""
+    raw, text = _open_sdf(path)
+    with raw, text:
+        yield from _blocks(text)
+
+
+class SdfChunks:
+    """Raw records of one SDF (or .gz) file in lists of up to `size`, read as they are asked for.
+
+    Only the current chunk is held in memory. bytes_read is the position in the file on disk
+    (compressed bytes for .gz), for progress against its size.
+    """
+
+    def __init__(self, path: str | Path, size: int, skip: int = 0):
+        self.size = size
+        self._raw, self._text = _open_sdf(path)
+        self._blocks = islice(_blocks(self._text), skip, None)
+
+    @property
+    def bytes_read(self) -> int:
+        return self._raw.tell()
+
+    def next_chunk(self) -> list[str]:
+        return list(islice(self._blocks, self.size))
+
+    def close(self) -> None:
+        self._text.close()
+        self._raw.close()
+
+
+def parse_sdf_block(mol_block: str) -> tuple[int, str, dict[str, Any], dict[str, bytes | None]] | None:
+    """Parse one SDF record into (cid, molblock, hot_dict, cold_dict); None if unusable."""
+    mol = Chem.MolFromMolBlock(mol_block)
+    if mol is None:
+        return None
+    props = _block_props(mol_block)
+    cid = props.get("PUBCHEM_COMPOUND_CID")
+    if not cid:
+        return None
+    hot = {}
+    for tag, key in HOT_TAGS.items():
+        if tag in props:
+            val = props[tag]
             try:
-                cid_int = int(float(cid))
+                if key in ("mmff94_energy", "conformer_rmsd", "shape_volume", "shape_selfoverlap"):
+                    hot[key] = float(val)
+                elif key in ("effective_rotor_count", "heavy_atom_count", "component_count"):
+                    hot[key] = int(float(val))
+                else:
+                    hot[key] = val
             except (TypeError, ValueError):
-                continue
-            yield cid_int, mol_block, hot, cold
+                hot[key] = None
+        else:
+            hot[key] = None
+    cold = {}
+    for ctag in COLD_TAGS:
+        cold[ctag] = props[ctag].encode("utf-8") if ctag in props else None
+    try:
+        cid_int = int(float(cid))
+    except (TypeError, ValueError):
+        return None
+    return cid_int, mol_block, hot, cold
+
+
+def iter_sdf_records(path: str | Path, skip: int = 0) -> Iterator[tuple[int, str, dict[str, Any], dict[str, bytes | None]]]:
+    """Open SDF (or .gz) and yield (cid, molblock, hot_dict, cold_dict) per record, after the first `skip` records."""
+    for i, mol_block in enumerate(iter_sdf_blocks(path)):
+        if i < skip:
+            continue
+        rec = parse_sdf_block(mol_block)
+        if rec is not None:
+            yield rec
 
 
 def iter_sdf_records_supplier(path: str | Path) -> Iterator[tuple[int, str, dict[str, Any], dict[str, bytes | None]]]:
@@ -133,3 +201,44 @@ def iter_sdf_records_supplier(path: str | Path) -> Iterator[tuple[int, str, dict
     else:
         supp = Chem.SDMolSupplier(str(path))
     yield from _read_molblock_and_props(supp)
+
+
+def init_worker(valid_cids: frozenset[int] | None) -> None:
+    """ProcessPoolExecutor initializer: remember the manifest CIDs."""
+    global _valid_cids
+    _valid_cids = valid_cids
+
+
+def parse_sdf_chunk(
+    first: int, blocks: list[str]
+) -> tuple[list[tuple[int, int, tuple[int, str, dict[str, Any], dict[str, bytes | None]]]], dict[str, Any]]:
+    """Parse raw records (in a worker process); blocks[0] is record `first` of its file.
+
+    Returns ([(position, content_hash, record)] for manifest CIDs, counts), where position is
+    the record's 0-based index in the file. Comparing the hash with the stored one is left to
+    the caller, so stored hashes never have to be copied into the workers.
+    """
+    records = []
+    counts = {
+        "parsed_ok": 0,
+        "skipped_not_in_manifest": 0,
+        "parse_seconds": 0.0,
+        "transform_seconds": 0.0,
+    }
+    t0 = time.perf_counter()
+    for i, mol_block in enumerate(blocks, start=first):
+        rec = parse_sdf_block(mol_block)
+        if rec is None:
+            continue
+        t1 = time.perf_counter()
+        counts["parse_seconds"] += t1 - t0
+        counts["parsed_ok"] += 1
+        cid, molblock, hot, cold = rec
+        if _valid_cids is not None and cid not in _valid_cids:
+            counts["skipped_not_in_manifest"] += 1
+        else:
+            records.append((i, geometry_content_hash(molblock, hot, cold), rec))
+        t0 = time.perf_counter()
+        counts["transform_seconds"] += t0 - t1
+    counts["parse_seconds"] += time.perf_counter() - t0
+    return records, counts
@@ -0,0 +1,81 @@
+-- Narrow the hot molecule table: dataset, discovery method and seed move to small integer keys
+
+-- Dataset surrogate key (existing rows are numbered when the column is added)
+ALTER TABLE dataset ADD COLUMN IF NOT EXISTS dataset_key INTEGER GENERATED BY DEFAULT AS IDENTITY;
+ALTER TABLE dataset ADD CONSTRAINT dataset_dataset_key_key UNIQUE (dataset_key);
+
+-- Discovery method dimension (substructure, sim2d, sim3d, ...)
+CREATE TABLE IF NOT EXISTS discovery_method (
+    method_key SMALLINT GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE
+);
+
+-- Seed dimension: raw discovery_seed plus its parsed seed_name / seed_smiles
+CREATE TABLE IF NOT EXISTS discovery_seed (
+    seed_key INTEGER GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY,
+    discovery_seed TEXT NOT NULL UNIQUE,
+    seed_name TEXT,
+    seed_smiles TEXT
+);
+
+CREATE INDEX IF NOT EXISTS idx_ds_seed_name ON discovery_seed(seed_name);
+
+INSERT INTO discovery_method (name)
+SELECT DISTINCT discovery_method FROM discovered_molecule
+ON CONFLICT (name) DO NOTHING;
+
+INSERT INTO discovery_seed (discovery_seed, seed_name, seed_smiles)
+SELECT DISTINCT ON (discovery_seed) discovery_seed, seed_name, seed_smiles
+FROM discovered_molecule
+WHERE discovery_seed IS NOT NULL
+ORDER BY discovery_seed
+ON CONFLICT (discovery_seed) DO NOTHING;
+
+ALTER TABLE discovered_molecule RENAME TO discovered_molecule_v1;
+
+-- Hot: fixed-width columns first so rows pack without alignment padding
+CREATE TABLE discovered_molecule (
+    dataset_key INTEGER NOT NULL REFERENCES dataset(dataset_key),
+    cid INTEGER NOT NULL,
+    molecular_weight DOUBLE PRECISION,
+    exact_mass DOUBLE PRECISION,
+    xlogp3 DOUBLE PRECISION,
+    tpsa DOUBLE PRECISION,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+    hba INTEGER,
+    hbd INTEGER,
+    rotatable_bonds INTEGER,
+    seed_key INTEGER REFERENCES discovery_seed(seed_key),
+    method_key SMALLINT NOT NULL REFERENCES discovery_method(method_key),
+    smiles TEXT,
+    inchi_key TEXT,
+    molecular_formula TEXT,
+    name TEXT,
+    ingest_run_id TEXT,
+    PRIMARY KEY (dataset_key, cid)
+);
+
+INSERT INTO discovered_molecule (
+    dataset_key, cid, molecular_weight, exact_mass, xlogp3, tpsa, created_at,
+    hba, hbd, rotatable_bonds, seed_key, method_key,
+    smiles, inchi_key, molecular_formula, name, ingest_run_id
+)
+SELECT d.dataset_key, v.cid, v.molecular_weight, v.exact_mass, v.xlogp3, v.tpsa, v.created_at,
+       v.hba, v.hbd, v.rotatable_bonds, s.seed_key, dm.method_key,
+       v.smiles, v.inchi_key, v.molecular_formula, v.name, v.ingest_run_id
+FROM discovered_molecule_v1 v
+JOIN dataset d ON d.dataset_id = v.dataset_id
+JOIN discovery_method dm ON dm.name = v.discovery_method
+LEFT JOIN discovery_seed s ON s.discovery_seed = v.discovery_seed;
+
+DROP TABLE discovered_molecule_v1;
+
+CREATE INDEX IF NOT EXISTS idx_dm_dataset_seed ON discovered_molecule(dataset_key, seed_key);
+CREATE INDEX IF NOT EXISTS idx_dm_dataset_method ON discovered_molecule(dataset_key, method_key);
+CREATE INDEX IF NOT EXISTS idx_dm_mw ON discovered_molecule(molecular_weight);
+CREATE INDEX IF NOT EXISTS idx_dm_tpsa ON discovered_molecule(tpsa);
+CREATE INDEX IF NOT EXISTS idx_dm_xlogp3 ON discovered_molecule(xlogp3);
+
+COMMENT ON TABLE discovery_method IS 'Dimension: discovery method name per method_key';
+COMMENT ON TABLE discovery_seed IS 'Dimension: discovery_seed text and parsed seed_name/seed_smiles per seed_key';
+COMMENT ON TABLE discovered_molecule IS 'Hot path: CSV metadata keyed by (dataset_key, cid); method and seed text live in dimension tables';
@@ -0,0 +1,23 @@
+-- Incremental ingest: per-file checkpoints and per-row content hashes
+
+-- One row per (dataset, file); records_done is committed together with each batch
+CREATE TABLE IF NOT EXISTS ingest_checkpoint (
+    dataset_id TEXT NOT NULL REFERENCES dataset(dataset_id),
+    kind TEXT NOT NULL,
+    path TEXT NOT NULL,
+    sha256 TEXT NOT NULL,
+    size_bytes BIGINT NOT NULL,
+    records_done INTEGER NOT NULL DEFAULT 0,
+    status TEXT NOT NULL DEFAULT 'running',
+    run_id TEXT REFERENCES ingest_run(run_id),
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+    PRIMARY KEY (dataset_id, kind, path)
+);
+
+CREATE INDEX IF NOT EXISTS idx_ic_run ON ingest_checkpoint(run_id);
+
+-- 64-bit hash of the ingested payload; unchanged rows are not rewritten
+ALTER TABLE discovered_molecule ADD COLUMN IF NOT EXISTS content_hash BIGINT;
+ALTER TABLE molecule_geometry ADD COLUMN IF NOT EXISTS content_hash BIGINT;
+
+COMMENT ON TABLE ingest_checkpoint IS 'Per-file ingest progress: checksum, records committed, completed/running, last run';
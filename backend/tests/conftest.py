@@ -0,0 +1,7 @@
+import sys
+from pathlib import Path
+
+# Tests import the backend packages (app, ingest) as the API and ingest CLI do
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+# ... and the benchmark helpers as `bench`, from the repository root
+sys.path.insert(1, str(Path(__file__).resolve().parents[2]))
@@ -0,0 +1,97 @@
+"""Stand-ins for asyncpg connections and pools, for ingest code whose SQL is patched out."""
+from contextlib import asynccontextmanager
+
+
+class FakeConnection:
+    @asynccontextmanager
+    async def transaction(self, **kwargs):
+        yield
+
+    async def close(self):
+        pass
+
+
+class FakePool:
+    def __init__(self):
+        self.conn = FakeConnection()
+
+    @asynccontextmanager
+    async def acquire(self):
+        yield self.conn
+
+
+class RecordingConnection(FakeConnection):
+    """Keeps the statements sent with execute()."""
+
+    def __init__(self):
+        self.executed: list[str] = []
+
+    async def execute(self, sql, *args):
+        self.executed.append(sql)
+
+
+class FakeApiPool:
+    """Pool with asyncpg's acquire()/release() calls, as the API's conn_for uses them."""
+
+    def __init__(self):
+        self.conn = RecordingConnection()
+        self.released = []
+
+    async def acquire(self):
+        return self.conn
+
+    async def release(self, conn):
+        self.released.append(conn)
+
+
+class FakeIngestDB:
+    """In-memory replacements for the ingest.db functions the CSV ingest calls."""
+
+    def __init__(self):
+        self.checkpoints: dict[tuple, dict] = {}
+        self.hashes: dict[int, int] = {}
+        self.upserted: list[dict] = []
+        self.runs: dict[str, dict] = {}
+
+    def install(self, monkeypatch, cli_module, db_module) -> None:
+        async def connect(*args, **kwargs):
+            return FakeConnection()
+
+        monkeypatch.setattr(cli_module.asyncpg, "connect", connect)
+        for name in (
+            "run_migration", "get_checkpoint", "save_checkpoint", "ensure_dataset_and_run",
+            "molecule_content_hashes", "upsert_molecules", "update_run_stats", "finish_run", "fail_run",
+        ):
+            monkeypatch.setattr(db_module, name, getattr(self, name))
+
+    async def run_migration(self, conn, migrations_dir):
+        pass
+
+    async def get_checkpoint(self, conn, dataset_id, kind, path):
+        return self.checkpoints.get((dataset_id, kind, path))
+
+    async def save_checkpoint(self, conn, dataset_id, kind, path, sha256, size_bytes, records_done, run_id,
+                              status="running"):
+        self.checkpoints[(dataset_id, kind, path)] = {
+            "sha256": sha256, "size_bytes": size_bytes, "records_done": records_done, "status": status,
+            "run_id": run_id,
+        }
+
+    async def ensure_dataset_and_run(self, conn, dataset_id, name, run_id):
+        self.runs[run_id] = {"status": "running"}
+
+    async def molecule_content_hashes(self, conn, dataset_id):
+        return dict(self.hashes)
+
+    async def upsert_molecules(self, conn, rows):
+        self.upserted.extend(rows)
+        self.hashes.update((r["cid"], r["content_hash"]) for r in rows)
+
+    async def update_run_stats(self, conn, run_id, stats):
+        pass
+
+    async def finish_run(self, conn, run_id, stats):
+        self.runs[run_id] = {"status": "completed", "stats": stats}
+
+    async def fail_run(self, conn, run_id, error):
+        self.runs[run_id] = {"status": "failed", "error": error}
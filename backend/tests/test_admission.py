@@ -0,0 +1,119 @@
+import asyncio
+
+import asyncpg
+import pytest
+from fastapi import HTTPException
+
+from app import main
+from app.admission import RouteAdmission
+
+from fakes import FakeApiPool
+
+
+class FakeRequest:
+    def __init__(self, disconnect_after=None):
+        self.disconnect_after = disconnect_after
+        self.polls = 0
+
+    async def is_disconnected(self):
+        self.polls += 1
+        return self.disconnect_after is not None and self.polls > self.disconnect_after
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    pool = FakeApiPool()
+    monkeypatch.setattr(main.pools, "primary", pool)
+    monkeypatch.setattr(main.pools, "for_route", lambda route: (pool, None))
+    monkeypatch.setattr(main, "admission", RouteAdmission({"query": 1}, queue_timeout=0.05))
+    monkeypatch.setattr(main.settings, "route_statement_timeout_ms", {"query": 1234})
+    monkeypatch.setattr(main, "DISCONNECT_POLL_INTERVAL", 0.01)
+    return pool
+
+
+def test_unlimited_routes_are_not_gated():
+    admission = RouteAdmission({"query": 0}, queue_timeout=0.01)
+
+    async def run():
+        async with admission.admit("query"), admission.admit("query"):
+            pass
+
+    asyncio.run(run())
+
+
+def test_queue_timeout_sheds_with_retry_after():
+    admission = RouteAdmission({"query": 1}, queue_timeout=0.02)
+
+    async def run():
+        async with admission.admit("query"):
+            with pytest.raises(HTTPException) as e:
+                async with admission.admit("query"):
+                    pass
+        # The slot is free again once the first request finishes
+        async with admission.admit("query"):
+            pass
+        return e.value
+
+    error = asyncio.run(run())
+    assert error.status_code == 503
+    assert error.headers == {"Retry-After": "1"}
+
+
+def test_connection_gets_route_timeout_and_is_released(pool):
+    async def run():
+        gen = main.conn_for("query")(FakeRequest())
+        conn = await gen.__anext__()
+        await gen.aclose()
+        return conn
+
+    conn = asyncio.run(run())
+    assert conn.executed == ["SET statement_timeout = 1234"]
+    assert pool.released == [conn]
+
+
+def test_statement_timeout_maps_to_504(pool):
+    async def run():
+        gen = main.conn_for("query")(FakeRequest())
+        await gen.__anext__()
+        with pytest.raises(HTTPException) as e:
+            await gen.athrow(asyncpg.QueryCanceledError("canceling statement due to statement timeout"))
+        return e.value
+
+    error = asyncio.run(run())
+    assert error.status_code == 504
+    assert pool.released == [pool.conn]
+
+
+def test_second_request_waits_for_the_slot_then_503(pool):
+    async def run():
+        first = main.conn_for("query")(FakeRequest())
+        await first.__anext__()
+        with pytest.raises(HTTPException) as e:
+            await main.conn_for("query")(FakeRequest()).__anext__()
+        await first.aclose()
+        return e.value
+
+    error = asyncio.run(run())
+    assert (error.status_code, error.headers["Retry-After"]) == (503, "1")
+    assert pool.released == [pool.conn]
+
+
+def test_client_disconnect_cancels_the_query(pool):
+    async def handler():
+        gen = main.conn_for("query")(FakeRequest(disconnect_after=2))
+        await gen.__anext__()
+        try:
+            # A long-running query: the disconnect watcher cancels this task
+            await asyncio.sleep(10)
+        finally:
+            await gen.aclose()
+
+    async def run():
+        task = asyncio.create_task(handler())
+        with pytest.raises(asyncio.CancelledError):
+            await asyncio.wait_for(task, 2)
+        return task
+
+    task = asyncio.run(run())
+    assert task.cancelled()
+    assert pool.released == [pool.conn]
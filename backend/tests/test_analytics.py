@@ -0,0 +1,45 @@
+import json
+from pathlib import Path
+
+import pytest
+
+from app.analytics import DuckDBAnalytics, _where, order_by
+from app.config import Settings
+from app.main import MoleculesQueryBody
+from ingest import parquet_export
+
+
+def test_order_by_matches_postgres_null_order():
+    body = MoleculesQueryBody(sort=[{"field": "TPSA", "dir": "asc"}, {"field": "molecular_weight", "dir": "desc"}])
+    assert order_by(body) == "tpsa ASC NULLS LAST, molecular_weight DESC NULLS FIRST, cid ASC"
+    assert order_by(MoleculesQueryBody()) == "cid ASC"
+
+
+def test_order_by_rejects_unknown_fields():
+    with pytest.raises(ValueError, match="Unknown sort field"):
+        order_by(MoleculesQueryBody(sort=[{"field": "cid; DROP TABLE x", "dir": "asc"}]))
+
+
+def test_where_binds_every_value():
+    body = MoleculesQueryBody(seed_name="fam", methods=["a", "b"], ranges={"TPSA": [0, 50], "unknown": [1, 2]})
+    where, params = _where(body)
+    assert where == "TRUE AND seed_name = ? AND discovery_method IN (?, ?) AND tpsa >= ? AND tpsa <= ?"
+    assert params == ["fam", "a", "b", 0.0, 50.0]
+
+
+def test_snapshot_meta_lookup(tmp_path):
+    (tmp_path / "ds").mkdir()
+    (tmp_path / "ds" / "dataset.json").write_text(json.dumps({"dataset_id": "ds", "version": "1-0"}))
+    analytics = DuckDBAnalytics(tmp_path)
+    assert analytics.meta("ds")["version"] == "1-0"
+    assert analytics.meta("../ds") is None
+    assert analytics.source("missing") is None
+    assert [m["dataset_id"] for m in analytics.datasets()] == ["ds"]
+
+
+def test_parquet_dir_is_anchored_to_backend(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.delenv("PARQUET_DIR", raising=False)
+    backend = Path(parquet_export.__file__).resolve().parents[1]
+    assert parquet_export.parquet_dir() == backend / "data" / "parquet"
+    assert Path(Settings.from_env().parquet_dir) == parquet_export.parquet_dir()
@@ -0,0 +1,45 @@
+import asyncio
+
+from bench import ingest_bench
+from bench.common import percentiles
+from bench.compare import _flatten, _higher_is_better, compare
+
+
+def test_percentiles_nearest_rank():
+    r = percentiles([float(v) for v in range(100, 0, -1)])
+    assert (r["count"], r["mean_ms"], r["max_ms"]) == (100, 50.5, 100.0)
+    assert (r["p50_ms"], r["p95_ms"], r["p99_ms"]) == (50.0, 95.0, 99.0)
+    assert percentiles([7.0])["p99_ms"] == 7.0
+    assert percentiles([])["p50_ms"] is None
+
+
+def test_flatten_keeps_numbers_only():
+    doc = {"csv": {"records": 10, "stages": {"write": {"seconds": 1.5}}, "skipped": "unchanged", "ok": True}}
+    assert _flatten(doc) == {"csv.records": 10.0, "csv.stages.write.seconds": 1.5}
+
+
+def test_higher_is_better():
+    for metric in ("requests", "requests_per_sec", "csv.records", "csv.records_per_sec"):
+        assert _higher_is_better(metric)
+    for metric in ("overall.p95_ms", "wall_seconds", "csv.records_written_ms"):
+        assert not _higher_is_better(metric)
+
+
+def test_compare_flags_regressions_in_the_right_direction():
+    base = {"results": {"requests_per_sec": 100, "overall": {"p95_ms": 10, "count": 5}, "errors": 0}}
+    head = {"results": {"requests_per_sec": 85, "overall": {"p95_ms": 9, "count": 1}, "errors": 3}}
+    rows = {metric: (change, regressed) for metric, _, _, change, regressed in compare(base, head, 10.0)}
+    assert rows == {"requests_per_sec": (-15.0, True), "overall.p95_ms": (-10.0, False)}
+
+
+def test_unchanged_ingest_is_reported_as_skipped(monkeypatch, tmp_path):
+    async def noop(*args, **kwargs):
+        return None
+
+    monkeypatch.setattr(ingest_bench.cli, "migrate", noop)
+    monkeypatch.setattr(ingest_bench.cli, "ingest_csv", noop)
+    monkeypatch.setattr(ingest_bench.cli, "ingest_sdf", noop)
+    (tmp_path / "a.sdf.gz").write_bytes(b"")
+    results = asyncio.run(ingest_bench.run("ds", tmp_path, jobs=1, force=False))
+    assert results["csv"]["skipped"] == results["sdf"]["skipped"] == "unchanged"
+    assert "records" not in results["csv"]
@@ -0,0 +1,106 @@
+import asyncio
+import zlib
+
+import pytest
+
+from app import compression
+from app.compression import CompressionMiddleware, choose_encoding
+
+BODY = b'{"cid": 1, "name": "ethanol"}\n' * 100
+
+
+@pytest.fixture
+def no_zstd(monkeypatch):
+    monkeypatch.setattr(compression, "zstandard", None)
+
+
+def test_choose_encoding_prefers_zstd_on_ties():
+    if compression.zstandard is None:
+        pytest.skip("zstandard not installed")
+    assert choose_encoding("gzip, zstd") == "zstd"
+    assert choose_encoding("gzip;q=1.0, zstd;q=0.5") == "gzip"
+    assert choose_encoding("*") == "zstd"
+
+
+def test_choose_encoding_respects_q_values(no_zstd):
+    assert choose_encoding("gzip, deflate, br") == "gzip"
+    assert choose_encoding("zstd") is None
+    assert choose_encoding("gzip;q=0") is None
+    assert choose_encoding("gzip;q=0, *;q=1") is None
+    assert choose_encoding("br, *;q=0.1") == "gzip"
+    assert choose_encoding("gzip;q=bogus") is None
+    assert choose_encoding("") is None
+
+
+def _run(messages, accept="gzip", minimum_size=100, headers=()):
+    async def app(scope, receive, send):
+        for m in messages:
+            await send(m)
+
+    sent = []
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {"type": "http", "headers": [(b"accept-encoding", accept.encode())]}
+    asyncio.run(CompressionMiddleware(app, minimum_size=minimum_size)(scope, None, send))
+    start, *bodies = sent
+    return dict((k.decode().lower(), v.decode()) for k, v in start["headers"]), bodies
+
+
+def _start(content_type="application/json", status=200, **extra):
+    headers = [(b"content-type", content_type.encode())]
+    headers += [(k.replace("_", "-").encode(), v.encode()) for k, v in extra.items()]
+    return {"type": "http.response.start", "status": status, "headers": headers}
+
+
+def _body(data, more=False):
+    return {"type": "http.response.body", "body": data, "more_body": more}
+
+
+def test_small_body_passes_through(no_zstd):
+    headers, bodies = _run([_start(content_length="2"), _body(b"{}")])
+    assert "content-encoding" not in headers
+    assert bodies == [_body(b"{}")]
+
+
+def test_large_body_is_gzipped_with_weak_etag(no_zstd):
+    headers, bodies = _run([_start(etag='"v1.abc"', content_length=str(len(BODY))), _body(BODY)])
+    assert headers["content-encoding"] == "gzip"
+    assert headers["vary"] == "Accept-Encoding"
+    assert headers["etag"] == 'W/"v1.abc"'
+    assert int(headers["content-length"]) == len(bodies[0]["body"]) < len(BODY)
+    assert zlib.decompress(bodies[0]["body"], 31) == BODY
+
+
+def test_no_accepted_encoding_passes_through(no_zstd):
+    headers, bodies = _run([_start(), _body(BODY)], accept="br")
+    assert "content-encoding" not in headers
+    assert bodies[0]["body"] == BODY
+
+
+def test_event_streams_and_encoded_bodies_pass_through(no_zstd):
+    headers, _ = _run([_start("text/event-stream"), _body(BODY)])
+    assert "content-encoding" not in headers
+    headers, _ = _run([_start(content_encoding="br"), _body(BODY)])
+    assert headers["content-encoding"] == "br"
+
+
+def test_stream_chunks_decode_as_they_arrive(no_zstd):
+    rows = [b'{"cid": %d}\n' % i for i in range(3)]
+    headers, bodies = _run([_start(content_length="99"), *(_body(r, more=True) for r in rows), _body(b"")],
+                           minimum_size=10_000)
+    assert headers["content-encoding"] == "gzip"
+    assert "content-length" not in headers
+    decoder = zlib.decompressobj(31)
+    # Each chunk is flushed, so it decodes to exactly its row before the stream ends
+    assert [decoder.decompress(b["body"]) for b in bodies[:3]] == rows
+    assert bodies[-1]["more_body"] is False
+    assert decoder.decompress(bodies[-1]["body"]) == b"" and decoder.eof
+
+
+def test_zstd_body_round_trips():
+    zstandard = pytest.importorskip("zstandard")
+    headers, bodies = _run([_start(), _body(BODY)], accept="zstd")
+    assert headers["content-encoding"] == "zstd"
+    assert zstandard.ZstdDecompressor().decompressobj().decompress(bodies[0]["body"]) == BODY
@@ -0,0 +1,53 @@
+import asyncio
+from datetime import datetime, timezone
+
+from fastapi import Response
+
+from app import main
+from app.versions import DATASET_VERSION_SQL, version_token
+
+FINISHED = datetime(2026, 1, 2, tzinfo=timezone.utc)
+VERSION = version_token(2, FINISHED)
+
+
+class GeometryConnection:
+    def __init__(self, runs):
+        self.runs = runs
+        self.queries = []
+
+    async def fetchrow(self, sql, *args):
+        self.queries.append(sql)
+        if sql == DATASET_VERSION_SQL:
+            return {"runs": self.runs, "finished_at": FINISHED if self.runs == 2 else None}
+        return {"molblock": "molblock"}
+
+
+def _geometry(conn):
+    response = Response()
+    response.headers.update({"ETag": '"etag"', "Cache-Control": main.IMMUTABLE_CACHE_CONTROL})
+    body = asyncio.run(main.get_geometry("ds", 1, response, format="molblock", v=VERSION, _cache=None, conn=conn))
+    return body, response
+
+
+def test_current_connection_keeps_immutable():
+    body, response = _geometry(GeometryConnection(runs=2))
+    assert body == "molblock"
+    assert response.headers["Cache-Control"] == main.IMMUTABLE_CACHE_CONTROL
+    assert response.headers["ETag"] == '"etag"'
+
+
+def test_lagging_replica_is_not_cached():
+    conn = GeometryConnection(runs=1)
+    body, response = _geometry(conn)
+    assert body == "molblock"
+    assert response.headers["Cache-Control"] == "no-cache"
+    assert "ETag" not in response.headers
+    assert conn.queries[0] == DATASET_VERSION_SQL
+
+
+def test_revalidating_response_skips_the_version_read():
+    conn = GeometryConnection(runs=2)
+    response = Response()
+    response.headers["Cache-Control"] = "public, max-age=60, must-revalidate"
+    asyncio.run(main.get_geometry("ds", 1, response, format="molblock", v=None, _cache=None, conn=conn))
+    assert DATASET_VERSION_SQL not in conn.queries
@@ -0,0 +1,108 @@
+import asyncio
+import hashlib
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+from ingest import checkpoint, cli, csv_ingest
+from ingest import db as ingest_db
+
+from fakes import FakeIngestDB
+
+MANIFEST = pd.DataFrame({
+    "PubChem_CID": [1, 2, 3, 4, 5],
+    "SMILES": ["CCO", "c1ccccc1", "CC(=O)O", "CCN", "CCCl"],
+    "InChIKey": ["K1", "K2", "K3", "K4", "K5"],
+    "molecular_formula": ["C2H6O", "C6H6", "C2H4O2", "C2H7N", "C3H7Cl"],
+    "molecular_weight": [46.07, 78.11, 60.05, 45.08, 78.54],
+    "exact_mass": [46.04, 78.05, 60.02, 45.06, 78.02],
+    "XLogP3": [-0.1, 2.1, -0.2, -0.1, 1.5],
+    "TPSA": [20.2, 0.0, 37.3, 26.0, 0.0],
+    "HBA": [1, 0, 2, 1, 0],
+    "HBD": [1, 0, 1, 1, 0],
+    "rotatable_bonds": [0, 0, 0, 0, 1],
+    "discovery_method": ["substructure", "similarity", "sim3d", "substructure", "sim2d"],
+    "discovery_seed": ["fam:CCO", "fam:CCO", None, "other:CC", "other:CC"],
+    "name": ["ethanol", "benzene", "acetic acid", "ethylamine", "chloropropane"],
+})
+
+
+@pytest.fixture
+def fake_db(monkeypatch):
+    db = FakeIngestDB()
+    db.install(monkeypatch, cli, ingest_db)
+    monkeypatch.setattr(cli, "CSV_BATCH_SIZE", 2)
+    return db
+
+
+def _ingest(path, **kwargs):
+    return asyncio.run(cli.ingest_csv("ds", str(path), compute_descriptors=False, **kwargs))
+
+
+def test_content_hash_ignores_run_and_dataset():
+    a = csv_ingest.build_molecule_rows(MANIFEST, "ds", "run-1")
+    b = csv_ingest.build_molecule_rows(MANIFEST, "other", "run-2")
+    assert [r["content_hash"] for r in a] == [r["content_hash"] for r in b]
+    assert all(-(2 ** 63) <= r["content_hash"] < 2 ** 63 for r in a)
+
+
+def test_content_hash_changes_with_payload():
+    row = csv_ingest.build_molecule_rows(MANIFEST.head(1), "ds", "run")[0]
+    for field, value in (("tpsa", 20.3), ("name", "EtOH"), ("hba", None), ("discovery_seed", "x:C")):
+        assert checkpoint.molecule_content_hash({**row, field: value}) != row["content_hash"]
+
+
+def test_file_sha256(tmp_path):
+    path = tmp_path / "f.bin"
+    path.write_bytes(b"x" * 10)
+    digest, size = checkpoint.file_sha256(path, chunk_size=3)
+    assert size == 10
+    assert digest == hashlib.sha256(b"x" * 10).hexdigest()
+
+
+def test_unchanged_file_is_skipped(tmp_path, fake_db):
+    path = tmp_path / "m.csv"
+    MANIFEST.to_csv(path, index=False)
+    run_id = _ingest(path)
+    assert fake_db.runs[run_id]["status"] == "completed"
+    assert len(fake_db.upserted) == 5
+    assert _ingest(path) is None
+    assert len(fake_db.upserted) == 5
+
+
+def test_interrupted_file_resumes_after_last_batch(tmp_path, fake_db):
+    path = tmp_path / "m.csv"
+    MANIFEST.to_csv(path, index=False)
+    sha256, size = checkpoint.file_sha256(path)
+    key = ("ds", "csv", str(Path(path).resolve()))
+    fake_db.checkpoints[key] = {"sha256": sha256, "size_bytes": size, "records_done": 4, "status": "running",
+                                "run_id": "run-1"}
+    assert _ingest(path) == "run-1"
+    assert [r["cid"] for r in fake_db.upserted] == [5]
+    assert fake_db.checkpoints[key]["status"] == "completed"
+    assert fake_db.runs["run-1"]["stats"]["resumed_from_row"] == 4
+
+
+def test_changed_rows_only_are_rewritten(tmp_path, fake_db):
+    path = tmp_path / "m.csv"
+    MANIFEST.to_csv(path, index=False)
+    _ingest(path)
+    edited = MANIFEST.copy()
+    edited.loc[2, "name"] = "vinegar"
+    edited.to_csv(path, index=False)
+    run_id = _ingest(path)
+    assert [r["cid"] for r in fake_db.upserted[5:]] == [3]
+    assert fake_db.runs[run_id]["stats"]["molecules_unchanged"] == 4
+
+
+def test_missing_descriptor_columns_are_computed(tmp_path, fake_db):
+    path = tmp_path / "m.csv"
+    MANIFEST.drop(columns=["XLogP3", "TPSA", "HBA", "HBD", "rotatable_bonds"]).to_csv(path, index=False)
+    run_id = asyncio.run(cli.ingest_csv("ds", str(path), descriptor_jobs=1))
+    stats = fake_db.runs[run_id]["stats"]
+    assert stats["progress"]["stages"]["descriptors"]["records"] == 5
+    benzene = next(r for r in fake_db.upserted if r["cid"] == 2)
+    assert (benzene["hba"], benzene["hbd"], benzene["rotatable_bonds"]) == (0, 0, 0)
+    assert benzene["tpsa"] == 0.0
+    assert all(r["xlogp3"] is not None for r in fake_db.upserted)
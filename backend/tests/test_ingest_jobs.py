@@ -0,0 +1,106 @@
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app import main
+
+from fakes import FakePool
+
+
+class FinishedProcess:
+    def __init__(self, returncode=0):
+        self.returncode = returncode
+
+
+@pytest.fixture
+def client(monkeypatch, tmp_path):
+    monkeypatch.setattr(main.pools, "primary", object())
+    monkeypatch.setattr(main.settings, "ingest_root", str(tmp_path))
+    monkeypatch.setattr(main.settings, "ingest_token", "")
+    monkeypatch.setattr(main, "INGEST_LOG_DIR", tmp_path / "logs")
+    monkeypatch.setattr(main, "_ingest_jobs", {})
+    return TestClient(main.app, client=("127.0.0.1", 50000))
+
+
+def _body(*paths, kind="sdf"):
+    return {"kind": kind, "dataset_id": "ds", "paths": [str(p) for p in paths]}
+
+
+def test_paths_outside_ingest_root_are_rejected(client, tmp_path):
+    outside = tmp_path.parent / "outside.sdf"
+    r = client.post("/ingest", json=_body(outside))
+    assert r.status_code == 400
+    assert "INGEST_ROOT" in r.json()["detail"]
+    r = client.post("/ingest", json=_body(tmp_path / ".." / tmp_path.name / "missing.sdf"))
+    assert r.status_code == 400
+    assert "not found" in r.json()["detail"]
+
+
+def test_second_job_conflicts_while_one_runs(client, tmp_path):
+    path = tmp_path / "a.sdf"
+    path.write_text("")
+    main._ingest_jobs["running"] = FinishedProcess(returncode=None)
+    assert client.post("/ingest", json=_body(path)).status_code == 409
+
+
+def test_token_required_when_configured(client, monkeypatch, tmp_path):
+    monkeypatch.setattr(main.settings, "ingest_token", "secret")
+    path = tmp_path / "a.sdf"
+    path.write_text("")
+    assert client.post("/ingest", json=_body(path)).status_code == 401
+    r = client.post("/ingest", json=_body(tmp_path / "missing.sdf"), headers={"Authorization": "Bearer secret"})
+    assert r.status_code == 400
+
+
+def test_without_token_only_local_non_browser_clients(client, tmp_path):
+    body = _body(tmp_path / "missing.sdf")
+    assert client.post("/ingest", json=body).status_code == 400
+    assert client.post("/ingest", json=body, headers={"Origin": "https://example.com"}).status_code == 403
+    remote = TestClient(main.app, client=("10.0.0.5", 50000))
+    assert remote.post("/ingest", json=body).status_code == 403
+
+
+def test_no_database_is_503(client, monkeypatch, tmp_path):
+    monkeypatch.setattr(main.pools, "primary", None)
+    assert client.post("/ingest", json=_body(tmp_path / "a.sdf")).status_code == 503
+    assert client.get("/runs/x/events").status_code == 503
+
+
+def test_finished_jobs_are_pruned(monkeypatch):
+    monkeypatch.setattr(main, "INGEST_JOBS_KEPT", 2)
+    jobs = {f"done-{i}": FinishedProcess() for i in range(4)}
+    jobs["running"] = FinishedProcess(returncode=None)
+    monkeypatch.setattr(main, "_ingest_jobs", jobs)
+    main._prune_ingest_jobs()
+    assert list(main._ingest_jobs) == ["done-2", "done-3", "running"]
+
+
+def test_failed_job_reports_its_log(client, monkeypatch, tmp_path):
+    async def no_run_row(*args):
+        return None
+
+    monkeypatch.setattr(main.pools, "primary", FakePool())
+    monkeypatch.setattr(main, "_query", no_run_row)
+    (tmp_path / "logs").mkdir()
+    (tmp_path / "logs" / "r1.log").write_text("".join(f"line {i}\n" for i in range(30)) + "bad input\n")
+    main._ingest_jobs["r1"] = FinishedProcess(returncode=1)
+    payload, finished = asyncio.run(main._run_event("r1"))
+    assert finished
+    assert payload["status"] == "failed"
+    assert len(payload["log"]) == main.INGEST_LOG_TAIL
+    assert payload["log"][-1] == "bad input"
+
+
+def test_killed_job_with_running_row_is_failed(client, monkeypatch, tmp_path):
+    async def running_row(*args):
+        return {"status": "running", "started_at": None, "finished_at": None, "stats": None}
+
+    monkeypatch.setattr(main.pools, "primary", FakePool())
+    monkeypatch.setattr(main, "_query", running_row)
+    main._ingest_jobs["r1"] = FinishedProcess(returncode=None)
+    payload, finished = asyncio.run(main._run_event("r1"))
+    assert (payload["status"], finished) == ("running", False)
+    main._ingest_jobs["r1"] = FinishedProcess(returncode=-9)
+    payload, finished = asyncio.run(main._run_event("r1"))
+    assert (payload["status"], payload["returncode"], finished) == ("failed", -9, True)
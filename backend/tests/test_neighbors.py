@@ -0,0 +1,120 @@
+import asyncio
+import json
+import os
+import pickle
+from pathlib import Path
+
+import numpy as np
+import pytest
+from fastapi import Response
+from starlette.requests import Request
+
+from app import main
+from app.config import Settings
+
+pytest.importorskip("scipy")
+from ingest import neighbors  # noqa: E402
+
+N = 500
+
+
+@pytest.fixture
+def index(tmp_path):
+    rng = np.random.default_rng(7)
+    path = tmp_path / "ds.npz"
+    np.savez(
+        path,
+        cids=np.arange(1000, 1000 + 3 * N, 3, dtype=np.int64),
+        method_key=rng.integers(1, 4, N).astype(np.int16),
+        seed_key=np.where(rng.random(N) < 0.2, -1, rng.integers(1, 6, N)).astype(np.int32),
+        Z=rng.normal(size=(N, len(neighbors.DESCRIPTORS))).astype(np.float32),
+        meta=np.array(json.dumps({"dataset_id": "ds", "built_at": 1.0})),
+    )
+    return neighbors.NeighborIndex(path)
+
+
+def _brute_force(index, cid, k, method_keys=None, seed_keys=None):
+    i = index.row(cid)
+    mask = np.ones(len(index), dtype=bool)
+    if method_keys is not None:
+        mask &= np.isin(index.method_key, method_keys)
+    if seed_keys is not None:
+        mask &= np.isin(index.seed_key, seed_keys)
+    mask[i] = False
+    d = np.linalg.norm(index.Z - index.Z[i], axis=1)
+    rows = np.flatnonzero(mask)
+    rows = rows[np.argsort(d[rows], kind="stable")][:k]
+    return [int(index.cids[r]) for r in rows], d[rows]
+
+
+@pytest.mark.parametrize("filters", [{}, {"method_keys": (2,)}, {"seed_keys": (1, 3)},
+                                     {"method_keys": (1, 3), "seed_keys": (-1,)}])
+def test_query_matches_brute_force(index, filters):
+    for cid in (1000, 1000 + 3 * 250, 1000 + 3 * (N - 1)):
+        got = index.query(cid, 10, **filters)
+        want_cids, want_dist = _brute_force(index, cid, 10, **filters)
+        assert [c for c, _ in got] == want_cids
+        np.testing.assert_allclose([d for _, d in got], want_dist, rtol=1e-5)
+
+
+def test_unknown_cid_and_small_subsets(index):
+    assert index.query(1001, 5) is None
+    assert index.row(999) is None
+    assert index.query(1000, 5, method_keys=(99,)) == []
+    # k larger than the subset returns every other matching molecule
+    got = index.query(1000, N, seed_keys=(2,))
+    assert len(got) == int(np.sum(index.seed_key == 2)) - (index.seed_key[0] == 2)
+
+
+def test_trees_come_from_the_build(index, tmp_path, monkeypatch):
+    path = tmp_path / "ds.npz"
+    with open(path.with_suffix(".kdtree.pkl"), "wb") as f:
+        pickle.dump((1.0, index.trees), f)
+    monkeypatch.setattr(neighbors, "build_trees", lambda *a: pytest.fail("trees rebuilt on load"))
+    loaded = neighbors.NeighborIndex(path)
+    assert loaded.query(1000, 10, method_keys=(1, 3), seed_keys=(2,)) == index.query(
+        1000, 10, method_keys=(1, 3), seed_keys=(2,)
+    )
+    # Filtered queries only use the persisted partition trees
+    monkeypatch.setattr(neighbors, "cKDTree", None)
+    loaded.query(1000, 10, seed_keys=(1, 3))
+
+
+def test_index_dir_is_anchored_to_backend(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.delenv("NEIGHBOR_INDEX_DIR", raising=False)
+    backend = Path(neighbors.__file__).resolve().parents[1]
+    assert neighbors.index_dir() == backend / "data" / "neighbor_index"
+    assert Path(Settings.from_env().neighbor_index_dir) == neighbors.index_dir()
+    monkeypatch.setenv("NEIGHBOR_INDEX_DIR", str(tmp_path / "idx"))
+    assert neighbors.index_dir() == tmp_path / "idx"
+    assert Path(Settings.from_env().neighbor_index_dir) == tmp_path / "idx"
+
+
+def test_etag_changes_when_the_index_is_rebuilt(tmp_path, monkeypatch):
+    async def version(pool, dataset_id):
+        return "2.abc"
+
+    monkeypatch.setattr(main.pools, "primary", object())
+    monkeypatch.setattr(main.dataset_versions, "get", version)
+    monkeypatch.setattr(main.settings, "neighbor_index_dir", str(tmp_path))
+    check = main.http_cache(variant=main._neighbor_index_stamp)
+
+    def etag():
+        request = Request({
+            "type": "http", "method": "GET", "path": "/datasets/ds/molecules/1/neighbors",
+            "query_string": b"k=10", "headers": [], "path_params": {"dataset_id": "ds"},
+        })
+        response = Response()
+        asyncio.run(check(request, response))
+        return response.headers["ETag"]
+
+    missing = etag()
+    path = tmp_path / "ds.npz"
+    path.write_bytes(b"v1")
+    built = etag()
+    os.utime(path, ns=(0, path.stat().st_mtime_ns + 1_000_000))
+    rebuilt = etag()
+    assert len({missing, built, rebuilt}) == 3
+    # Same dataset version throughout; only the index changed
+    assert all(e.startswith('"2.abc.') for e in (missing, built, rebuilt))
@@ -0,0 +1,104 @@
+import asyncio
+from contextlib import asynccontextmanager
+
+import asyncpg
+import pytest
+
+from app import main
+from app import pools as pools_module
+from app.pools import DatabasePools, ReplicaSet
+
+from fakes import FakeApiPool, FakePool
+
+PRIMARY = "postgresql+asyncpg://u:p@primary/db"
+
+
+@pytest.fixture
+def created(monkeypatch):
+    created = []
+
+    async def create_pool(dsn, **kwargs):
+        pool = FakePool()
+        created.append((dsn, kwargs["max_size"], pool))
+        return pool
+
+    monkeypatch.setattr(pools_module.asyncpg, "create_pool", create_pool)
+    return created
+
+
+def _pools(replicas):
+    return DatabasePools(PRIMARY, replicas, min_size=1, max_size=10, cold_max_size=4, server_settings={})
+
+
+def test_without_replicas_hot_reads_share_the_primary_pool(created):
+    pools = _pools([])
+    asyncio.run(pools.open())
+    assert [(dsn, size) for dsn, size, _ in created] == [
+        ("postgresql://u:p@primary/db", 10), ("postgresql://u:p@primary/db", 4)
+    ]
+    assert pools.for_route("query") == (pools.primary, pools.hot)
+    cold_pool, _ = pools.for_route("geometry")
+    assert cold_pool is created[1][2]
+
+
+def test_replicas_get_their_own_hot_and_cold_pools(created):
+    pools = _pools(["postgresql://u:p@replica/db"])
+    asyncio.run(pools.open())
+    assert sorted((dsn, size) for dsn, size, _ in created[1:]) == [
+        ("postgresql://u:p@replica/db", 4), ("postgresql://u:p@replica/db", 10)
+    ]
+    assert pools.for_route("query")[0] is not pools.primary
+
+
+def test_unexpected_open_error_leaves_member_down(monkeypatch, capsys):
+    async def create_pool(dsn, **kwargs):
+        raise ValueError("invalid DSN")
+
+    monkeypatch.setattr(pools_module.asyncpg, "create_pool", create_pool)
+    replicas = ReplicaSet("hot", ["postgresql://bad"], fallback="primary")
+    asyncio.run(replicas.check())
+    assert not replicas.members[0].healthy
+    assert replicas.pick() == "primary"
+    assert "invalid DSN" in capsys.readouterr().err
+
+
+def test_unexpected_check_error_marks_member_unhealthy(capsys):
+    class BrokenPool:
+        @asynccontextmanager
+        async def acquire(self, timeout=None):
+            raise RuntimeError("protocol error")
+            yield
+
+    replicas = ReplicaSet("hot", ["postgresql://replica"], fallback="primary")
+    member = replicas.members[0]
+    member.pool, member.healthy = BrokenPool(), True
+    asyncio.run(replicas.check())
+    assert not member.healthy
+    assert "protocol error" in capsys.readouterr().err
+
+
+@pytest.mark.parametrize("error, healthy", [
+    (asyncpg.InterfaceError("cannot call Connection.fetch(): connection has an open cursor"), True),
+    (asyncpg.ConnectionDoesNotExistError("connection was closed in the middle of operation"), False),
+])
+def test_only_connection_failures_take_a_replica_down(monkeypatch, error, healthy):
+    pool = FakeApiPool()
+    replicas = ReplicaSet("hot", ["postgresql://replica"], fallback=FakeApiPool())
+    member = replicas.members[0]
+    member.pool, member.healthy = pool, True
+    monkeypatch.setattr(main.pools, "primary", replicas.fallback)
+    monkeypatch.setattr(main.pools, "for_route", lambda route: (replicas.pick(), replicas))
+
+    class ConnectedRequest:
+        async def is_disconnected(self):
+            return False
+
+    async def run():
+        gen = main.conn_for("browse")(ConnectedRequest())
+        await gen.__anext__()
+        with pytest.raises(type(error)):
+            await gen.athrow(error)
+
+    asyncio.run(run())
+    assert member.healthy is healthy
+    assert pool.released == [pool.conn]
@@ -0,0 +1,14 @@
+from app.main import MoleculesQueryBody, _query_shape
+
+
+def test_shape_names_filters_and_leading_sort():
+    body = MoleculesQueryBody(seed_name="fam", methods=["a"], ranges={"TPSA": [0, 1], "bogus": [0, 1]},
+                              sort=[{"field": "TPSA"}, {"field": "cid"}])
+    assert _query_shape(body) == "seed+methods+range:TPSA+sort:TPSA"
+    assert _query_shape(MoleculesQueryBody()) == "all"
+
+
+def test_shape_is_bounded_by_sort_length():
+    sorts = [{"field": "cid"}] * 50 + [{"field": f"x{i}"} for i in range(50)]
+    assert _query_shape(MoleculesQueryBody(sort=sorts)) == "sort:cid"
+    assert _query_shape(MoleculesQueryBody(sort=[{"field": "x1"}, {"field": "cid"}])) == "sort:other"
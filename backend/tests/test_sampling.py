@@ -0,0 +1,74 @@
+import asyncio
+
+import pytest
+
+from app import main
+
+
+@pytest.fixture
+def one_percent(monkeypatch):
+    monkeypatch.setattr(main.settings, "sample_percent", 1.0)
+
+
+def test_sample_count_scales_up(one_percent):
+    est, (lo, hi) = main._scale_sample_count(50)
+    assert est == 5000
+    assert 50 <= lo < est < hi
+
+
+def test_empty_sample_keeps_nonzero_upper_bound(one_percent):
+    est, (lo, hi) = main._scale_sample_count(0)
+    assert (est, lo) == (0, 0)
+    assert hi == 300
+
+
+def test_full_sample_is_exact(monkeypatch):
+    monkeypatch.setattr(main.settings, "sample_percent", 100.0)
+    assert main._scale_sample_count(0) == (0, [0, 0])
+    assert main._scale_sample_count(7) == (7, [7, 7])
+
+
+class SampledConnection:
+    """Answers COUNT/MIN/MAX queries: `sampled` rows in the TABLESAMPLE, `exact` rows otherwise."""
+
+    def __init__(self, sampled, exact):
+        self.sampled = sampled
+        self.exact = exact
+        self.queries = []
+
+    async def fetchrow(self, sql, *args):
+        self.queries.append(sql)
+        n = self.sampled if "TABLESAMPLE" in sql else self.exact
+        return {"n": n, "lo": 1.0 if n else None, "hi": 9.0 if n else None}
+
+    async def fetchval(self, sql, *args):
+        return (await self.fetchrow(sql, *args))["n"]
+
+    async def fetch(self, sql, *args):
+        self.queries.append(sql)
+        return []
+
+
+def _aggregates(conn):
+    body = main.MoleculesQueryBody(accuracy="sampled")
+    return asyncio.run(main.aggregates_molecules("ds", body, _cache=None, conn=conn))["aggregates"]
+
+
+def test_sparse_sample_is_recounted_exactly(one_percent):
+    conn = SampledConnection(sampled=0, exact=4400)
+    result = _aggregates(conn)
+    assert result["TPSA"] == {"count": 4400, "min": 1.0, "max": 9.0, "count_bounds": [4400, 4400]}
+    assert sum("TABLESAMPLE" not in q for q in conn.queries) == len(result)
+
+
+def test_dense_sample_is_scaled(one_percent):
+    conn = SampledConnection(sampled=main.SAMPLED_MIN_HITS, exact=0)
+    result = _aggregates(conn)
+    assert result["TPSA"]["count"] == 100 * main.SAMPLED_MIN_HITS
+    assert all("TABLESAMPLE" in q for q in conn.queries)
+
+
+def test_sparse_sampled_total_is_recounted(one_percent):
+    body = main.MoleculesQueryBody(accuracy="sampled")
+    out = asyncio.run(main.query_molecules("ds", body, conn=SampledConnection(sampled=3, exact=4400)))
+    assert (out["total"], out["total_bounds"]) == (4400, [4400, 4400])
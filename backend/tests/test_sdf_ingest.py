@@ -0,0 +1,85 @@
+import asyncio
+import gzip
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from pathlib import Path
+
+import pytest
+
+from ingest import cli, sdf_ingest
+from ingest import db as ingest_db
+from ingest.checkpoint import geometry_content_hash
+from ingest.progress import Progress
+
+from fakes import FakePool
+
+SAMPLE_SDF = Path(__file__).resolve().parents[2] / "tests" / "data" / "pubchem_cid_batch_0.sdf.gz"
+
+
+@pytest.fixture
+def small_sdf(tmp_path):
+    path = tmp_path / "small.sdf.gz"
+    with gzip.open(path, "wt") as f:
+        for block in islice(sdf_ingest.iter_sdf_blocks(SAMPLE_SDF), 23):
+            f.write(block + "\n")
+    return path
+
+
+@pytest.fixture
+def writes(monkeypatch):
+    out = {"rows": [], "checkpoints": [], "hashes": []}
+
+    async def upsert_geometry_many(conn, dataset_id, run_id, records):
+        out["rows"].extend(cid for cid, *_ in records)
+        out["hashes"].extend(h for *_, h in records)
+
+    async def save_checkpoint(conn, dataset_id, kind, path, sha256, size, records_done, run_id, status="running"):
+        out["checkpoints"].append((records_done, status))
+
+    async def update_run_stats(conn, run_id, stats):
+        pass
+
+    monkeypatch.setattr(ingest_db, "upsert_geometry_many", upsert_geometry_many)
+    monkeypatch.setattr(ingest_db, "save_checkpoint", save_checkpoint)
+    monkeypatch.setattr(ingest_db, "update_run_stats", update_run_stats)
+    monkeypatch.setattr(cli, "SDF_BATCH_SIZE", 5)
+    return out
+
+
+def _ingest(path, resume_from=0, known=None, valid_cids=None):
+    async def run():
+        progress = Progress("run", "sdf", work_total=path.stat().st_size)
+        with ProcessPoolExecutor(1, initializer=sdf_ingest.init_worker, initargs=(valid_cids,)) as executor:
+            stats = await cli._ingest_sdf_file(
+                FakePool(), executor, "ds", "run", str(path), "sha", path.stat().st_size,
+                resume_from, known or {}, progress,
+            )
+        return stats, progress
+
+    return asyncio.run(run())
+
+
+def test_chunks_are_written_and_checkpointed_in_order(small_sdf, writes):
+    stats, progress = _ingest(small_sdf)
+    cids = [rec[0] for rec in sdf_ingest.iter_sdf_records(small_sdf)]
+    assert writes["rows"] == cids
+    assert writes["hashes"] == [geometry_content_hash(mb, hot, cold) for _, mb, hot, cold in sdf_ingest.iter_sdf_records(small_sdf)]
+    assert stats["geometry_rows"] == len(cids)
+    assert writes["checkpoints"] == [(5, "running"), (10, "running"), (15, "running"), (20, "running"),
+                                     (23, "running"), (23, "completed")]
+    assert progress.work_done == small_sdf.stat().st_size
+
+
+def test_resume_skips_committed_records(small_sdf, writes):
+    _ingest(small_sdf, resume_from=20)
+    assert writes["rows"] == [rec[0] for rec in sdf_ingest.iter_sdf_records(small_sdf, skip=20)]
+
+
+def test_unchanged_and_unknown_cids_are_skipped(small_sdf, writes):
+    records = list(sdf_ingest.iter_sdf_records(small_sdf))
+    known = {cid: geometry_content_hash(mb, hot, cold) for cid, mb, hot, cold in records[:3]}
+    valid = frozenset(cid for cid, *_ in records[:10])
+    stats, _ = _ingest(small_sdf, known=known, valid_cids=valid)
+    assert writes["rows"] == [cid for cid, *_ in records[3:10]]
+    assert stats["unchanged"] == 3
+    assert stats["skipped_not_in_manifest"] == len(records) - 10
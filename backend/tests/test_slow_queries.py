@@ -0,0 +1,107 @@
+import asyncio
+from contextlib import asynccontextmanager
+
+import pytest
+
+from app import main
+from app.slow_queries import SlowQueryLog
+
+from fakes import FakeConnection, FakePool
+
+SQL = "SELECT *\n  FROM discovered_molecule WHERE cid = $1"
+
+
+class ExplainConnection(FakeConnection):
+    def __init__(self):
+        self.executed = []
+        self.transactions = []
+
+    @asynccontextmanager
+    async def transaction(self, **kwargs):
+        self.transactions.append(kwargs)
+        yield
+
+    async def execute(self, sql, *args):
+        self.executed.append(sql)
+
+    async def fetch(self, sql, *args):
+        self.executed.append(sql)
+        return [("Seq Scan on discovered_molecule",), ("Execution Time: 12.5 ms",)]
+
+
+@pytest.fixture
+def log():
+    return SlowQueryLog(threshold_ms=100, explain_rate=0.0, max_templates=2)
+
+
+def test_fast_queries_are_not_recorded(log):
+    assert not log.record("q", SQL, (1,), 99.0)
+    assert log.entries == {}
+
+
+def test_slow_query_keeps_slowest_example(log):
+    log.record("q", SQL, (1,), 150.0)
+    log.record("q", SQL, (2,), 300.0)
+    log.record("q", SQL, (3,), 200.0)
+    entry = log.entries["q"]
+    assert (entry.count, entry.max_ms, entry.params) == (3, 300.0, [2])
+    assert entry.sql == "SELECT * FROM discovered_molecule WHERE cid = $1"
+
+
+def test_full_log_drops_the_fastest_template(log):
+    log.record("a", SQL, (), 500.0)
+    log.record("b", SQL, (), 150.0)
+    log.record("c", SQL, (), 200.0)
+    assert set(log.entries) == {"a", "c"}
+
+
+def test_one_explain_per_template_at_a_time(log):
+    assert log.record("q", SQL, (1,), 150.0)
+    assert not log.record("q", SQL, (2,), 150.0)
+    assert not log.record("w", "UPDATE t SET x = 1", (), 150.0)
+
+
+def test_explain_keeps_plan_and_clears_pending(log):
+    pool = FakePool()
+    pool.conn = ExplainConnection()
+    assert log.record("q", SQL, (1,), 150.0)
+    asyncio.run(log.explain(pool, "q", SQL, (1,), timeout=2.5))
+    entry = log.entries["q"]
+    assert pool.conn.transactions == [{"readonly": True}]
+    assert pool.conn.executed[0] == "SET LOCAL statement_timeout = 2500"
+    assert pool.conn.executed[1].startswith("EXPLAIN (ANALYZE, BUFFERS) SELECT")
+    assert entry.plan_ms == 12.5
+    assert not entry.explaining
+    # The plan is known and explain_rate is 0, so the next slow run is not re-explained
+    assert not log.record("q", SQL, (1,), 150.0)
+
+
+def test_failed_query_is_not_logged(monkeypatch):
+    monkeypatch.setattr(main, "slow_queries", SlowQueryLog(threshold_ms=0.001, explain_rate=0.0, max_templates=10))
+
+    class Failing:
+        async def fetch(self, sql, *args):
+            await asyncio.sleep(0.01)
+            raise TimeoutError
+
+    with pytest.raises(TimeoutError):
+        asyncio.run(main._query(Failing(), "q", "fetch", "UPDATE t SET x = 1"))
+    assert main.slow_queries.entries == {}
+
+
+def test_cursor_time_excludes_the_consumer(monkeypatch):
+    monkeypatch.setattr(main, "slow_queries", SlowQueryLog(threshold_ms=50, explain_rate=0.0, max_templates=10))
+
+    class Rows:
+        def cursor(self, sql, *args, prefetch):
+            async def rows():
+                for i in range(3):
+                    yield i
+            return rows()
+
+    async def consume():
+        async for _ in main._cursor(Rows(), "q", "UPDATE t SET x = 1", prefetch=10):
+            await asyncio.sleep(0.03)
+
+    asyncio.run(consume())
+    assert main.slow_queries.entries == {}
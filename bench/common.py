@@ -0,0 +1,67 @@
+"""Shared helpers for the benchmark scripts: result files, git revision, percentiles."""
+import json
+import math
+import platform
+import subprocess
+import time
+from pathlib import Path
+from typing import Any
+
+BENCH_DIR = Path(__file__).resolve().parent
+REPO_ROOT = BENCH_DIR.parent
+RESULTS_DIR = BENCH_DIR / "results"
+DATA_DIR = BENCH_DIR / "data"
+
+# Named dataset sizes for generate.py (manifest rows)
+SCALES = {"10k": 10_000, "1m": 1_000_000, "10m": 10_000_000}
+
+
+def git_revision() -> str:
+    """Short commit hash of the working tree (suffixed -dirty if modified), or 'unknown'."""
+    try:
+        rev = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+        dirty = subprocess.run(
+            ["git", "status", "--porcelain", "--untracked-files=no"], cwd=REPO_ROOT, capture_output=True, text=True
+        ).stdout.strip()
+        return f"{rev}-dirty" if dirty else rev
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def percentiles(values: list[float]) -> dict[str, float | int | None]:
+    """count, mean and p50/p95/p99/max of latencies in milliseconds (nearest-rank)."""
+    if not values:
+        return {"count": 0, "mean_ms": None, "p50_ms": None, "p95_ms": None, "p99_ms": None, "max_ms": None}
+    ordered = sorted(values)
+
+    def rank(p: float) -> float:
+        return round(ordered[min(len(ordered) - 1, max(0, math.ceil(p / 100.0 * len(ordered)) - 1))], 2)
+
+    return {
+        "count": len(ordered),
+        "mean_ms": round(sum(ordered) / len(ordered), 2),
+        "p50_ms": rank(50),
+        "p95_ms": rank(95),
+        "p99_ms": rank(99),
+        "max_ms": round(ordered[-1], 2),
+    }
+
+
+def save_result(kind: str, name: str, payload: dict[str, Any], out: str | None = None) -> Path:
+    """Write a result JSON tagged with revision, time and host; default bench/results/{kind}-{name}-{rev}.json."""
+    rev = git_revision()
+    doc = {
+        "kind": kind,
+        "name": name,
+        "revision": rev,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "host": {"python": platform.python_version(), "machine": platform.machine(), "node": platform.node()},
+        **payload,
+    }
+    path = Path(out) if out else RESULTS_DIR / f"{kind}-{name}-{rev}.json"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(doc, indent=2, sort_keys=True) + "\n")
+    print(f"Wrote {path}")
+    return path
@@ -0,0 +1,62 @@
+"""Compare two benchmark result files (same kind) and flag regressions.
+
+    python -m bench.compare bench/results/load-bench_10k-c8-abc123.json bench/results/load-bench_10k-c8-def456.json
+"""
+import argparse
+import json
+import sys
+from pathlib import Path
+
+
+def _flatten(doc: dict, prefix: str = "") -> dict[str, float]:
+    out = {}
+    for key, value in doc.items():
+        path = f"{prefix}{key}"
+        if isinstance(value, dict):
+            out.update(_flatten(value, path + "."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            out[path] = float(value)
+    return out
+
+
+def _higher_is_better(metric: str) -> bool:
+    # Throughput: rates and record/request counts, top-level ("requests") or nested ("csv.records")
+    return metric.endswith("per_sec") or metric.rpartition(".")[2] in ("records", "requests")
+
+
+def compare(base: dict, head: dict, threshold_pct: float) -> list[tuple[str, float, float, float, bool]]:
+    """(metric, base, head, change %, regressed) for latency and throughput metrics present in both."""
+    a, b = _flatten(base["results"]), _flatten(head["results"])
+    rows = []
+    for metric in sorted(a.keys() & b.keys()):
+        if not (metric.endswith("_ms") or metric.endswith("_seconds") or _higher_is_better(metric)):
+            continue
+        if a[metric] == 0:
+            continue
+        change = 100.0 * (b[metric] - a[metric]) / a[metric]
+        worse = -change if _higher_is_better(metric) else change
+        rows.append((metric, a[metric], b[metric], change, worse > threshold_pct))
+    return rows
+
+
+def main() -> None:
+    p = argparse.ArgumentParser(description="Diff two benchmark result JSON files")
+    p.add_argument("base")
+    p.add_argument("head")
+    p.add_argument("--threshold", type=float, default=10.0, help="Percent change counted as a regression")
+    args = p.parse_args()
+    base = json.loads(Path(args.base).read_text())
+    head = json.loads(Path(args.head).read_text())
+    if base.get("kind") != head.get("kind"):
+        sys.exit(f"Different result kinds: {base.get('kind')} vs {head.get('kind')}")
+    rows = compare(base, head, args.threshold)
+    print(f"{base.get('revision')} -> {head.get('revision')}")
+    for metric, a, b, change, regressed in rows:
+        flag = "  REGRESSION" if regressed else ""
+        print(f"{metric:55s} {a:12.2f} {b:12.2f} {change:+7.1f}%{flag}")
+    if any(r[4] for r in rows):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
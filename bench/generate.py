@@ -0,0 +1,157 @@
+"""Synthetic manifest CSV + SDF.gz generator at 10k / 1M / 10M scale.
+
+Molecules are resampled from the PubChem 3D records in tests/data: each generated CID
+reuses a real record (coordinates, hot tags and cold blobs) and the manifest descriptors
+RDKit computes for it, so value distributions match the fixtures. Discovery methods and
+seeds follow a skewed (Zipf-like) family distribution.
+
+    PYTHONPATH=backend python -m bench.generate --scale 10k
+"""
+import argparse
+import csv
+import gzip
+import random
+import sys
+from pathlib import Path
+
+from rdkit import Chem, RDLogger
+from rdkit.Chem import Crippen, Descriptors, rdMolDescriptors
+
+from ingest.sdf_ingest import iter_sdf_blocks
+
+from .common import DATA_DIR, REPO_ROOT, SCALES
+
+FIXTURES = sorted((REPO_ROOT / "tests" / "data").glob("*.sdf.gz"))
+MANIFEST_COLUMNS = [
+    "PubChem_CID", "SMILES", "InChIKey", "molecular_formula", "molecular_weight", "exact_mass",
+    "XLogP3", "TPSA", "HBA", "HBD", "rotatable_bonds", "discovery_method", "discovery_seed", "name",
+]
+OPTIONAL_DESCRIPTORS = ("XLogP3", "TPSA", "HBA", "HBD", "rotatable_bonds")
+METHODS = (("substructure", 0.5), ("sim2d", 0.35), ("sim3d", 0.15))
+
+_CID = "\x00CID\x00"
+_CONFORMER = "\x00CONFORMER\x00"
+
+
+def load_templates(paths: list[Path]) -> list[tuple[str, dict]]:
+    """(record text with CID placeholders, manifest descriptors) for every fixture record RDKit can read."""
+    RDLogger.DisableLog("rdApp.*")
+    templates = []
+    for path in paths:
+        for block in iter_sdf_blocks(path):
+            mol = Chem.MolFromMolBlock(block)
+            if mol is None:
+                continue
+            lines = block.split("\n")
+            lines[0] = _CID
+            for i, line in enumerate(lines[:-1]):
+                if line.startswith("> <PUBCHEM_COMPOUND_CID>"):
+                    lines[i + 1] = _CID
+                elif line.startswith("> <PUBCHEM_CONFORMER_ID>"):
+                    lines[i + 1] = _CONFORMER
+            templates.append((
+                "\n".join(lines),
+                {
+                    "SMILES": Chem.MolToSmiles(Chem.RemoveHs(mol)),
+                    "InChIKey": Chem.MolToInchiKey(mol) or None,
+                    "molecular_formula": rdMolDescriptors.CalcMolFormula(mol),
+                    "molecular_weight": round(Descriptors.MolWt(mol), 3),
+                    "exact_mass": round(Descriptors.ExactMolWt(mol), 4),
+                    "XLogP3": round(Crippen.MolLogP(mol), 1),
+                    "TPSA": round(rdMolDescriptors.CalcTPSA(mol), 1),
+                    "HBA": rdMolDescriptors.CalcNumHBA(mol),
+                    "HBD": rdMolDescriptors.CalcNumHBD(mol),
+                    "rotatable_bonds": rdMolDescriptors.CalcNumRotatableBonds(mol),
+                },
+            ))
+    return templates
+
+
+def make_seeds(rng: random.Random, templates: list[tuple[str, dict]], n_rows: int) -> tuple[list[str], list[float]]:
+    """discovery_seed strings ("family_k:SMILES") and Zipf-like weights; more families at larger scale."""
+    n_families = max(8, int(n_rows ** 0.5) // 10)
+    seeds = []
+    weights = []
+    for k in range(n_families):
+        for j in range(rng.randint(1, 4)):
+            seeds.append(f"family_{k:04d}:{rng.choice(templates)[1]['SMILES']}")
+            weights.append(1.0 / (k + 1))
+    return seeds, weights
+
+
+def generate(
+    out_dir: Path,
+    n_rows: int,
+    seed: int = 0,
+    geometry_fraction: float = 0.8,
+    missing_descriptors: float = 0.1,
+    sdf_batch_size: int = 25_000,
+) -> dict:
+    """Write manifest.csv and pubchem_cid_batch_*.sdf.gz under out_dir; return counts."""
+    rng = random.Random(seed)
+    templates = load_templates(FIXTURES)
+    if not templates:
+        sys.exit(f"No readable SDF records in {FIXTURES}")
+    seeds, seed_weights = make_seeds(rng, templates, n_rows)
+    methods, method_weights = zip(*METHODS)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    for old in out_dir.glob("pubchem_cid_batch_*.sdf.gz"):
+        old.unlink()
+
+    geometry_rows = 0
+    sdf_files = 0
+    sdf_batch = -1
+    sdf = None
+    with open(out_dir / "manifest.csv", "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=MANIFEST_COLUMNS)
+        writer.writeheader()
+        for i in range(n_rows):
+            cid = i + 1
+            text, desc = rng.choice(templates)
+            row = {"PubChem_CID": cid, **desc}
+            if rng.random() < missing_descriptors:
+                for col in OPTIONAL_DESCRIPTORS:
+                    row[col] = None
+            row["discovery_method"] = rng.choices(methods, method_weights)[0]
+            row["discovery_seed"] = rng.choices(seeds, seed_weights)[0]
+            row["name"] = f"synthetic-{cid}"
+            writer.writerow(row)
+
+            if rng.random() < geometry_fraction:
+                # PubChem-style files: one per CID range
+                if i // sdf_batch_size != sdf_batch:
+                    if sdf is not None:
+                        sdf.close()
+                    sdf_batch = i // sdf_batch_size
+                    batch_start = sdf_batch * sdf_batch_size + 1
+                    sdf = gzip.open(out_dir / f"pubchem_cid_batch_{batch_start}.sdf.gz", "wt", compresslevel=1)
+                    sdf_files += 1
+                sdf.write(text.replace(_CID, str(cid)).replace(_CONFORMER, f"{cid:08X}00000001") + "\n")
+                geometry_rows += 1
+            if (i + 1) % 1_000_000 == 0:
+                print(f"  {i + 1} rows...")
+    if sdf is not None:
+        sdf.close()
+    return {"rows": n_rows, "geometry_rows": geometry_rows, "sdf_files": sdf_files, "templates": len(templates)}
+
+
+def main() -> None:
+    p = argparse.ArgumentParser(description="Generate a synthetic benchmark dataset")
+    p.add_argument("--scale", choices=sorted(SCALES), default="10k", help="Manifest size")
+    p.add_argument("--rows", type=int, default=None, help="Exact row count (overrides --scale)")
+    p.add_argument("--out", default=None, help="Output directory (default bench/data/<scale>)")
+    p.add_argument("--seed", type=int, default=0, help="Random seed (same seed and scale = same files)")
+    p.add_argument("--geometry-fraction", type=float, default=0.8, help="Share of CIDs that get an SDF record")
+    p.add_argument("--missing-descriptors", type=float, default=0.1, help="Share of rows without optional descriptors")
+    p.add_argument("--sdf-batch-size", type=int, default=25_000, help="CID range per SDF file")
+    args = p.parse_args()
+    n_rows = args.rows or SCALES[args.scale]
+    out_dir = Path(args.out) if args.out else DATA_DIR / (args.scale if not args.rows else f"rows_{args.rows}")
+    counts = generate(
+        out_dir, n_rows, args.seed, args.geometry_fraction, args.missing_descriptors, args.sdf_batch_size
+    )
+    print(f"Wrote {out_dir}: {counts}")
+
+
+if __name__ == "__main__":
+    main()
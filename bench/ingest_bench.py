@@ -0,0 +1,92 @@
+"""Ingest throughput benchmark: records/sec for the CSV and SDF paths against DATABASE_URL.
+
+    PYTHONPATH=backend python -m bench.ingest_bench --data bench/data/10k --jobs 4
+"""
+import argparse
+import asyncio
+import json
+import time
+import uuid
+from pathlib import Path
+
+import asyncpg
+
+from ingest import cli
+
+from .common import save_result
+
+
+async def _run_stats(run_id: str) -> dict:
+    conn = await asyncpg.connect(cli._conn_url())
+    try:
+        stats = await conn.fetchval("SELECT stats FROM ingest_run WHERE run_id = $1", run_id)
+    finally:
+        await conn.close()
+    return json.loads(stats) if isinstance(stats, str) else (stats or {})
+
+
+def _summary(wall: float, stats: dict) -> dict:
+    progress = stats.get("progress", {})
+    parsed = progress.get("records_parsed", 0)
+    return {
+        "wall_seconds": round(wall, 3),
+        "records": parsed,
+        "records_written": progress.get("records_written", 0),
+        "records_per_sec": round(parsed / wall, 1) if wall > 0 else None,
+        "stages": progress.get("stages", {}),
+    }
+
+
+def _skipped(wall: float) -> dict:
+    """Result for an ingest the CLI skipped because its inputs were unchanged (no run, no records)."""
+    return {"wall_seconds": round(wall, 3), "skipped": "unchanged"}
+
+
+async def run(dataset_id: str, data_dir: Path, jobs: int, force: bool) -> dict:
+    """Time a CSV then an SDF ingest of data_dir (as written by bench.generate)."""
+    await cli.migrate()
+    results = {}
+    csv_run = str(uuid.uuid4())
+    start = time.perf_counter()
+    ran = await cli.ingest_csv(dataset_id, str(data_dir / "manifest.csv"), force=force, run_id=csv_run)
+    wall = time.perf_counter() - start
+    results["csv"] = _summary(wall, await _run_stats(csv_run)) if ran else _skipped(wall)
+
+    sdf_paths = sorted(str(p) for p in data_dir.glob("*.sdf.gz"))
+    if sdf_paths:
+        sdf_run = str(uuid.uuid4())
+        start = time.perf_counter()
+        ran = await cli.ingest_sdf(dataset_id, sdf_paths, sdf_run, jobs=jobs, force=force)
+        wall = time.perf_counter() - start
+        results["sdf"] = _summary(wall, await _run_stats(sdf_run)) if ran else _skipped(wall)
+        results["sdf"]["files"] = len(sdf_paths)
+    return results
+
+
+def main() -> None:
+    p = argparse.ArgumentParser(description="Benchmark CSV + SDF ingest")
+    p.add_argument("--data", required=True, help="Directory with manifest.csv and *.sdf.gz (bench.generate output)")
+    p.add_argument("--dataset-id", default=None, help="Dataset to load into (default bench_<dir name>)")
+    p.add_argument("--jobs", type=int, default=1, help="SDF files ingested concurrently")
+    p.add_argument("--incremental", action="store_true", help="Keep checkpoints/hashes (measures a no-change re-run)")
+    p.add_argument("--out", default=None, help="Result JSON path")
+    args = p.parse_args()
+    data_dir = Path(args.data)
+    dataset_id = args.dataset_id or f"bench_{data_dir.name}"
+    results = asyncio.run(run(dataset_id, data_dir, args.jobs, force=not args.incremental))
+    name = f"{data_dir.name}-jobs{args.jobs}{'-incremental' if args.incremental else ''}"
+    save_result(
+        "ingest",
+        name,
+        {"dataset_id": dataset_id, "jobs": args.jobs, "incremental": args.incremental, "results": results},
+        args.out,
+    )
+    for path, r in results.items():
+        if "skipped" in r:
+            print(f"{path}: skipped ({r['skipped']}) in {r['wall_seconds']}s")
+        else:
+            print(f"{path}: {r['records']} records in {r['wall_seconds']}s ({r['records_per_sec']}/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+"""API load driver: replays drilldown, filter, aggregate and geometry sessions and records p50/p95/p99.
+
+    python -m bench.load --base-url http://localhost:8000 --dataset-id bench_10k --concurrency 16 --duration 60
+"""
+import argparse
+import asyncio
+import random
+import time
+from collections import defaultdict
+
+import httpx
+
+from .common import percentiles, save_result
+
+# Relative frequency of each session type
+SESSION_WEIGHTS = {"drilldown": 4, "filter": 3, "aggregate": 2, "geometry": 1}
+RANGE_FIELDS = {"molecular_weight": (100.0, 700.0), "TPSA": (0.0, 200.0), "XLogP3": (-2.0, 8.0)}
+
+
+class Driver:
+    def __init__(self, client: httpx.AsyncClient, dataset_id: str, rng: random.Random):
+        self.client = client
+        self.dataset_id = dataset_id
+        self.rng = rng
+        self.latencies: dict[str, list[float]] = defaultdict(list)
+        self.errors: dict[str, int] = defaultdict(int)
+        self.families: list[str] = []
+        self.cids: list[int] = []
+
+    async def call(self, label: str, method: str, url: str, **kwargs) -> httpx.Response | None:
+        start = time.perf_counter()
+        try:
+            r = await self.client.request(method, url, **kwargs)
+        except httpx.HTTPError:
+            self.errors[label] += 1
+            return None
+        self.latencies[label].append((time.perf_counter() - start) * 1000.0)
+        if r.status_code >= 400 and r.status_code != 404:
+            self.errors[label] += 1
+        return r
+
+    async def prime(self) -> None:
+        """Learn families and some CIDs so sessions hit real data."""
+        base = f"/datasets/{self.dataset_id}"
+        r = await self.client.get(f"{base}/families")
+        r.raise_for_status()
+        self.families = r.json()["families"]
+        r = await self.client.post(f"{base}/molecules/query", json={"page": {"limit": 1000, "offset": 0}})
+        r.raise_for_status()
+        self.cids = [m["cid"] for m in r.json()["molecules"]]
+        if not self.cids:
+            raise SystemExit(f"Dataset {self.dataset_id} has no molecules")
+
+    def _filter_body(self) -> dict:
+        ranges = {}
+        for field in self.rng.sample(sorted(RANGE_FIELDS), self.rng.randint(1, 2)):
+            lo, hi = RANGE_FIELDS[field]
+            a = self.rng.uniform(lo, hi)
+            ranges[field] = [a, min(hi, a + self.rng.uniform(0.1, 0.5) * (hi - lo))]
+        body = {"ranges": ranges, "page": {"limit": 100, "offset": 0}}
+        if self.rng.random() < 0.5:
+            body["sort"] = [{"field": self.rng.choice(sorted(RANGE_FIELDS)), "dir": self.rng.choice(["asc", "desc"])}]
+        if self.families and self.rng.random() < 0.5:
+            body["seed_name"] = self.rng.choice(self.families)
+        return body
+
+    async def drilldown(self) -> None:
+        base = f"/datasets/{self.dataset_id}"
+        await self.call("datasets", "GET", "/datasets")
+        await self.call("families", "GET", f"{base}/families")
+        family = self.rng.choice(self.families) if self.families else None
+        await self.call("seeds", "GET", f"{base}/seeds", params={"family": family} if family else None)
+        await self.call("query", "POST", f"{base}/molecules/query", json={"seed_name": family, "page": {"limit": 100, "offset": 0}})
+
+    async def filter(self) -> None:
+        base = f"/datasets/{self.dataset_id}"
+        for _ in range(self.rng.randint(2, 5)):  # slider drags fire several queries
+            await self.call("query_filtered", "POST", f"{base}/molecules/query", json=self._filter_body())
+
+    async def aggregate(self) -> None:
+        base = f"/datasets/{self.dataset_id}"
+        body = self._filter_body()
+        body.pop("sort", None)
+        await self.call("aggregates", "POST", f"{base}/molecules/aggregates", json=body)
+
+    async def geometry(self) -> None:
+        base = f"/datasets/{self.dataset_id}"
+        cid = self.rng.choice(self.cids)
+        await self.call("detail", "GET", f"{base}/molecules/{cid}")
+        await self.call("geometry", "GET", f"{base}/molecules/{cid}/geometry", params={"format": "moleculoids_json"})
+
+
+async def run(base_url: str, dataset_id: str, concurrency: int, duration: float, seed: int) -> dict:
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, timeout=60.0, limits=limits) as client:
+        driver = Driver(client, dataset_id, random.Random(seed))
+        await driver.prime()
+        names, weights = zip(*SESSION_WEIGHTS.items())
+        sessions: dict[str, int] = defaultdict(int)
+        deadline = time.perf_counter() + duration
+
+        async def worker() -> None:
+            while time.perf_counter() < deadline:
+                name = driver.rng.choices(names, weights)[0]
+                sessions[name] += 1
+                await getattr(driver, name)()
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        wall = time.perf_counter() - start
+    requests = sum(len(v) for v in driver.latencies.values())
+    return {
+        "wall_seconds": round(wall, 2),
+        "requests": requests,
+        "requests_per_sec": round(requests / wall, 1),
+        "sessions": dict(sessions),
+        "errors": dict(driver.errors),
+        "endpoints": {label: percentiles(v) for label, v in sorted(driver.latencies.items())},
+        "overall": percentiles([x for v in driver.latencies.values() for x in v]),
+    }
+
+
+def main() -> None:
+    p = argparse.ArgumentParser(description="Replay typical explorer sessions against the API")
+    p.add_argument("--base-url", default="http://localhost:8000")
+    p.add_argument("--dataset-id", required=True)
+    p.add_argument("--concurrency", type=int, default=8, help="Concurrent simulated users")
+    p.add_argument("--duration", type=float, default=30.0, help="Seconds to run")
+    p.add_argument("--seed", type=int, default=0)
+    p.add_argument("--out", default=None, help="Result JSON path")
+    args = p.parse_args()
+    result = asyncio.run(run(args.base_url, args.dataset_id, args.concurrency, args.duration, args.seed))
+    save_result(
+        "load",
+        f"{args.dataset_id}-c{args.concurrency}",
+        {"dataset_id": args.dataset_id, "concurrency": args.concurrency, "duration": args.duration, "results": result},
+        args.out,
+    )
+    for label, p_ in result["endpoints"].items():
+        print(f"{label:16s} n={p_['count']:6d} p50={p_['p50_ms']}ms p95={p_['p95_ms']}ms p99={p_['p99_ms']}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""API cold-start benchmark: `import app.main` time in fresh interpreters, checked against a budget.
+
+    python -m bench.startup --budget-ms 1000            # import only, no database needed
+    python -m bench.startup --lifespan                   # also time lifespan (pool fill + warm-up) against DATABASE_URL
+
+Exits non-zero when the median import time is over budget or when a module that should
+load lazily (RDKit, SQLAlchemy, ...) is imported by app.main.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+from .common import REPO_ROOT, save_result
+
+# Heavy dependencies that must not load just by importing the API
+LAZY_MODULES = ("rdkit", "sqlalchemy", "pandas", "scipy", "duckdb")
+
+_PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import app.main
+import_ms = (time.perf_counter() - start) * 1000.0
+out = {"import_ms": import_ms, "loaded": [m for m in %(lazy)r if m in sys.modules]}
+if %(lifespan)r:
+    import asyncio
+
+    async def boot():
+        t = time.perf_counter()
+        async with app.main.app.router.lifespan_context(app.main.app):
+            await app.main._ready.wait()
+            return (time.perf_counter() - t) * 1000.0
+
+    out["lifespan_ms"] = asyncio.run(boot())
+print(json.dumps(out))
+"""
+
+
+def probe(lifespan: bool) -> dict:
+    """One fresh interpreter: import time, lazily-expected modules that got loaded, optional lifespan time."""
+    env = dict(os.environ, PYTHONPATH=str(REPO_ROOT / "backend"))
+    proc = subprocess.run(
+        [sys.executable, "-c", _PROBE % {"lazy": LAZY_MODULES, "lifespan": lifespan}],
+        env=env, capture_output=True, text=True, check=True,
+    )
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def main() -> None:
+    p = argparse.ArgumentParser(description="Benchmark API import / startup time")
+    p.add_argument("--runs", type=int, default=5, help="Fresh interpreters to time")
+    p.add_argument("--budget-ms", type=float, default=1000.0, help="Fail when median import time exceeds this")
+    p.add_argument("--lifespan", action="store_true", help="Also run lifespan startup (needs DATABASE_URL)")
+    p.add_argument("--out", default=None, help="Result JSON path")
+    args = p.parse_args()
+
+    samples = [probe(args.lifespan) for _ in range(args.runs)]
+    import_ms = [s["import_ms"] for s in samples]
+    loaded = sorted({m for s in samples for m in s["loaded"]})
+    result = {
+        "runs": args.runs,
+        "budget_ms": args.budget_ms,
+        "import_ms": {
+            "median": round(statistics.median(import_ms), 1),
+            "min": round(min(import_ms), 1),
+            "max": round(max(import_ms), 1),
+        },
+        "eager_heavy_modules": loaded,
+    }
+    if args.lifespan:
+        lifespan_ms = [s["lifespan_ms"] for s in samples]
+        result["lifespan_ms"] = {"median": round(statistics.median(lifespan_ms), 1), "max": round(max(lifespan_ms), 1)}
+    save_result("startup", "lifespan" if args.lifespan else "import", result, args.out)
+
+    print(f"import app.main: median {result['import_ms']['median']} ms (budget {args.budget_ms} ms)")
+    failed = False
+    if result["import_ms"]["median"] > args.budget_ms:
+        print("FAIL: import time over budget")
+        failed = True
+    if loaded:
+        print(f"FAIL: imported eagerly: {', '.join(loaded)}")
+        failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -9,8 +9,13 @@ let state = {
   total: 0,
   selectedMolecule: null,
   sceneId: null,
+  // dataset_id -> version token from /datasets; geometry URLs carry it so browsers cache them as immutable
+  versions: {},
 };
 
+// Incremented per loadMolecules call so stale responses are dropped.
+let moleculesSeq = 0;
+
 function el(id) {
   return document.getElementById(id);
 }
@@ -53,6 +58,7 @@ async function loadDatasets() {
   try {
     const r = await fetch(`${API_BASE}/datasets`);
     const data = await r.json();
+    state.versions = Object.fromEntries(data.datasets.map(d => [d.dataset_id, d.version]));
     select.innerHTML = '<option value="">-- Select dataset --</option>' +
       data.datasets.map(d => `<option value="${d.dataset_id}">${d.name || d.dataset_id} (${d.molecule_count || 0})</option>`).join('');
     select.addEventListener('change', () => {
@@ -152,23 +158,41 @@ async function loadMolecules() {
   const card = el('moleculesCard');
   card.style.display = 'block';
   el('moleculesTableWrap').innerHTML = '<span class="loading">Loading molecules…</span>';
+  const seq = ++moleculesSeq;
+  const url = `${API_BASE}/datasets/${state.datasetId}/molecules/query`;
+  const body = {
+    page: { limit: 100, offset: 0 },
+    seed_name: state.family || undefined,
+  };
   try {
-    const body = {
-      page: { limit: 100, offset: 0 },
-      seed_name: state.family || undefined,
-    };
-    const r = await fetch(`${API_BASE}/datasets/${state.datasetId}/molecules/query`, {
+    // Rows come back exact; only the total is a planner estimate, upgraded below.
+    const r = await fetch(url, {
       method: 'POST',
       headers: { 'Content-Type': 'application/json' },
-      body: JSON.stringify(body),
+      body: JSON.stringify({ ...body, accuracy: 'estimate' }),
     });
     const data = await r.json();
+    if (seq !== moleculesSeq) return;
     state.molecules = data.molecules || [];
     state.total = data.total ?? state.molecules.length;
     renderMoleculesTable();
-    el('totalCount').textContent = `(${state.total})`;
+    el('totalCount').textContent = `(~${state.total})`;
   } catch (e) {
     el('moleculesTableWrap').innerHTML = '<span class="error">Failed to load molecules</span>';
+    return;
+  }
+  try {
+    const r = await fetch(url, {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json' },
+      body: JSON.stringify({ ...body, page: { limit: 0, offset: 0 }, accuracy: 'exact' }),
+    });
+    const data = await r.json();
+    if (seq !== moleculesSeq) return;
+    state.total = data.total;
+    el('totalCount').textContent = `(${state.total})`;
+  } catch (e) {
+    console.error(e);
   }
 }
 
@@ -228,18 +252,57 @@ async function selectMolecule(cid) {
       <div class="viewer-wrap" id="viewerWrap">
         <span class="loading">Loading 3D…</span>
       </div>
+      <h4>Similar molecules</h4>
+      <div id="neighbors"><span class="loading">Loading…</span></div>
     `;
     loadViewer(cid);
+    loadNeighbors(cid);
   } catch (e) {
     panel.innerHTML = `<span class="error">Failed to load molecule: ${e.message}</span>`;
   }
 }
 
+async function loadNeighbors(cid) {
+  const wrap = el('neighbors');
+  if (!wrap) return;
+  try {
+    const r = await fetch(`${API_BASE}/datasets/${state.datasetId}/molecules/${cid}/neighbors?k=8`);
+    if (!r.ok) {
+      wrap.innerHTML = '<span class="loading">No neighbour index for this dataset</span>';
+      return;
+    }
+    const data = await r.json();
+    if (state.selectedMolecule !== cid) return;
+    wrap.innerHTML = `
+      <table>
+        <thead><tr><th>CID</th><th>Name</th><th>MW</th><th>Distance</th></tr></thead>
+        <tbody>
+          ${data.neighbors.map(n => `
+            <tr data-cid="${n.cid}">
+              <td>${n.cid}</td>
+              <td>${n.name || '—'}</td>
+              <td>${n.molecular_weight != null ? n.molecular_weight.toFixed(2) : '—'}</td>
+              <td>${n.distance.toFixed(3)}</td>
+            </tr>
+          `).join('')}
+        </tbody>
+      </table>
+    `;
+    wrap.querySelectorAll('tr[data-cid]').forEach(tr => {
+      tr.onclick = () => selectMolecule(parseInt(tr.dataset.cid, 10));
+    });
+  } catch (e) {
+    wrap.innerHTML = `<span class="error">Failed to load neighbours: ${e.message}</span>`;
+  }
+}
+
 async function loadViewer(cid) {
   const wrap = el('viewerWrap');
   if (!wrap) return;
   try {
-    const geomR = await fetch(`${API_BASE}/datasets/${state.datasetId}/molecules/${cid}/geometry?format=moleculoids_json`);
+    const version = state.versions[state.datasetId];
+    const versionParam = version ? `&v=${encodeURIComponent(version)}` : '';
+    const geomR = await fetch(`${API_BASE}/datasets/${state.datasetId}/molecules/${cid}/geometry?format=moleculoids_json${versionParam}`);
     if (!geomR.ok) {
       wrap.innerHTML = '<span class="loading">No geometry for this molecule</span>';
       return;